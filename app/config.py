@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 
 
@@ -19,11 +19,142 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 horas
+    # Token (Bearer) de /metrics y /metrics/state; sin él esos endpoints están desactivados
+    METRICS_TOKEN: Optional[str] = None
 
     # API Keys
     GEMINI_API_KEY: str
     D_ID_API_KEY: str
 
+    # Pool de claves de Gemini (si está vacío se usa solo GEMINI_API_KEY)
+    GEMINI_API_KEYS: List[str] = []
+    GEMINI_KEY_REQUESTS_PER_MINUTE: Optional[float] = None  # límite por clave (proyecto); None: sin límite
+    GEMINI_KEY_BURST: float = 10.0  # solo con GEMINI_KEY_REQUESTS_PER_MINUTE
+    GEMINI_KEY_COOLDOWN_SECONDS: float = 60.0  # pausa de una clave tras 429 o cuota agotada
+
+    # Proveedor de LLM: gemini (real) o fake (local, para pruebas de carga)
+    LLM_PROVIDER: str = "gemini"
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = "lognormal"  # none, fixed, uniform, lognormal
+    FAKE_LLM_LATENCY_MEAN_MS: float = 300.0
+    FAKE_LLM_LATENCY_STDDEV_MS: float = 100.0
+    FAKE_LLM_ERROR_RATE: float = 0.0  # fracción de llamadas que fallan con 503
+    FAKE_LLM_SEED: Optional[int] = None
+    FAKE_LLM_FIXTURES_PATH: Optional[str] = None  # JSON con respuestas fijas por esquema
+
+    # Gemini - ejecución
+    GEMINI_MAX_WORKERS: int = 32  # hilos dedicados a llamadas bloqueantes del SDK
+    GEMINI_COALESCE_REQUESTS: bool = True  # agrupar peticiones idénticas en curso
+
+    # Resiliencia de proveedores externos (Gemini, gTTS, D-ID)
+    RESILIENCE_MAX_ATTEMPTS: int = 3
+    RESILIENCE_BASE_DELAY: float = 0.5  # segundos, backoff exponencial con jitter
+    RESILIENCE_MAX_DELAY: float = 8.0
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # fallos seguidos para abrir el circuito
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30.0
+    GEMINI_TIMEOUT_SECONDS: float = 30.0  # por intento
+    GEMINI_DEADLINE_SECONDS: float = 60.0  # presupuesto total con reintentos
+    TTS_TIMEOUT_SECONDS: float = 20.0
+    TTS_DEADLINE_SECONDS: float = 40.0
+    DID_TIMEOUT_SECONDS: float = 30.0  # crear un video
+    DID_STATUS_TIMEOUT_SECONDS: float = 10.0  # consultar el estado o los créditos
+    DID_DEADLINE_SECONDS: float = 60.0
+
+    # Límite adaptativo de llamadas en curso por familia de proveedor (AIMD).
+    # Gemini tiene un limitador por nivel de modelo; la suma de max_limit no
+    # debería superar GEMINI_MAX_WORKERS
+    ADAPTIVE_CONCURRENCY: dict = {
+        "gemini": {
+            "initial_limit": 8,
+            "min_limit": 2,
+            "max_limit": 16,
+            "latency_tolerance": 2.0,
+            "backoff_ratio": 0.7,
+            "max_wait": 10.0
+        },
+        "d-id": {
+            "initial_limit": 2,
+            "min_limit": 1,
+            "max_limit": 8,
+            "latency_tolerance": 2.0,
+            "backoff_ratio": 0.5,
+            "max_wait": 20.0
+        }
+    }
+
+    # Gemini - niveles de modelo (precios en USD por millón de tokens)
+    GEMINI_MODEL_TIERS: dict = {
+        "fast": {
+            "model": "gemini-2.5-flash-lite",
+            "input_cost_per_million": 0.10,
+            "output_cost_per_million": 0.40
+        },
+        "capable": {
+            "model": "gemini-2.5-flash",
+            "input_cost_per_million": 0.30,
+            "output_cost_per_million": 2.50
+        },
+    }
+    # Nivel de modelo por perfil de generación (los no listados usan "default")
+    GEMINI_TIER_ROUTES: dict = {
+        "default": "capable",
+        "tutor_suggestions": "fast",
+        "aida": "fast",
+        "feynman_explain": "fast",
+        "concept_map": "fast",
+        "quiz": "capable",
+        "video_script": "capable",
+        "flashcards": "capable",
+        "flashcards_batch": "capable",
+    }
+    GEMINI_TIER_FALLBACK: bool = True  # usar el otro nivel si el principal falla
+
+    # Gemini - perfiles de generación por servicio. max_output_tokens acota
+    # la longitud (y la latencia de cola) de cada respuesta; "model" fija un
+    # modelo concreto en lugar del nivel de GEMINI_TIER_ROUTES
+    GEMINI_PROFILES: dict = {
+        "default": {"temperature": 0.7, "max_output_tokens": 8192},
+        "flashcards": {"temperature": 0.8, "max_output_tokens": 2048},
+        "flashcards_batch": {"temperature": 0.8, "max_output_tokens": 8192},
+        "quiz": {"temperature": 0.8, "max_output_tokens": 2048},
+        "feynman_explain": {"temperature": 0.7, "max_output_tokens": 1024, "hedge": True},
+        "feynman_analysis": {"temperature": 0.7, "max_output_tokens": 1024},
+        "aida": {"temperature": 0.9, "max_output_tokens": 768},
+        "pomodoro": {"temperature": 0.7, "max_output_tokens": 2048},
+        "concept_map": {"temperature": 0.7, "max_output_tokens": 1024},
+        "video_script": {"temperature": 0.8, "max_output_tokens": 1536},
+        "tutor": {
+            "temperature": 0.8,
+            "max_output_tokens": 768,
+            # Evita que el modelo continúe el diálogo inventando al estudiante
+            "stop_sequences": ["\nEstudiante:"]
+        },
+        "tutor_suggestions": {"temperature": 0.7, "max_output_tokens": 512, "hedge": True},
+        # Respuesta y sugerencias en un mismo JSON (VOICE_TUTOR_SINGLE_CALL)
+        "tutor_combined": {"temperature": 0.8, "max_output_tokens": 1024},
+    }
+
+    # Gemini - peticiones duplicadas (hedging) de los perfiles con "hedge": True.
+    # Si la respuesta tarda más que el percentil indicado de las recientes se
+    # lanza un duplicado y se usa la primera respuesta válida
+    GEMINI_HEDGE_PERCENTILE: float = 0.95
+    GEMINI_HEDGE_MIN_DELAY_SECONDS: float = 0.3
+    GEMINI_HEDGE_DEFAULT_DELAY_SECONDS: float = 2.0  # hasta reunir GEMINI_HEDGE_MIN_SAMPLES
+    GEMINI_HEDGE_MIN_SAMPLES: int = 20
+    GEMINI_HEDGE_MAX_RATIO: float = 0.1  # duplicados como fracción máxima de las peticiones
+    GEMINI_HEDGE_BURST: float = 5.0
+
+    # Gemini - caché de respuestas
+    GEMINI_CACHE_BACKEND: str = "memory"  # memory, sqlite, none
+    GEMINI_CACHE_PATH: str = "./storage/gemini_cache.sqlite3"
+    GEMINI_CACHE_MAX_ENTRIES: int = 1000
+    GEMINI_CACHE_TTLS: dict = {  # segundos por servicio
+        "default": 3600,
+        "aida": 86400,
+        "pomodoro": 86400,
+        "feynman": 43200,
+        "concept_map": 86400,
+    }
+
     # CORS
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -36,9 +167,62 @@ class Settings(BaseSettings):
 
     # Limits
     MAX_FLASHCARDS_PER_TOPIC: int = 10
+    MAX_FLASHCARD_BATCH_TOPICS: int = 30
+    FLASHCARD_BATCH_TOKEN_BUDGET: int = 6000  # tokens de salida por prompt agrupado
+    FLASHCARD_BATCH_TOKENS_PER_CARD: int = 60  # estimación por tarjeta (pregunta + respuesta + JSON)
+    FLASHCARD_BATCH_CONCURRENCY: int = 4  # prompts simultáneos por lote
     MAX_QUIZ_QUESTIONS: int = 5
     MAX_CONVERSATION_HISTORY: int = 20
 
+    # Tutor de voz
+    VOICE_TUTOR_SINGLE_CALL: bool = True  # respuesta y sugerencias en una sola llamada a Gemini
+    VOICE_TUTOR_SUGGESTIONS_TIMEOUT_SECONDS: float = 4.0  # después se usan las sugerencias por defecto
+    VOICE_TUTOR_TTS_CONCURRENCY: int = 2  # frases sintetizándose a la vez en /ask/speech
+    VOICE_TUTOR_MIN_SENTENCE_CHARS: int = 20
+    VOICE_TUTOR_MAX_SENTENCE_CHARS: int = 250
+
+    # Videos educativos
+    VIDEO_JOB_WORKERS: int = 2  # trabajos de video procesándose a la vez
+    # Reserva de un trabajo por un proceso; se renueva mientras avanza y otro
+    # proceso lo reanuda si caduca
+    VIDEO_JOB_LEASE_SECONDS: float = 60.0
+    # Reutilizar renders de D-ID con el mismo tema normalizado, duración y voz
+    VIDEO_RENDER_REUSE: bool = True
+    VIDEO_RENDER_WAIT_SECONDS: float = 5.0  # consulta de un render en curso en otro proceso
+    # Espera máxima a un render ajeno; después el trabajo lo hace él mismo
+    VIDEO_RENDER_MAX_WAIT_SECONDS: float = 900.0
+    DID_VOICE_ID: str = "es-ES-ElviraNeural"  # voz de Microsoft para los videos
+    DID_AVATAR_URL: str = "https://d-id-public-bucket.s3.amazonaws.com/alice.jpg"
+    # Copia de los videos terminados en STORAGE_PATH/videos (las URLs de D-ID caducan)
+    MEDIA_MIRROR_ENABLED: bool = True
+    MEDIA_MIRROR_WORKERS: int = 2
+    MEDIA_MIRROR_TIMEOUT_SECONDS: float = 300.0  # por intento de descarga
+    MEDIA_MIRROR_MAX_ATTEMPTS: int = 5  # en total; después queda en error con la URL de D-ID
+    MEDIA_MIRROR_RETRY_BASE_SECONDS: float = 30.0  # backoff exponencial con jitter entre intentos
+    MEDIA_MIRROR_RETRY_MAX_SECONDS: float = 600.0
+    MEDIA_MAX_BYTES: int = 500 * 1024 * 1024
+    MEDIA_CHUNK_BYTES: int = 256 * 1024  # tamaño de bloque al descargar y al servir rangos
+    MEDIA_BASE_URL: Optional[str] = None  # URL pública de la API; sin ella las URLs son relativas
+    # Cliente HTTP compartido con D-ID (se abre al arrancar la aplicación)
+    D_ID_BASE_URL: str = "https://api.d-id.com"
+    DID_HTTP2: bool = True  # requiere httpx[http2]; sin h2 se usa HTTP/1.1
+    DID_MAX_CONNECTIONS: int = 20
+    DID_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    DID_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    DID_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # URL pública de la API para el webhook de D-ID (sin él solo se consulta el estado)
+    DID_WEBHOOK_BASE_URL: Optional[str] = None
+    DID_WEBHOOK_SECRET: Optional[str] = None  # por defecto SECRET_KEY
+    # Consulta del estado de D-ID según la duración pedida (segundos): espera
+    # inicial, intervalo que crece DID_POLL_BACKOFF veces hasta max_interval,
+    # y tiempo máximo de espera
+    DID_POLL_SCHEDULES: dict = {
+        "short": {"initial_delay": 5.0, "interval": 2.0, "max_interval": 10.0, "timeout": 300.0},
+        "medium": {"initial_delay": 10.0, "interval": 3.0, "max_interval": 15.0, "timeout": 600.0},
+        "long": {"initial_delay": 20.0, "interval": 5.0, "max_interval": 30.0, "timeout": 900.0},
+    }
+    DID_POLL_BACKOFF: float = 1.5
+
     # XP Map
     XP_MAP: dict = {
         "text": 5,
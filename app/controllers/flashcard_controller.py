@@ -1,13 +1,17 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import List
+from datetime import datetime
 from app.models.flashcard import Flashcard, FlashcardReview
 from app.models.user import User
 from app.schemas.flashcard import (
     FlashcardCreate,
     FlashcardResponse,
     FlashcardReviewCreate,
-    FlashcardBatchResponse
+    FlashcardBatchResponse,
+    FlashcardTopicResult,
+    FlashcardMultiTopicResponse
 )
 from app.services.flashcard_service import flashcard_service
 from app.config import get_settings
@@ -68,6 +72,105 @@ class FlashcardController:
                 detail=f"Error generando flashcards: {str(e)}"
             )
 
+    @staticmethod
+    async def generate_flashcards_for_topics(
+            db: Session,
+            topics: List[str],
+            current_user: User,
+            study_session_id: uuid.UUID = None
+    ) -> FlashcardMultiTopicResponse:
+        """
+        Genera flashcards para varios temas con IA y las guarda en una sola inserción
+        """
+        # Normalizar y quitar temas repetidos manteniendo el orden
+        unique_topics = []
+        seen = set()
+        for topic in topics:
+            topic = topic.strip()
+            if topic and topic.casefold() not in seen:
+                seen.add(topic.casefold())
+                unique_topics.append(topic)
+
+        if not unique_topics:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Debes indicar al menos un tema"
+            )
+
+        if len(unique_topics) > settings.MAX_FLASHCARD_BATCH_TOPICS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo {settings.MAX_FLASHCARD_BATCH_TOPICS} temas por lote"
+            )
+
+        # Los temas que no caben en la columna topic fallan de antemano en
+        # lugar de romper la inserción de todo el lote
+        max_length = Flashcard.__table__.c.topic.type.length
+        valid_topics = [topic for topic in unique_topics if len(topic) <= max_length]
+
+        generated = {}
+        if valid_topics:
+            generated = {
+                result["topic"]: result
+                for result in await flashcard_service.generate_flashcards_batch(
+                    topics=valid_topics,
+                    count=settings.MAX_FLASHCARDS_PER_TOPIC
+                )
+            }
+        topic_results = [
+            generated.get(topic) or {"topic": topic, "error": f"El tema supera los {max_length} caracteres"}
+            for topic in unique_topics
+        ]
+
+        # Filas completas (ids y fechas generados aquí) para un único INSERT
+        # sin tener que refrescar cada tarjeta después
+        rows = []
+        rows_by_topic = {}
+        for result in topic_results:
+            topic_rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": current_user.id,
+                    "study_session_id": study_session_id,
+                    "question": card_data["question"],
+                    "answer": card_data["answer"],
+                    "topic": result["topic"],
+                    "times_reviewed": 0,
+                    "times_correct": 0,
+                    "created_at": datetime.utcnow()
+                }
+                for card_data in result.get("flashcards", [])
+            ]
+            rows_by_topic[result["topic"]] = topic_rows
+            rows.extend(topic_rows)
+
+        if rows:
+            try:
+                db.execute(insert(Flashcard), rows)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error guardando flashcards: {str(e)}"
+                )
+
+        results = [
+            FlashcardTopicResult(
+                topic=result["topic"],
+                success="error" not in result,
+                flashcards=[FlashcardResponse.model_validate(row) for row in rows_by_topic[result["topic"]]],
+                error=result.get("error")
+            )
+            for result in topic_results
+        ]
+
+        return FlashcardMultiTopicResponse(
+            results=results,
+            total_flashcards=len(rows),
+            failed_topics=sum(1 for result in results if not result.success)
+        )
+
     @staticmethod
     def create_flashcard(
             db: Session,
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
@@ -6,6 +6,15 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.config import get_settings
 from app.database import engine, Base
 from app.routes import api_router
+from app.services.gemini_service import gemini_service
+from app.services.media_mirror_service import media_mirror
+from app.services.video_job_service import video_job_queue
+from app.services.video_service import video_service
+from app.utils.resilience import get_circuit_breaker_states
+from app.utils.concurrency import get_concurrency_limiter_states
+from app.utils.dependencies import verify_metrics_token
+from app.utils.metrics import metrics_registry
+from typing import Optional
 import time
 
 settings = get_settings()
@@ -106,6 +115,33 @@ async def health_check():
     }
 
 
+# Métricas (protegidas con METRICS_TOKEN)
+@app.get("/metrics", dependencies=[Depends(verify_metrics_token)])
+async def get_metrics(prefix: Optional[str] = None):
+    """
+    Métricas en memoria del proceso (latencia, tokens, parseo JSON, reintentos)
+    """
+    return metrics_registry.snapshot(prefix)
+
+
+@app.get("/metrics/state", dependencies=[Depends(verify_metrics_token)])
+async def get_state():
+    """
+    Estado interno del proceso: pools, cachés, circuitos, limitadores y colas
+    """
+    return {
+        "llm_provider": gemini_service.provider.stats(),
+        "gemini_executor": gemini_service.get_executor_stats(),
+        "gemini_cache": gemini_service.get_cache_stats(),
+        "gemini_coalescing": gemini_service.get_coalescing_stats(),
+        "circuit_breakers": get_circuit_breaker_states(),
+        "concurrency_limits": get_concurrency_limiter_states(),
+        "video_jobs": video_job_queue.stats(),
+        "did_client": video_service.get_client_stats(),
+        "media_mirror": media_mirror.stats()
+    }
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -116,7 +152,8 @@ async def root():
         "message": f"Bienvenido a {settings.APP_NAME}",
         "version": settings.VERSION,
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 
@@ -130,6 +167,11 @@ async def startup_event():
     """
     Ejecuta al iniciar la aplicación
     """
+    # Conexiones con D-ID compartidas por todas las peticiones
+    await video_service.start()
+    # Reanudar los videos y las copias locales que quedaron a medias
+    await video_job_queue.start()
+    await media_mirror.start()
     print(f"🚀 {settings.APP_NAME} v{settings.VERSION} iniciado")
     print(f"📚 Documentación disponible en: http://{settings.HOST}:{settings.PORT}/docs")
 
@@ -139,6 +181,10 @@ async def shutdown_event():
     """
     Ejecuta al cerrar la aplicación
     """
+    await video_job_queue.stop()
+    await media_mirror.stop()
+    await video_service.close()
+    gemini_service.shutdown()
     print(f"👋 {settings.APP_NAME} detenido")
 
 
@@ -8,6 +8,9 @@ from app.models.concept_map import ConceptMap
 from app.models.feynman_session import FeynmanSession
 from app.models.audio_generation import AudioGeneration
 from app.models.educational_video import EducationalVideo
+from app.models.video_generation_job import VideoGenerationJob
+from app.models.video_render import VideoRender
+from app.models.video_media import VideoMedia
 from app.models.voice_conversation import VoiceConversation, VoiceConversationMessage
 
 __all__ = [
@@ -24,6 +27,9 @@ __all__ = [
     "FeynmanSession",
     "AudioGeneration",
     "EducationalVideo",
+    "VideoGenerationJob",
+    "VideoRender",
+    "VideoMedia",
     "VoiceConversation",
     "VoiceConversationMessage",
 ]
\ No newline at end of file
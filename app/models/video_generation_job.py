@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import uuid
+from app.database import Base
+
+
+class VideoGenerationJob(Base):
+    __tablename__ = "video_generation_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    study_session_id = Column(UUID(as_uuid=True), ForeignKey("study_sessions.id", ondelete="CASCADE"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    topic = Column(String(255), nullable=False)
+    duration = Column(String(20), nullable=False)  # short, medium, long
+    status = Column(String(20), nullable=False, default='created', index=True)  # created, scripting, rendering, done, error
+    progress = Column(Integer, nullable=False, default=0)  # 0-100
+    # Guión generado (se conserva para reanudar el trabajo sin volver a llamar a Gemini)
+    script = Column(Text, nullable=True)
+    title = Column(String(255), nullable=True)
+    key_points = Column(JSONB, nullable=True)
+    did_video_id = Column(String(255), nullable=True)  # id del talk en D-ID
+    provider_status = Column(String(50), nullable=True)  # último estado informado por D-ID
+    error = Column(Text, nullable=True)
+    educational_video_id = Column(
+        UUID(as_uuid=True), ForeignKey("educational_videos.id", ondelete="SET NULL"), nullable=True
+    )
+    # Reserva del trabajo: proceso que lo avanza y hasta cuándo (caduca si ese proceso muere)
+    claimed_by = Column(String(100), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    educational_video = relationship("EducationalVideo")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Text
+from datetime import datetime
+from app.database import Base
+
+
+class VideoMedia(Base):
+    """
+    Copia local de un video de D-ID y su miniatura (las URLs de D-ID caducan)
+
+    Hay una fila por talk de D-ID, compartida por todos los EducationalVideo
+    que lo reutilizan
+    """
+    __tablename__ = "video_media"
+
+    video_id = Column(String(255), primary_key=True)  # id del talk en D-ID
+    status = Column(String(20), nullable=False, default='pending', index=True)  # pending, done, error
+    source_url = Column(Text, nullable=False)
+    thumbnail_source_url = Column(Text, nullable=True)
+    video_path = Column(Text, nullable=True)  # relativa a STORAGE_PATH
+    thumbnail_path = Column(Text, nullable=True)
+    size = Column(BigInteger, nullable=True)  # bytes del video
+    etag = Column(String(64), nullable=True)  # sha256 del video
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    mirrored_at = Column(DateTime(timezone=True), nullable=True)
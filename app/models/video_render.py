@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+
+class VideoRender(Base):
+    """
+    Índice de videos renderizados en D-ID por contenido (tema normalizado, duración y voz)
+    """
+    __tablename__ = "video_renders"
+
+    render_key = Column(String(64), primary_key=True)  # sha256 de tema normalizado, duración, voz y avatar
+    topic = Column(String(255), nullable=False)  # tema normalizado
+    duration = Column(String(20), nullable=False)  # short, medium, long
+    voice_id = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default='rendering')  # rendering, done
+    # Trabajo que está renderizando (o renderizó) el video
+    job_id = Column(
+        UUID(as_uuid=True), ForeignKey("video_generation_jobs.id", ondelete="SET NULL"), nullable=True
+    )
+    # Video de referencia; los demás usuarios reciben una copia de su guión y resultado
+    educational_video_id = Column(
+        UUID(as_uuid=True), ForeignKey("educational_videos.id", ondelete="SET NULL"), nullable=True
+    )
+    hits = Column(Integer, nullable=False, default=0)  # veces que se reutilizó
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    educational_video = relationship("EducationalVideo")
@@ -12,6 +12,7 @@ from app.schemas.feynman import (
 from app.services.feynman_service import feynman_service
 from app.models.feynman_session import FeynmanSession
 from app.utils.dependencies import get_current_user
+from app.utils.sse import format_sse, sse_response
 from app.models.user import User
 
 router = APIRouter()
@@ -78,6 +79,64 @@ async def analyze_feynman_explanation(
         )
 
 
+@router.post("/explanation/stream")
+async def stream_feynman_explanation(
+        request: FeynmanExplanationRequest,
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Genera la explicación simple del tema en streaming (SSE)
+    """
+    if not request.topic or not request.topic.strip():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="El tema no puede estar vacío"
+        )
+
+    async def events():
+        try:
+            chunks = []
+            async for chunk in feynman_service.stream_explanation(request.topic):
+                chunks.append(chunk)
+                yield format_sse({"text": chunk}, event="token")
+
+            explanation = "".join(chunks).strip()
+            yield format_sse(FeynmanExplanationResponse(explanation=explanation).model_dump(), event="done")
+        except Exception as e:
+            yield format_sse({"message": f"Error generando explicación Feynman: {str(e)}"}, event="error")
+
+    return sse_response(events())
+
+
+@router.post("/analyze/stream")
+async def stream_feynman_analysis(
+        request: FeynmanAnalysisRequest,
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Analiza la explicación del usuario en streaming (SSE)
+    """
+    if not request.user_explanation or not request.user_explanation.strip():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La explicación del usuario no puede estar vacía"
+        )
+
+    async def events():
+        try:
+            chunks = []
+            async for chunk in feynman_service.stream_analysis(request.topic, request.user_explanation):
+                chunks.append(chunk)
+                yield format_sse({"text": chunk}, event="token")
+
+            analysis = feynman_service.split_analysis("".join(chunks))
+            yield format_sse(FeynmanAnalysisResponse(**analysis).model_dump(), event="done")
+        except Exception as e:
+            yield format_sse({"message": str(e)}, event="error")
+
+    return sse_response(events())
+
+
 @router.post("/sessions", response_model=FeynmanSessionResponse, status_code=201)
 def save_feynman_session(
         session_data: FeynmanSessionCreate,
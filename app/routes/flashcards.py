@@ -7,7 +7,9 @@ from app.schemas.flashcard import (
     FlashcardResponse,
     FlashcardReviewCreate,
     FlashcardBatchResponse,
-    FlashcardGenerationRequest
+    FlashcardGenerationRequest,
+    FlashcardMultiTopicRequest,
+    FlashcardMultiTopicResponse
 )
 from app.controllers.flashcard_controller import FlashcardController
 from app.utils.dependencies import get_current_user
@@ -32,6 +34,21 @@ async def generate_flashcards(
     )
 
 
+@router.post("/generate/batch", response_model=FlashcardMultiTopicResponse)
+async def generate_flashcards_batch(
+    request: FlashcardMultiTopicRequest,
+    study_session_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Genera flashcards con IA para varios temas a la vez
+    """
+    return await FlashcardController.generate_flashcards_for_topics(
+        db, request.topics, current_user, study_session_id
+    )
+
+
 @router.post("/", response_model=FlashcardResponse, status_code=201)
 def create_flashcard(
     flashcard_data: FlashcardCreate,
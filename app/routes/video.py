@@ -1,43 +1,157 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.educational_video import (
     EducationalVideoRequest,
-    EducationalVideoResponse,
     EducationalVideoCreate,
-    EducationalVideoDBResponse
+    EducationalVideoDBResponse,
+    VideoJobResponse,
+    VideoJobStatusResponse
 )
 from app.services.video_service import video_service
+from app.services.video_job_service import video_job_queue, verify_webhook_signature
+from app.services.media_mirror_service import MEDIA_KINDS, verify_media_signature
 from app.models.educational_video import EducationalVideo
+from app.models.video_generation_job import VideoGenerationJob
+from app.models.video_media import VideoMedia
 from app.utils.dependencies import get_current_user
+from app.utils.file_response import ranged_file_response
+from app.config import get_settings
 from app.models.user import User
-from typing import List
+from typing import Any, Dict, List
+import os
 import uuid
 
+settings = get_settings()
+
 router = APIRouter()
 
 
-@router.post("/generate", response_model=EducationalVideoResponse)
+@router.post("/generate", response_model=VideoJobResponse, status_code=202)
 async def generate_educational_video(
         request: EducationalVideoRequest,
+        db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     """
-    Genera un video educativo con D-ID
+    Encola la generación de un video educativo con D-ID
+
+    Devuelve el trabajo de inmediato; su avance se consulta en
+    GET /video/jobs/{job_id} y el video terminado queda guardado en la
+    lista de videos del usuario
     """
     try:
-        video_data = await video_service.generate_educational_video(
+        job = await video_job_queue.submit(
+            db,
+            user_id=current_user.id,
             topic=request.topic,
             duration=request.duration
         )
-        return EducationalVideoResponse(**video_data)
+        return VideoJobResponse.model_validate(job)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            detail=f"Error encolando el video educativo: {str(e)}"
         )
 
 
+@router.get("/jobs/{job_id}", response_model=VideoJobStatusResponse)
+def get_video_job(
+        job_id: uuid.UUID,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Obtiene el estado de un trabajo de generación de video
+    """
+    job = db.query(VideoGenerationJob).filter(
+        VideoGenerationJob.id == job_id,
+        VideoGenerationJob.user_id == current_user.id
+    ).first()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo de video no encontrado"
+        )
+
+    response = VideoJobStatusResponse.model_validate(job)
+    if job.educational_video is not None:
+        response.video = EducationalVideoDBResponse.model_validate(job.educational_video)
+    return response
+
+
+@router.post("/webhooks/d-id")
+async def did_webhook(
+        job_id: uuid.UUID,
+        signature: str,
+        talk: Dict[str, Any],
+        db: Session = Depends(get_db)
+):
+    """
+    Webhook de D-ID: avisa de que el video de un trabajo terminó
+
+    La URL la firma la API al crear el video (HMAC del id del trabajo), así
+    que no requiere usuario autenticado
+    """
+    if not verify_webhook_signature(job_id, signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Firma del webhook no válida"
+        )
+
+    if not await video_job_queue.handle_webhook(db, job_id, talk):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo de video no encontrado"
+        )
+
+    return {"received": True}
+
+
+@router.get("/media/{video_id}/{kind}")
+def get_video_media(
+        video_id: str,
+        kind: str,
+        signature: str,
+        request: Request,
+        db: Session = Depends(get_db)
+):
+    """
+    Sirve la copia local de un video o de su miniatura (admite Range y ETag)
+
+    La URL va firmada (HMAC del talk y el tipo) para que el reproductor la
+    pueda pedir sin cabecera de autenticación
+    """
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Archivo no encontrado"
+    )
+    if kind not in MEDIA_KINDS or not verify_media_signature(video_id, kind, signature):
+        raise not_found
+
+    media = db.query(VideoMedia).filter(
+        VideoMedia.video_id == video_id,
+        VideoMedia.status == "done"
+    ).first()
+    relative_path = media and (media.video_path if kind == "video" else media.thumbnail_path)
+    if not relative_path:
+        raise not_found
+
+    path = os.path.join(settings.STORAGE_PATH, relative_path)
+    if not os.path.isfile(path):
+        raise not_found
+
+    # El contenido de un talk no cambia: el cliente puede guardarlo sin volver a validarlo
+    return ranged_file_response(
+        request,
+        path,
+        media_type=MEDIA_KINDS[kind][1],
+        etag=media.etag if kind == "video" else None,
+        cache_control="private, max-age=31536000, immutable"
+    )
+
+
 @router.post("/save", response_model=EducationalVideoDBResponse, status_code=201)
 def save_educational_video(
         video_data: EducationalVideoCreate,
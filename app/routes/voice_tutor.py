@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.voice_tutor import (
@@ -10,10 +10,12 @@ from app.schemas.voice_tutor import (
     VoiceMessageResponse
 )
 from app.services.voice_tutor_service import voice_tutor_service
+from app.services.voice_tutor_session import open_voice_tutor_session
 from app.models.voice_conversation import VoiceConversation, VoiceConversationMessage
 from app.utils.dependencies import get_current_user
+from app.utils.sse import format_sse, sse_response
 from app.models.user import User
-from typing import List
+from typing import List, Optional
 import uuid
 
 router = APIRouter()
@@ -47,6 +49,141 @@ async def ask_voice_tutor(
         )
 
 
+@router.post("/ask/stream")
+async def ask_voice_tutor_stream(
+        request: VoiceTutorRequest,
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Hace una pregunta al tutor de voz y devuelve la respuesta en streaming (SSE)
+
+    Eventos: "token" con cada fragmento de texto, "done" con la respuesta
+    completa (texto, audio y sugerencias) y "error" si algo falla
+    """
+    if not request.user_question or not request.user_question.strip():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La pregunta del usuario no puede estar vacía"
+        )
+
+    history = [msg.model_dump() for msg in request.conversation_history]
+
+    async def events():
+        try:
+            chunks = []
+            async for chunk in voice_tutor_service.stream_answer(
+                    topic=request.topic,
+                    user_question=request.user_question,
+                    conversation_history=history
+            ):
+                chunks.append(chunk)
+                yield format_sse({"text": chunk}, event="token")
+
+            response = await voice_tutor_service.complete_answer(
+                topic=request.topic,
+                user_question=request.user_question,
+                text_response="".join(chunks)
+            )
+            yield format_sse(VoiceTutorResponse(**response).model_dump(), event="done")
+        except Exception as e:
+            yield format_sse({"message": str(e)}, event="error")
+
+    return sse_response(events())
+
+
+@router.post("/ask/speech")
+async def ask_voice_tutor_speech(
+        request: VoiceTutorRequest,
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Hace una pregunta al tutor de voz y devuelve texto y audio en streaming (SSE)
+
+    Eventos: "token" con cada fragmento de texto, "audio" con el audio de
+    cada frase en cuanto se sintetiza (índice, texto y data URI), "done" con
+    el texto completo y las sugerencias, y "error" si algo falla
+    """
+    if not request.user_question or not request.user_question.strip():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La pregunta del usuario no puede estar vacía"
+        )
+
+    history = [msg.model_dump() for msg in request.conversation_history]
+
+    async def events():
+        async for event, data in voice_tutor_service.stream_speech(
+                topic=request.topic,
+                user_question=request.user_question,
+                conversation_history=history
+        ):
+            yield format_sse(data, event=event)
+
+    return sse_response(events())
+
+
+@router.websocket("/ws")
+async def voice_tutor_session(
+        websocket: WebSocket,
+        token: Optional[str] = None,
+        conversation_id: Optional[uuid.UUID] = None,
+        topic: Optional[str] = None,
+        db: Session = Depends(get_db)
+):
+    """
+    Conversación persistente con el tutor de voz por WebSocket
+
+    Se autentica una sola vez al conectar (token en la query o cabecera
+    Authorization) y continúa la conversación conversation_id o crea una
+    nueva sobre topic. El historial queda en el servidor: el cliente envía
+    {"type": "ask", "question": "..."} y recibe por cada turno mensajes
+    "token", "audio" y "done" (o "error"). Los mensajes se guardan en segundo plano.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    token = token or (authorization[7:] if authorization.lower().startswith("bearer ") else None)
+    if not token:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="No autenticado")
+        return
+
+    try:
+        session = await open_voice_tutor_session(db, token, conversation_id, topic)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    await websocket.send_json({
+        "type": "ready",
+        "conversation_id": str(session.conversation_id),
+        "topic": session.topic,
+        "history": session.history
+    })
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await websocket.send_json({"type": "error", "message": "Mensaje JSON no válido"})
+                continue
+
+            if not isinstance(message, dict) or message.get("type") != "ask":
+                await websocket.send_json({"type": "error", "message": "Tipo de mensaje no soportado"})
+                continue
+
+            question = message.get("question")
+            if not isinstance(question, str) or not question.strip():
+                await websocket.send_json({"type": "error", "message": "La pregunta del usuario no puede estar vacía"})
+                continue
+
+            async for event, data in session.ask(question.strip()):
+                await websocket.send_json({"type": event, **data})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+
+
 @router.post("/conversations", response_model=VoiceConversationResponse, status_code=201)
 def create_voice_conversation(
         conversation_data: VoiceConversationCreate,
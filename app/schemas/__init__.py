@@ -48,7 +48,8 @@ from app.schemas.voice_tutor import (
 )
 from app.schemas.educational_video import (
     EducationalVideoRequest,
-    EducationalVideoResponse
+    EducationalVideoResponse,
+    VideoJobResponse
 )
 from app.schemas.aida_engagement import (
     AidaEngagementRequest,
@@ -95,6 +96,7 @@ __all__ = [
     "ConversationMessage",
     "EducationalVideoRequest",
     "EducationalVideoResponse",
+    "VideoJobResponse",
     "AidaEngagementRequest",
     "AidaEngagementResponse",
     "PomodoroRecommendationsRequest",
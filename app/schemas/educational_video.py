@@ -20,6 +20,12 @@ class EducationalVideoResponse(BaseModel):
     status: str
 
 
+class VideoScriptGeneration(BaseModel):
+    title: str
+    script: str
+    key_points: List[str]
+
+
 class EducationalVideoCreate(BaseModel):
     topic: str
     duration: str
@@ -51,4 +57,26 @@ class EducationalVideoDBResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class VideoJobResponse(BaseModel):
+    id: uuid.UUID
+    status: str  # created, scripting, rendering, done, error
+    progress: int
+    topic: str
+    duration: str
+    title: Optional[str] = None
+    provider_status: Optional[str] = None
+    error: Optional[str] = None
+    educational_video_id: Optional[uuid.UUID] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class VideoJobStatusResponse(VideoJobResponse):
+    video: Optional[EducationalVideoDBResponse] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 import uuid
@@ -39,5 +39,36 @@ class FlashcardGenerationRequest(BaseModel):
     topic: str
 
 
+class FlashcardMultiTopicRequest(BaseModel):
+    topics: List[str] = Field(..., min_length=1)
+
+
+class FlashcardTopicResult(BaseModel):
+    topic: str
+    success: bool
+    flashcards: List[FlashcardResponse] = []
+    error: Optional[str] = None
+
+
+class FlashcardMultiTopicResponse(BaseModel):
+    results: List[FlashcardTopicResult]
+    total_flashcards: int
+    failed_topics: int
+
+
+class FlashcardContent(BaseModel):
+    question: str
+    answer: str
+
+
 class FlashcardGenerationResponse(BaseModel):
-    flashcards: List[dict]  # [{question: str, answer: str}]
\ No newline at end of file
+    flashcards: List[FlashcardContent]
+
+
+class TopicFlashcards(BaseModel):
+    topic: str
+    flashcards: List[FlashcardContent]
+
+
+class MultiTopicFlashcardGenerationResponse(BaseModel):
+    decks: List[TopicFlashcards]
@@ -21,6 +21,15 @@ class VoiceTutorResponse(BaseModel):
     follow_up_suggestions: List[str]
 
 
+class FollowUpSuggestions(BaseModel):
+    suggestions: List[str]
+
+
+class TutorAnswer(BaseModel):
+    answer: str
+    suggestions: List[str]
+
+
 class VoiceConversationCreate(BaseModel):
     topic: str
     study_session_id: Optional[uuid.UUID] = None
@@ -1,5 +1,6 @@
 from typing import Dict, List
 from app.services.gemini_service import gemini_service
+from app.schemas.aida_engagement import AidaEngagementResponse
 
 
 class AidaService:
@@ -39,20 +40,19 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.9
+                profile="aida",
+                service="aida",
+                use_cache=True,
+                response_schema=AidaEngagementResponse
             )
 
-            attention = response.get("attention", "")
-            interest = response.get("interest", "")
-            desire = response.get("desire", [])
-
-            if not attention or not interest or len(desire) != 3:
+            if not response.attention or not response.interest or len(response.desire) < 3:
                 raise Exception("Contenido AIDA incompleto")
 
             return {
-                "attention": attention,
-                "interest": interest,
-                "desire": desire
+                "attention": response.attention,
+                "interest": response.interest,
+                "desire": response.desire[:3]
             }
 
         except Exception as e:
@@ -1,4 +1,5 @@
 from app.services.gemini_service import gemini_service
+from app.schemas.concept_map import ConceptMapGenerationResponse
 import re
 
 
@@ -35,10 +36,13 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.7
+                profile="concept_map",
+                service="concept_map",
+                use_cache=True,
+                response_schema=ConceptMapGenerationResponse
             )
 
-            mermaid_graph = response.get("mermaid_graph", "")
+            mermaid_graph = response.mermaid_graph
 
             if not mermaid_graph:
                 raise Exception("No se generó el mapa conceptual")
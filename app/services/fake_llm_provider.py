@@ -0,0 +1,244 @@
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Type, Union, get_args, get_origin
+from pydantic import BaseModel
+from app.services.llm_provider import LLMProvider
+from app.utils.key_pool import ApiKey
+from app.utils.resilience import UpstreamError
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+# Número de elementos pedido en el prompt ("Genera exactamente 10 tarjetas")
+_COUNT_RE = re.compile(r"exactamente\s+(\d+)", re.IGNORECASE)
+
+# Lista de temas de un prompt agrupado ("para CADA uno de estos temas:" y una línea "- tema" por tema)
+_TOPIC_LIST_RE = re.compile(r"estos temas:\s*\n((?:- .*\n?)+)", re.IGNORECASE)
+
+# Valores de campos con reglas propias en los servicios
+_OPTIONS_COUNT = 4
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Proveedor local determinista para pruebas de carga y benchmarks
+
+    No hace llamadas de red. Con response_schema devuelve JSON que cumple el
+    esquema (plantillas generadas a partir del modelo Pydantic o respuestas
+    fijas de un archivo de fixtures); sin esquema devuelve texto con
+    plantilla. La latencia sigue la distribución configurada (none, fixed,
+    uniform o lognormal) y una fracción error_rate de llamadas falla con 503.
+    """
+
+    name = "fake"
+
+    def __init__(
+            self,
+            latency_distribution: str = "lognormal",
+            latency_mean_ms: float = 300.0,
+            latency_stddev_ms: float = 100.0,
+            error_rate: float = 0.0,
+            seed: Optional[int] = None,
+            fixtures_path: Optional[str] = None
+    ):
+        self.latency_distribution = latency_distribution
+        self.latency_mean_ms = latency_mean_ms
+        self.latency_stddev_ms = latency_stddev_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.fixtures = self._load_fixtures(fixtures_path)
+        self.calls = 0
+
+    def _load_fixtures(self, path: Optional[str]) -> Dict[str, Any]:
+        """
+        Carga respuestas fijas: {"NombreDelEsquema": {...}, "text": "..."}
+        """
+        if not path:
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def sample_latency(self) -> float:
+        """
+        Latencia simulada en segundos
+        """
+        mean = self.latency_mean_ms / 1000
+        stddev = self.latency_stddev_ms / 1000
+
+        with self._random_lock:
+            if self.latency_distribution == "fixed":
+                return mean
+            if self.latency_distribution == "uniform":
+                return max(0.0, self._random.uniform(mean - stddev, mean + stddev))
+            if self.latency_distribution == "lognormal" and mean > 0:
+                # Parámetros de la normal subyacente para obtener la media y desviación pedidas
+                sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+                mu = math.log(mean) - sigma ** 2 / 2
+                return self._random.lognormvariate(mu, sigma)
+            return 0.0
+
+    def _should_fail(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _wait(self, latency: float, timeout: Optional[float]):
+        """
+        Simula la espera del proveedor respetando el timeout de la petición
+        """
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise UpstreamError("Tiempo de espera agotado (proveedor simulado)", status_code=504)
+        time.sleep(latency)
+
+    def generate(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Any:
+        self.calls += 1
+        self._wait(self.sample_latency(), timeout)
+
+        if self._should_fail():
+            raise UpstreamError("Error simulado del proveedor", status_code=503)
+
+        return self._response(prompt, self.render(prompt, generation_config))
+
+    def stream(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Iterable[Any]:
+        self.calls += 1
+        latency = self.sample_latency()
+        text = self.render(prompt, generation_config)
+        words = re.findall(r"\S+\s*", text)
+        chunks = [
+            "".join(words[index:index + 8])
+            for index in range(0, len(words), 8)
+        ] or [text]
+
+        # El primer fragmento tarda más (tiempo hasta el primer token)
+        self._wait(latency * 0.4, timeout)
+        if self._should_fail():
+            raise UpstreamError("Error simulado del proveedor", status_code=503)
+
+        step = latency * 0.6 / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(step)
+            if index == len(chunks) - 1:
+                yield self._response(prompt, chunk, full_text=text)
+            else:
+                yield SimpleNamespace(text=chunk, usage_metadata=None)
+
+    def _response(self, prompt: str, text: str, full_text: Optional[str] = None) -> Any:
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(full_text or text) // 4
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def render(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        """
+        Construye la respuesta determinista para el prompt
+        """
+        schema = (generation_config or {}).get("response_schema")
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+
+        if schema is not None:
+            if schema.__name__ in self.fixtures:
+                return json.dumps(self.fixtures[schema.__name__], ensure_ascii=False)
+
+            match = _COUNT_RE.search(prompt)
+            count = max(3, int(match.group(1))) if match else 3
+            data = _build_value(schema, "", count, digest)
+
+            # En los prompts agrupados cada grupo responde a uno de los temas pedidos
+            topics = _TOPIC_LIST_RE.search(prompt)
+            if topics and isinstance(data, dict):
+                names = [line[2:].strip() for line in topics.group(1).splitlines() if line.strip()]
+                for field, groups in data.items():
+                    if isinstance(groups, list) and groups and isinstance(groups[0], dict) and "topic" in groups[0]:
+                        data[field] = [{**groups[0], "topic": name} for name in names]
+
+            return json.dumps(data, ensure_ascii=False)
+
+        if "text" in self.fixtures:
+            return self.fixtures["text"]
+
+        # El análisis Feynman en streaming espera sus dos secciones
+        if "BRECHAS:" in prompt and "SIMPLIFICACIONES:" in prompt:
+            return (
+                f"BRECHAS:\nFalta explicar la idea central ({digest}).\n\n"
+                f"SIMPLIFICACIONES:\nUsa una analogía cotidiana y frases cortas."
+            )
+
+        return (
+            f"Respuesta simulada {digest}. Este texto lo genera el proveedor local "
+            f"para pruebas sin consumir cuota. Explica el tema de forma clara, con un "
+            f"ejemplo concreto y un resumen final."
+        )
+
+
+def _build_value(annotation: Any, field_name: str, count: int, digest: str, index: int = 0) -> Any:
+    """
+    Genera un valor válido para una anotación de tipo
+    """
+    origin = get_origin(annotation)
+
+    if origin is Union:
+        options = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _build_value(options[0], field_name, count, digest, index) if options else None
+
+    if origin in (list, List):
+        (item_type,) = get_args(annotation) or (str,)
+        size = _OPTIONS_COUNT if field_name == "options" else count
+        return [_build_value(item_type, field_name, count, digest, i) for i in range(size)]
+
+    if origin in (dict, Dict):
+        return {}
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _build_model(annotation, count, digest, index)
+
+    if annotation is bool:
+        return index % 2 == 0
+    if annotation is int:
+        return index + 1
+    if annotation is float:
+        return float(index + 1)
+
+    return _build_text(field_name, digest, index)
+
+
+def _build_model(model: Type[BaseModel], count: int, digest: str, index: int) -> Dict[str, Any]:
+    data = {
+        name: _build_value(field.annotation, name, count, digest, index)
+        for name, field in model.model_fields.items()
+    }
+
+    # La respuesta correcta de un quiz debe ser una de las opciones
+    if isinstance(data.get("options"), list) and "correct_answer" in data:
+        data["correct_answer"] = data["options"][0]
+
+    return data
+
+
+def _build_text(field_name: str, digest: str, index: int) -> str:
+    if field_name == "mermaid_graph":
+        return f"graph TD; A[Tema {digest}]; B[Concepto 1]; C[Concepto 2]; A --> B; A --> C;"
+    if field_name == "url":
+        return f"https://example.com/{digest}/{index + 1}"
+    if field_name in ("question", "suggestions"):
+        return f"¿Pregunta simulada {index + 1}?"
+    return f"{field_name or 'texto'} simulado {index + 1} ({digest})"
@@ -1,5 +1,6 @@
 from app.services.gemini_service import gemini_service
-from typing import Dict
+from app.schemas.feynman import FeynmanExplanationResponse, FeynmanAnalysisResponse
+from typing import Dict, AsyncIterator
 
 
 class FeynmanService:
@@ -7,6 +8,10 @@ class FeynmanService:
     Servicio para implementar la técnica de aprendizaje Feynman
     """
 
+    # Encabezados de las secciones del análisis en streaming
+    GAPS_HEADER = "BRECHAS:"
+    SIMPLIFICATIONS_HEADER = "SIMPLIFICACIONES:"
+
     async def get_explanation(self, topic: str) -> str:
         """
         Genera una explicación simple del tema (paso 1 de Feynman)
@@ -31,10 +36,13 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.7
+                profile="feynman_explain",
+                service="feynman",
+                use_cache=True,
+                response_schema=FeynmanExplanationResponse
             )
 
-            explanation = response.get("explanation", "")
+            explanation = response.explanation
 
             if not explanation:
                 raise Exception("No se generó la explicación")
@@ -76,11 +84,13 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.7
+                profile="feynman_analysis",
+                service="feynman",
+                response_schema=FeynmanAnalysisResponse
             )
 
-            gaps = response.get("gaps", "")
-            simplifications = response.get("simplifications", "")
+            gaps = response.gaps
+            simplifications = response.simplifications
 
             if not gaps or not simplifications:
                 raise Exception("No se generó el análisis completo")
@@ -93,6 +103,75 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
         except Exception as e:
             raise Exception(f"Error analizando explicación Feynman: {str(e)}")
 
+    async def stream_explanation(self, topic: str) -> AsyncIterator[str]:
+        """
+        Genera la explicación simple en streaming (paso 1 de Feynman)
+        """
+        system_instruction = """Eres un experto en la técnica Feynman. 
+Tu objetivo es explicar conceptos complejos de manera simple y comprensible."""
+
+        prompt = f"""Para el tema "{topic}", genera una explicación muy simple y concisa, 
+como si se la estuvieras explicando a un niño de 12 años. 
+
+Usa analogías si es posible. 
+No excedas las 100 palabras.
+
+Responde SOLO con la explicación en texto plano, sin títulos ni markdown."""
+
+        async for chunk in gemini_service.stream_text(
+                prompt=prompt,
+                system_instruction=system_instruction,
+                profile="feynman_explain",
+                service="feynman"
+        ):
+            yield chunk
+
+    async def stream_analysis(self, topic: str, user_explanation: str) -> AsyncIterator[str]:
+        """
+        Analiza la explicación del usuario en streaming (paso 2 de Feynman)
+        """
+        system_instruction = """Eres un profesor experto en la técnica Feynman. 
+Tu objetivo es ayudar a los estudiantes a identificar brechas en su comprensión."""
+
+        prompt = f"""El tema de estudio es "{topic}".
+La explicación del estudiante es: "{user_explanation}"
+
+Analiza su explicación y divídela en dos partes:
+1. Identifica 1-2 brechas clave o conceptos erróneos. Sé directo.
+2. Sugiere 1-2 formas de simplificar las partes complejas.
+
+Usa guiones (-) para cada punto. Dirígete al estudiante en segunda persona.
+
+Responde en texto plano usando EXACTAMENTE este formato:
+{self.GAPS_HEADER}
+- ...
+{self.SIMPLIFICATIONS_HEADER}
+- ..."""
+
+        async for chunk in gemini_service.stream_text(
+                prompt=prompt,
+                system_instruction=system_instruction,
+                profile="feynman_analysis",
+                service="feynman"
+        ):
+            yield chunk
+
+    def split_analysis(self, text: str) -> Dict[str, str]:
+        """
+        Separa el análisis en streaming en brechas y simplificaciones
+        """
+        gaps, _, simplifications = text.partition(self.SIMPLIFICATIONS_HEADER)
+        gaps = gaps.replace(self.GAPS_HEADER, "").strip()
+        simplifications = simplifications.strip()
+
+        if not gaps or not simplifications:
+            raise Exception("Error analizando explicación Feynman: No se generó el análisis completo")
+
+        return {
+            "gaps": gaps,
+            "simplifications": simplifications
+        }
+
 
 # Instancia singleton
 feynman_service = FeynmanService()
\ No newline at end of file
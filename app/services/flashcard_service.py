@@ -1,5 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Any
 from app.services.gemini_service import gemini_service
+from app.schemas.flashcard import FlashcardGenerationResponse, MultiTopicFlashcardGenerationResponse
+from app.config import get_settings
+from app.utils.concurrency import ConcurrencyLimitExceeded
+from app.utils.resilience import UpstreamError
+import asyncio
+
+settings = get_settings()
 
 
 class FlashcardService:
@@ -39,20 +46,147 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.8
+                profile="flashcards",
+                service="flashcards",
+                response_schema=FlashcardGenerationResponse
             )
 
-            flashcards = response.get("flashcards", [])
+            flashcards = [card.model_dump() for card in response.flashcards]
 
-            # Validar que tenemos exactamente el número correcto
-            if len(flashcards) != count:
+            # Validar que tenemos al menos el número pedido (las sobrantes se descartan)
+            if len(flashcards) < count:
                 raise Exception(f"Se esperaban {count} flashcards, pero se generaron {len(flashcards)}")
 
-            return flashcards
+            return flashcards[:count]
 
         except Exception as e:
             raise Exception(f"Error generando flashcards: {str(e)}")
 
 
+    async def generate_flashcards_batch(self, topics: List[str], count: int = 5) -> List[Dict[str, Any]]:
+        """
+        Genera flashcards para varios temas
+
+        Los temas se agrupan en el menor número de prompts que permite el
+        presupuesto de tokens; los prompts se lanzan con concurrencia acotada.
+        Los temas que falten en la respuesta o no se puedan interpretar se
+        reintentan de forma individual; si el proveedor rechaza el prompt
+        agrupado (límites, circuito abierto, errores de servicio) todos sus
+        temas fallan sin más llamadas. Devuelve un resultado por tema, en el orden recibido:
+        {"topic", "flashcards"} o {"topic", "error"}.
+        """
+        semaphore = asyncio.Semaphore(settings.FLASHCARD_BATCH_CONCURRENCY)
+        results: Dict[str, Dict[str, Any]] = {}
+
+        async def generate_single(topic: str):
+            async with semaphore:
+                try:
+                    results[topic] = {"topic": topic, "flashcards": await self.generate_flashcards(topic, count)}
+                except Exception as e:
+                    results[topic] = {"topic": topic, "error": str(e)}
+
+        async def generate_group(group: List[str]):
+            if len(group) == 1:
+                await generate_single(group[0])
+                return
+
+            async with semaphore:
+                try:
+                    decks = await self._generate_packed(group, count)
+                except (UpstreamError, ConcurrencyLimitExceeded) as e:
+                    # Repartir en llamadas individuales solo añadiría carga a un proveedor saturado
+                    for topic in group:
+                        results[topic] = {"topic": topic, "error": f"Error generando flashcards: {str(e)}"}
+                    return
+                except Exception:
+                    decks = {}
+
+            missing = []
+            for topic in group:
+                cards = decks.get(topic.casefold(), [])
+                if len(cards) >= count:
+                    results[topic] = {"topic": topic, "flashcards": cards[:count]}
+                else:
+                    missing.append(topic)
+
+            # Los temas que el prompt agrupado no resolvió se piden por separado
+            await asyncio.gather(*[generate_single(topic) for topic in missing])
+
+        await asyncio.gather(*[generate_group(group) for group in self._pack_topics(topics, count)])
+
+        return [results[topic] for topic in topics]
+
+    def _pack_topics(self, topics: List[str], count: int) -> List[List[str]]:
+        """
+        Agrupa los temas según el presupuesto de tokens de salida por prompt
+        """
+        budget = settings.FLASHCARD_BATCH_TOKEN_BUDGET
+        groups: List[List[str]] = []
+        current: List[str] = []
+        used = 0
+
+        for topic in topics:
+            # Tarjetas del tema más el nombre del tema repetido en la salida
+            cost = count * settings.FLASHCARD_BATCH_TOKENS_PER_CARD + len(topic) // 4 + 10
+            if current and used + cost > budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append(topic)
+            used += cost
+
+        if current:
+            groups.append(current)
+
+        return groups
+
+    async def _generate_packed(self, topics: List[str], count: int) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Genera las flashcards de varios temas en una sola llamada a Gemini
+        """
+        system_instruction = """Eres un experto en la técnica Feynman. 
+Genera tarjetas de estudio en español que ayuden a aprender mediante explicaciones simples."""
+
+        topic_list = "\n".join(f"- {topic}" for topic in topics)
+
+        prompt = f"""Genera tarjetas de estudio en español para CADA uno de estos temas:
+{topic_list}
+
+Cada tarjeta debe tener una 'question' y una 'answer'.
+- Tanto la pregunta como la respuesta deben tener un máximo de 15 palabras.
+- Explica el concepto en términos sencillos.
+- Genera exactamente {count} tarjetas de estudio por tema.
+- Usa en 'topic' el nombre del tema tal como aparece en la lista.
+
+Devuelve un objeto JSON con la siguiente estructura:
+{{
+  "decks": [
+    {{
+      "topic": "Fotosíntesis",
+      "flashcards": [
+        {{
+          "question": "¿Qué es la fotosíntesis?",
+          "answer": "El proceso que usan las plantas para convertir la energía luminosa en energía química."
+        }}
+      ]
+    }}
+  ]
+}}
+
+IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
+
+        response = await gemini_service.generate_json(
+            prompt=prompt,
+            system_instruction=system_instruction,
+            profile="flashcards_batch",
+            service="flashcards",
+            response_schema=MultiTopicFlashcardGenerationResponse
+        )
+
+        return {
+            deck.topic.strip().casefold(): [card.model_dump() for card in deck.flashcards]
+            for deck in response.decks
+        }
+
+
 # Instancia singleton
 flashcard_service = FlashcardService()
\ No newline at end of file
@@ -1,126 +1,794 @@
-import google.generativeai as genai
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Tuple, AsyncIterator, Type, Union
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 from app.config import get_settings
-import json
-import re
+from app.services.llm_provider import LLMProvider, build_llm_provider
+from app.utils.cache import ResponseCache, build_cache_backend
+from app.utils.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+    HedgeBudget,
+    LatencyWindow,
+    SingleFlight,
+    get_concurrency_limiter,
+    hedged_call
+)
+from app.utils.json_extractor import extract_json, JSONExtractionError
+from app.utils.metrics import metrics_registry
+from app.utils.resilience import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    UpstreamError,
+    call_with_resilience,
+    get_circuit_breaker,
+    get_status_code,
+    is_retryable
+)
+import asyncio
+import threading
+import time
 
 settings = get_settings()
 
+# Etiqueta para las llamadas que no indican el servicio que las origina
+UNTAGGED_SERVICE = "untagged"
+
+# Perfil de generación cuando el servicio no indica ninguno
+DEFAULT_PROFILE = "default"
+
+# Nivel usado para los perfiles que fijan un modelo concreto (sin alternativa)
+PINNED_TIER = "pinned"
+
 
 class GeminiService:
     """
     Servicio para interactuar con Google Gemini AI
     """
 
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        # Proveedor real (Gemini) o simulado según LLM_PROVIDER
+        self.provider = provider or build_llm_provider(settings.LLM_PROVIDER)
         # Usar modelo estable compatible
         self.model_name = 'gemini-2.5-flash'
+        self._generation_configs: Dict[Tuple[str, float, Optional[Type[BaseModel]]], Dict[str, Any]] = {}
+
+        # El SDK es síncrono: las llamadas se ejecutan en un pool acotado
+        # para no bloquear el event loop de uvicorn
+        self.max_workers = settings.GEMINI_MAX_WORKERS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="gemini"
+        )
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+
+        # Caché de respuestas (opcional por llamada)
+        backend = build_cache_backend(
+            settings.GEMINI_CACHE_BACKEND,
+            max_entries=settings.GEMINI_CACHE_MAX_ENTRIES,
+            path=settings.GEMINI_CACHE_PATH
+        )
+        self.cache = ResponseCache(backend) if backend else None
+
+        # Peticiones idénticas simultáneas comparten una sola llamada a Gemini
+        self.coalesce_requests = settings.GEMINI_COALESCE_REQUESTS
+        self._single_flight = SingleFlight()
+
+        # Duplicado de peticiones lentas en los perfiles con "hedge": True
+        self._hedge_budget = HedgeBudget(settings.GEMINI_HEDGE_MAX_RATIO, settings.GEMINI_HEDGE_BURST)
+        self._hedge_latencies: Dict[str, LatencyWindow] = {}
+
+    async def _run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta una función bloqueante en el pool de Gemini
+        """
+        with self._stats_lock:
+            self._queued += 1
+
+        def task():
+            with self._stats_lock:
+                self._queued -= 1
+                self._in_flight += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self._in_flight -= 1
+
+        future = self._executor.submit(task)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Si la tarea nunca llegó a ejecutarse no debe quedar contada en cola
+            if future.cancel():
+                with self._stats_lock:
+                    self._queued -= 1
+            raise
+
+    def get_executor_stats(self) -> Dict[str, int]:
+        """
+        Devuelve los indicadores del pool (cola y llamadas en curso)
+        """
+        with self._stats_lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight
+            }
+
+    def get_cache_stats(self) -> Optional[Dict[str, int]]:
+        """
+        Devuelve los contadores de la caché de respuestas
+        """
+        return self.cache.stats() if self.cache else None
+
+    def get_coalescing_stats(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de peticiones agrupadas
+        """
+        return self._single_flight.stats()
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        """
+        Lee de la caché; los backends con E/S (SQLite) se leen fuera del event loop
+        """
+        if self.cache.backend.blocking:
+            return await run_in_threadpool(self.cache.get, key)
+        return self.cache.get(key)
+
+    async def _cache_set(self, key: str, value: str, ttl: int):
+        if self.cache.backend.blocking:
+            await run_in_threadpool(self.cache.set, key, value, ttl)
+        else:
+            self.cache.set(key, value, ttl)
+
+    def _cache_key(
+            self,
+            prompt: str,
+            system_instruction: Optional[str],
+            profile: str,
+            temperature: float,
+            response_schema: Optional[Type[BaseModel]] = None
+    ) -> str:
+        """
+        Clave de caché y de agrupación: (modelo, perfil, instrucción de sistema, prompt, temperatura)
+        """
+        schema_name = response_schema.__name__ if response_schema else None
+        return ResponseCache.make_key(
+            self._profile_model(profile), profile, system_instruction, prompt, temperature, schema_name
+        )
+
+    def _profile(self, name: str) -> Dict[str, Any]:
+        """
+        Obtiene un perfil de generación de la configuración
+        """
+        try:
+            return settings.GEMINI_PROFILES[name]
+        except KeyError:
+            raise ValueError(f"Perfil de generación desconocido: {name}")
+
+    def _profile_model(self, name: str) -> str:
+        return self._route(name)[0][1]
+
+    def _route(self, profile: str) -> List[Tuple[str, str]]:
+        """
+        Niveles de modelo para un perfil: [(nivel, modelo)], el principal primero
+
+        Los perfiles con "model" usan ese modelo sin alternativa; el resto se
+        enruta según GEMINI_TIER_ROUTES y, si GEMINI_TIER_FALLBACK está activo,
+        recurre al otro nivel cuando el principal falla.
+        """
+        pinned_model = self._profile(profile).get("model")
+        if pinned_model:
+            return [(PINNED_TIER, pinned_model)]
+
+        tiers = settings.GEMINI_MODEL_TIERS
+        routes = settings.GEMINI_TIER_ROUTES
+        primary = routes.get(profile, routes.get(DEFAULT_PROFILE, "capable"))
+
+        order = [primary]
+        if settings.GEMINI_TIER_FALLBACK:
+            order += [tier for tier in tiers if tier != primary]
+
+        return [(tier, tiers[tier]["model"]) for tier in order]
+
+    def _should_fallback(self, error: Exception) -> bool:
+        """
+        Indica si un fallo del nivel principal justifica probar el otro nivel
+        """
+        if isinstance(error, (CircuitOpenError, DeadlineExceededError, ConcurrencyLimitExceeded)):
+            return True
+        return is_retryable(error)
+
+    def _resolve_profile(self, profile: Optional[str], temperature: Optional[float]) -> Tuple[str, float]:
+        """
+        Devuelve el perfil a usar y su temperatura (la indicada explícitamente tiene prioridad)
+        """
+        profile = profile or DEFAULT_PROFILE
+        if temperature is None:
+            temperature = self._profile(profile).get("temperature", 0.7)
+        return profile, temperature
+
+    def _cache_ttl(self, service: Optional[str], cache_ttl: Optional[int]) -> int:
+        """
+        Obtiene el TTL de caché para el servicio que llama
+        """
+        if cache_ttl is not None:
+            return cache_ttl
+        ttls = settings.GEMINI_CACHE_TTLS
+        return ttls.get(service or "default", ttls.get("default", 3600))
+
+    def _record_call(self, operation: str, service: str, outcome: str, started: float):
+        """
+        Registra el resultado y la latencia de una llamada
+        """
+        metrics_registry.increment(
+            "llm_requests_total", service=service, operation=operation, outcome=outcome
+        )
+        metrics_registry.observe(
+            "llm_latency_seconds", time.perf_counter() - started, service=service, operation=operation
+        )
+
+    def _record_usage(self, service: str, response: Any, tier: Optional[str] = None):
+        """
+        Registra los tokens consumidos según usage_metadata de la respuesta
+        y su coste estimado con los precios del nivel de modelo
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        response_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        metrics_registry.increment("llm_prompt_tokens_total", prompt_tokens, service=service)
+        metrics_registry.increment("llm_response_tokens_total", response_tokens, service=service)
+
+        prices = settings.GEMINI_MODEL_TIERS.get(tier) if tier else None
+        if prices:
+            cost = (
+                prompt_tokens * prices.get("input_cost_per_million", 0)
+                + response_tokens * prices.get("output_cost_per_million", 0)
+            ) / 1_000_000
+            metrics_registry.increment("llm_cost_usd_total", cost, service=service, tier=tier)
+
+    def _record_tier(self, tier: str, model_name: str, outcome: str, started: float):
+        """
+        Registra la latencia de una llamada por nivel de modelo
+        """
+        metrics_registry.increment("llm_tier_requests_total", tier=tier, model=model_name, outcome=outcome)
+        metrics_registry.observe(
+            "llm_tier_latency_seconds", time.perf_counter() - started, tier=tier, model=model_name
+        )
+
+    def _record_fallback(self, service: str, from_tier: str, to_tier: str):
+        metrics_registry.increment(
+            "llm_tier_fallbacks_total", service=service, from_tier=from_tier, to_tier=to_tier
+        )
+
+    def _record_retry(self, service: str, provider: str) -> Callable[[int, Exception], None]:
+        def on_retry(attempt: int, error: Exception):
+            metrics_registry.increment("llm_retries_total", service=service, provider=provider)
+        return on_retry
+
+    def shutdown(self):
+        """
+        Libera el pool de hilos
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     async def generate_text(
             self,
             prompt: str,
             system_instruction: Optional[str] = None,
-            temperature: float = 0.7
+            temperature: Optional[float] = None,
+            service: Optional[str] = None,
+            use_cache: bool = False,
+            cache_ttl: Optional[int] = None,
+            response_schema: Optional[Type[BaseModel]] = None,
+            profile: Optional[str] = None
     ) -> str:
         """
         Genera texto usando Gemini
+
+        profile selecciona el perfil de generación (modelo, temperatura,
+        límite de tokens y secuencias de parada) definido en GEMINI_PROFILES.
+        Con use_cache=True la respuesta se guarda en caché con el TTL del servicio.
+        Con response_schema el modelo devuelve JSON que respeta ese esquema.
+        service identifica al servicio que llama en las métricas.
         """
+        service = service or UNTAGGED_SERVICE
+        profile, temperature = self._resolve_profile(profile, temperature)
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            generation_config = {
-                "temperature": temperature,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
+            text, from_cache = await self._generate_text(
+                prompt, system_instruction, profile, temperature, service,
+                use_cache=use_cache, cache_ttl=cache_ttl, response_schema=response_schema
+            )
+            outcome = "cache_hit" if from_cache else "success"
+            return text
+        finally:
+            self._record_call("generate_text", service, outcome, started)
+
+    async def _generate_text(
+            self,
+            prompt: str,
+            system_instruction: Optional[str],
+            profile: str,
+            temperature: float,
+            service: str,
+            use_cache: bool = False,
+            cache_ttl: Optional[int] = None,
+            response_schema: Optional[Type[BaseModel]] = None
+    ) -> Tuple[str, bool]:
+        """
+        Genera texto sin registrar métricas de llamada; indica si vino de la caché
+        """
+        key = self._cache_key(prompt, system_instruction, profile, temperature, response_schema)
 
-            # Construir el prompt completo SIEMPRE combinando ambos
-            if system_instruction:
-                full_prompt = f"{system_instruction}\n\n{prompt}"
-            else:
-                full_prompt = prompt
+        cache_key = None
+        if use_cache and self.cache:
+            cache_key = key
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return cached, True
 
-            # Crear modelo SIN parámetros adicionales
-            model = genai.GenerativeModel(
-                model_name=self.model_name
+        def call():
+            return self._generate_text_uncached(
+                prompt, system_instruction, profile, temperature, service, response_schema=response_schema
             )
 
-            # Generar contenido con la configuración
-            response = model.generate_content(
-                full_prompt,
-                generation_config=generation_config
+        if self.coalesce_requests:
+            # Cada solicitante recibe el texto y lo parsea por su cuenta
+            text = await self._single_flight.do(key, call)
+        else:
+            text = await call()
+
+        if cache_key:
+            await self._cache_set(cache_key, text, self._cache_ttl(service, cache_ttl))
+
+        return text, False
+
+    async def _generate_text_uncached(
+            self,
+            prompt: str,
+            system_instruction: Optional[str],
+            profile: str,
+            temperature: float,
+            service: str = UNTAGGED_SERVICE,
+            response_schema: Optional[Type[BaseModel]] = None
+    ) -> str:
+        """
+        Llama a Gemini sin pasar por la caché
+        """
+        try:
+            full_prompt, generation_config = self._build_request(
+                prompt, system_instruction, profile, temperature, response_schema=response_schema
             )
 
+            route = self._route(profile)
+            response = None
+
+            for index, (tier, model_name) in enumerate(route):
+                if index:
+                    self._record_fallback(service, route[index - 1][0], tier)
+
+                # Generar contenido con la configuración (fuera del event loop),
+                # con reintentos, circuito y presupuesto de tiempo. El nivel
+                # alternativo tiene un único intento para acotar la latencia total.
+                # La clave se reserva antes: esperarla no ocupa turno del
+                # limitador ni cuenta como fallo del proveedor
+                async def call(tier=tier, model_name=model_name, index=index):
+                    api_key = await self.provider.acquire_key(settings.GEMINI_TIMEOUT_SECONDS)
+                    return await call_with_resilience(
+                        f"gemini:{tier}",
+                        lambda timeout: self._run_blocking(
+                            self.provider.generate,
+                            model_name,
+                            full_prompt,
+                            generation_config,
+                            timeout,
+                            api_key
+                        ),
+                        attempt_timeout=settings.GEMINI_TIMEOUT_SECONDS,
+                        deadline=settings.GEMINI_DEADLINE_SECONDS if index == 0 else settings.GEMINI_TIMEOUT_SECONDS,
+                        on_retry=self._record_retry(service, f"gemini:{tier}")
+                    )
+
+                tier_started = time.perf_counter()
+                try:
+                    if index == 0 and self._profile(profile).get("hedge"):
+                        response = await self._call_hedged(profile, service, call)
+                    else:
+                        response = await call()
+                except Exception as e:
+                    self._record_tier(tier, model_name, "error", tier_started)
+                    if index == len(route) - 1 or not self._should_fallback(e):
+                        raise
+                    continue
+
+                self._record_tier(tier, model_name, "success", tier_started)
+                self._record_usage(service, response, tier)
+                break
+
             # Verificar que hay respuesta
             if not response or not response.text:
                 raise Exception("No se recibió respuesta del modelo")
 
             return response.text
 
+        except (UpstreamError, ConcurrencyLimitExceeded):
+            # Circuito abierto, plazo agotado y saturación conservan su tipo
+            raise
         except Exception as e:
-            raise Exception(f"Error generando texto con Gemini: {str(e)}")
+            raise UpstreamError(
+                f"Error generando texto con Gemini: {str(e)}",
+                status_code=get_status_code(e),
+                retryable=is_retryable(e)
+            )
+
+    def _hedge_delay(self, window: LatencyWindow) -> float:
+        """
+        Espera antes de duplicar: el percentil configurado de las latencias recientes
+        """
+        if len(window) < settings.GEMINI_HEDGE_MIN_SAMPLES:
+            return settings.GEMINI_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(settings.GEMINI_HEDGE_MIN_DELAY_SECONDS, window.percentile(settings.GEMINI_HEDGE_PERCENTILE))
+
+    async def _call_hedged(self, profile: str, service: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Llama a Gemini y, si tarda más de lo habitual para el perfil, lanza un
+        duplicado y usa la primera respuesta con texto
+
+        Los duplicados se limitan con el presupuesto de hedging. El perdedor se
+        cancela: si aún esperaba turno en el pool no llega a ejecutarse.
+        """
+        window = self._hedge_latencies.setdefault(profile, LatencyWindow())
+        self._hedge_budget.record_request()
+
+        async def timed_call():
+            started = time.perf_counter()
+            try:
+                response = await call()
+            except asyncio.CancelledError:
+                # La latencia real es al menos la transcurrida
+                window.add(time.perf_counter() - started)
+                raise
+            window.add(time.perf_counter() - started)
+            return response
+
+        def can_hedge() -> bool:
+            if self._hedge_budget.try_spend():
+                return True
+            metrics_registry.increment("llm_hedges_total", service=service, outcome="budget_exhausted")
+            return False
+
+        response, hedge_won = await hedged_call(
+            timed_call,
+            self._hedge_delay(window),
+            can_hedge,
+            is_valid=self._has_text,
+            on_hedge=lambda: metrics_registry.increment("llm_hedges_total", service=service, outcome="launched")
+        )
+        if hedge_won:
+            metrics_registry.increment("llm_hedges_total", service=service, outcome="won")
+        return response
+
+    @staticmethod
+    def _has_text(response: Any) -> bool:
+        try:
+            return bool(response.text)
+        except ValueError:
+            # Respuesta sin texto (p. ej. bloqueada por seguridad)
+            return False
+
+    def _generation_config(
+            self,
+            profile: str,
+            temperature: float,
+            response_schema: Optional[Type[BaseModel]] = None
+    ) -> Dict[str, Any]:
+        """
+        Configuración de generación, construida una sola vez por combinación
+
+        El diccionario se comparte entre llamadas y no debe modificarse: el
+        proveedor lo usa como clave de su registro de modelos.
+        """
+        key = (profile, temperature, response_schema)
+        generation_config = self._generation_configs.get(key)
+        if generation_config is not None:
+            return generation_config
+
+        profile_settings = self._profile(profile)
+        generation_config = {
+            "temperature": temperature,
+            "top_p": profile_settings.get("top_p", 0.95),
+            "top_k": profile_settings.get("top_k", 40),
+            "max_output_tokens": profile_settings.get("max_output_tokens", 8192),
+        }
+
+        if profile_settings.get("stop_sequences"):
+            generation_config["stop_sequences"] = list(profile_settings["stop_sequences"])
+
+        # Modo JSON con esquema: Gemini restringe la salida a la estructura pedida
+        if response_schema is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = response_schema
+
+        self._generation_configs[key] = generation_config
+        return generation_config
+
+    def _build_request(
+            self,
+            prompt: str,
+            system_instruction: Optional[str],
+            profile: str,
+            temperature: float,
+            response_schema: Optional[Type[BaseModel]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Construye el prompt completo y la configuración de generación
+        """
+        generation_config = self._generation_config(profile, temperature, response_schema)
+
+        # Construir el prompt completo SIEMPRE combinando ambos
+        if system_instruction:
+            full_prompt = f"{system_instruction}\n\n{prompt}"
+        else:
+            full_prompt = prompt
+
+        return full_prompt, generation_config
+
+    async def stream_text(
+            self,
+            prompt: str,
+            system_instruction: Optional[str] = None,
+            temperature: Optional[float] = None,
+            service: Optional[str] = None,
+            profile: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Genera texto usando Gemini y lo entrega por fragmentos a medida que llega
+        """
+        service = service or UNTAGGED_SERVICE
+        profile, temperature = self._resolve_profile(profile, temperature)
+        started = time.perf_counter()
+        outcome = "error"
+        full_prompt, generation_config = self._build_request(prompt, system_instruction, profile, temperature)
+        route = self._route(profile)
+        received_text = False
+
+        try:
+            for index, (tier, model_name) in enumerate(route):
+                if index:
+                    self._record_fallback(service, route[index - 1][0], tier)
+
+                tier_started = time.perf_counter()
+                stream = self._stream_from_tier(tier, model_name, full_prompt, generation_config, service)
+                try:
+                    async for text in stream:
+                        if not received_text:
+                            metrics_registry.observe(
+                                "llm_time_to_first_token_seconds", time.perf_counter() - started, service=service
+                            )
+                            received_text = True
+                        yield text
+                except Exception as e:
+                    self._record_tier(tier, model_name, "error", tier_started)
+                    # Solo se cambia de nivel si aún no se ha enviado texto al cliente
+                    if received_text or index == len(route) - 1 or not self._should_fallback(e):
+                        if isinstance(e, CircuitOpenError):
+                            outcome = "circuit_open"
+                        raise
+                    continue
+                finally:
+                    await stream.aclose()
+
+                self._record_tier(tier, model_name, "success", tier_started)
+                break
+
+            if not received_text:
+                raise Exception("Error generando texto con Gemini: No se recibió respuesta del modelo")
+            outcome = "success"
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._record_call("stream_text", service, outcome, started)
+
+    async def _stream_from_tier(
+            self,
+            tier: str,
+            model_name: str,
+            full_prompt: str,
+            generation_config: Dict[str, Any],
+            service: str
+    ) -> AsyncIterator[str]:
+        """
+        Transmite la respuesta de un nivel de modelo concreto
+        """
+        # La clave se reserva antes de ocupar turno del limitador o un hilo del pool
+        api_key = await self.provider.acquire_key(settings.GEMINI_TIMEOUT_SECONDS)
+
+        # Sin reintentos (ya se pudo haber enviado texto al cliente), pero sí circuito
+        breaker = get_circuit_breaker(f"gemini:{tier}")
+        # El turno del limitador se mantiene todo el stream; la latencia
+        # que lo ajusta es la del primer fragmento
+        limiter = get_concurrency_limiter(f"gemini:{tier}")
+        started = await limiter.acquire() if limiter is not None else None
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            if limiter is not None:
+                limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+            raise
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        end_of_stream = object()
+
+        def produce():
+            # Se ejecuta en el pool: itera el stream síncrono del SDK
+            try:
+                response = self.provider.stream(
+                    model_name,
+                    full_prompt,
+                    generation_config,
+                    settings.GEMINI_TIMEOUT_SECONDS,
+                    api_key
+                )
+                last_chunk = None
+                for chunk in response:
+                    last_chunk = chunk
+                    if stop.is_set():
+                        break
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Fragmento sin texto (p. ej. bloqueado por seguridad)
+                        continue
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+                # El último fragmento trae el uso total de tokens
+                if last_chunk is not None:
+                    self._record_usage(service, last_chunk, tier)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+
+        # El productor captura sus errores y los entrega por la cola
+        asyncio.ensure_future(self._run_blocking(produce))
+        outcome_recorded = False
+        limiter_outcome = AdaptiveConcurrencyLimiter.IGNORE
+        first_token_latency = None
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is end_of_stream:
+                    break
+                if isinstance(item, Exception):
+                    outcome_recorded = True
+                    if is_retryable(item):
+                        breaker.record_failure()
+                        limiter_outcome = AdaptiveConcurrencyLimiter.OVERLOAD
+                    else:
+                        breaker.record_success()
+                    raise UpstreamError(
+                        f"Error generando texto con Gemini: {str(item)}",
+                        status_code=get_status_code(item),
+                        retryable=is_retryable(item)
+                    )
+                if first_token_latency is None and started is not None:
+                    first_token_latency = time.monotonic() - started
+                yield item
+
+            outcome_recorded = True
+            breaker.record_success()
+            limiter_outcome = AdaptiveConcurrencyLimiter.SUCCESS
+        finally:
+            # Si el cliente se desconecta se detiene la lectura del stream
+            stop.set()
+            if not outcome_recorded:
+                breaker.release()
+            if limiter is not None:
+                limiter.release(started, limiter_outcome, first_token_latency)
 
     async def generate_json(
             self,
             prompt: str,
             system_instruction: Optional[str] = None,
-            temperature: float = 0.7
-    ) -> Dict[str, Any]:
+            temperature: Optional[float] = None,
+            service: Optional[str] = None,
+            use_cache: bool = False,
+            cache_ttl: Optional[int] = None,
+            response_schema: Optional[Type[BaseModel]] = None,
+            profile: Optional[str] = None
+    ) -> Union[Dict[str, Any], BaseModel]:
         """
         Genera respuesta en formato JSON
+
+        Si se indica response_schema (modelo Pydantic) se usa como esquema de
+        respuesta de Gemini y se devuelve una instancia validada de ese modelo
         """
+        service = service or UNTAGGED_SERVICE
+        profile, temperature = self._resolve_profile(profile, temperature)
+        started = time.perf_counter()
+        outcome = "error"
         try:
             # Agregar instrucción explícita para JSON al final del prompt
             json_instruction = "\n\nIMPORTANTE: Devuelve ÚNICAMENTE un objeto JSON válido. No incluyas texto adicional, no uses bloques de código markdown (```json o ```), no agregues explicaciones. Solo el JSON puro comenzando con { y terminando con }."
 
             full_prompt = prompt + json_instruction
 
-            text_response = await self.generate_text(
-                prompt=full_prompt,
-                system_instruction=system_instruction,
-                temperature=temperature
+            # Solo se guardan en caché respuestas que se pudieron parsear
+            cache_key = None
+            cached = None
+            if use_cache and self.cache:
+                cache_key = self._cache_key(full_prompt, system_instruction, profile, temperature, response_schema)
+                cached = await self._cache_get(cache_key)
+
+            if cached is not None:
+                result = self._parse_json_response(cached, response_schema, service)
+                outcome = "cache_hit"
+                return result
+
+            text_response, _ = await self._generate_text(
+                full_prompt, system_instruction, profile, temperature, service,
+                response_schema=response_schema
             )
 
-            cleaned_text = text_response.strip()
+            result = self._parse_json_response(text_response, response_schema, service)
+
+            if cache_key:
+                await self._cache_set(cache_key, text_response, self._cache_ttl(service, cache_ttl))
 
-            # Eliminar bloques de markdown si existen
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            elif cleaned_text.startswith("```"):
-                cleaned_text = cleaned_text[3:]
+            outcome = "success"
+            return result
 
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
+        except (UpstreamError, ConcurrencyLimitExceeded):
+            # Los errores del proveedor llegan intactos; solo se envuelven los de parseo
+            raise
+        except Exception as e:
+            raise Exception(f"Error generando JSON con Gemini: {str(e)}")
+        finally:
+            self._record_call("generate_json", service, outcome, started)
 
-            cleaned_text = cleaned_text.strip()
+    def _parse_json_response(
+            self,
+            text_response: str,
+            response_schema: Optional[Type[BaseModel]] = None,
+            service: str = UNTAGGED_SERVICE
+    ) -> Union[Dict[str, Any], BaseModel]:
+        """
+        Extrae el JSON de la respuesta del modelo
+        """
+        try:
+            data = extract_json(text_response)
+        except JSONExtractionError as e:
+            metrics_registry.increment("llm_json_parse_total", service=service, outcome="invalid_json")
+            raise Exception(f"No se pudo extraer JSON válido: {str(e)}")
 
-            # Intentar parsear el JSON
+        if response_schema is not None:
             try:
-                return json.loads(cleaned_text)
-            except json.JSONDecodeError:
-                # Si falla, intentar extraer JSON del texto
-                json_match = re.search(r'\{.*\}', cleaned_text, re.DOTALL)
-                if json_match:
-                    try:
-                        return json.loads(json_match.group(0))
-                    except json.JSONDecodeError:
-                        pass
+                result = response_schema.model_validate(data)
+            except ValidationError as e:
+                metrics_registry.increment("llm_json_parse_total", service=service, outcome="schema_mismatch")
+                raise Exception(f"La respuesta no cumple el esquema {response_schema.__name__}: {str(e)}")
+            metrics_registry.increment("llm_json_parse_total", service=service, outcome="success")
+            return result
 
-                # Si aún falla, intentar encontrar un array JSON
-                array_match = re.search(r'\[.*\]', cleaned_text, re.DOTALL)
-                if array_match:
-                    try:
-                        return {"data": json.loads(array_match.group(0))}
-                    except json.JSONDecodeError:
-                        pass
+        metrics_registry.increment("llm_json_parse_total", service=service, outcome="success")
 
-                raise Exception(f"No se pudo extraer JSON válido. Respuesta recibida: {cleaned_text[:500]}...")
+        # Los arrays sueltos se envuelven para mantener la respuesta como objeto
+        if isinstance(data, list):
+            return {"data": data}
 
-        except json.JSONDecodeError as e:
-            raise Exception(
-                f"Error parseando JSON de Gemini. Respuesta recibida: {cleaned_text[:200]}... Error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Error generando JSON con Gemini: {str(e)}")
+        return data
 
     async def generate_audio(
             self,
@@ -135,15 +803,24 @@ class GeminiService:
             from gtts import gTTS
             import io
 
-            # Crear TTS
-            tts = gTTS(text=text, lang='es', slow=False)
+            def synthesize(timeout: Optional[float]) -> bytes:
+                # Crear TTS
+                tts = gTTS(text=text, lang='es', slow=False, timeout=timeout)
 
-            # Guardar en bytes
-            audio_fp = io.BytesIO()
-            tts.write_to_fp(audio_fp)
-            audio_fp.seek(0)
+                # Guardar en bytes
+                audio_fp = io.BytesIO()
+                tts.write_to_fp(audio_fp)
+                audio_fp.seek(0)
 
-            return audio_fp.read()
+                return audio_fp.read()
+
+            # gTTS hace peticiones HTTP bloqueantes
+            return await call_with_resilience(
+                "tts",
+                lambda timeout: self._run_blocking(synthesize, timeout),
+                attempt_timeout=settings.TTS_TIMEOUT_SECONDS,
+                deadline=settings.TTS_DEADLINE_SECONDS
+            )
 
         except ImportError:
             raise Exception("gTTS no está instalado. Ejecuta: pip install gTTS")
@@ -0,0 +1,245 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.config import get_settings
+from app.utils.key_pool import ApiKey, ApiKeyPool
+from app.utils.resilience import UpstreamError, is_quota_error
+import threading
+
+settings = get_settings()
+
+
+class KeysExhaustedError(UpstreamError):
+    """
+    Ninguna clave de API tiene capacidad: es un límite local, no un fallo del proveedor
+
+    No se reintenta ni cambia de nivel de modelo (las claves son las mismas)
+    """
+
+    def __init__(self):
+        super().__init__(
+            "Todas las claves de Gemini han alcanzado su límite de peticiones",
+            status_code=429,
+            retryable=False
+        )
+
+
+class LLMProvider:
+    """
+    Interfaz de un proveedor de modelos de lenguaje
+
+    Las llamadas son bloqueantes: GeminiService las ejecuta en su pool de
+    hilos. Las respuestas exponen .text y .usage_metadata (prompt_token_count,
+    candidates_token_count), igual que las del SDK de Gemini. Antes de cada
+    llamada GeminiService reserva una clave con acquire_key (en el event
+    loop) y la pasa como api_key.
+    """
+
+    name = "base"
+
+    async def acquire_key(self, timeout: Optional[float] = None) -> Optional[ApiKey]:
+        """
+        Reserva la clave de la siguiente llamada; None si el proveedor no usa claves
+        """
+        return None
+
+    def generate(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Any:
+        """
+        Genera la respuesta completa
+        """
+        raise NotImplementedError
+
+    def stream(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Iterable[Any]:
+        """
+        Genera la respuesta por fragmentos; el último trae el uso de tokens
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Proveedor real: Google Gemini mediante google-generativeai
+
+    Mantiene un registro de GenerativeModel por (modelo, configuración de
+    generación, clave), creados la primera vez que se usan. Con una sola
+    clave todos comparten el cliente del SDK del proceso; con varias, cada
+    clave tiene su propio GenerativeServiceClient (API pública de
+    google-ai-generativelanguage, con sus conexiones) y las peticiones se
+    reparten con el pool de claves.
+
+    El SDK no permite pasar el cliente a GenerativeModel, así que se asigna
+    en su atributo _client; la versión del SDK está fijada en
+    requirements.txt y tests/test_llm_provider.py comprueba ese atributo.
+    """
+
+    name = "gemini"
+
+    def __init__(
+            self,
+            api_keys: List[str],
+            requests_per_minute: Optional[float] = None,
+            burst: float = 10.0,
+            cooldown_seconds: float = 60.0
+    ):
+        import google.generativeai as genai
+
+        self._genai = genai
+        genai.configure(api_key=api_keys[0])
+        self.key_pool = ApiKeyPool(
+            api_keys,
+            requests_per_minute=requests_per_minute,
+            burst=burst,
+            cooldown_seconds=cooldown_seconds
+        )
+        self._clients: Dict[int, Any] = {}
+        self._models: Dict[Tuple, Any] = {}
+        self._models_lock = threading.Lock()
+
+    def _client_for(self, api_key: ApiKey) -> Any:
+        """
+        Cliente propio de una clave (genai.configure solo admite una clave global)
+        """
+        from google.ai import generativelanguage as glm
+
+        return glm.GenerativeServiceClient(client_options={"api_key": api_key.value})
+
+    def get_model(
+            self,
+            model_name: str,
+            generation_config: Dict[str, Any],
+            api_key: Optional[ApiKey] = None
+    ) -> Any:
+        """
+        Devuelve el modelo para la combinación pedida, creándolo una sola vez
+        """
+        key_index = api_key.index if api_key is not None and len(self.key_pool) > 1 else None
+        key = (model_name, key_index, tuple(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in sorted(generation_config.items())
+        ))
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config
+                )
+                if key_index is not None:
+                    if key_index not in self._clients:
+                        self._clients[key_index] = self._client_for(api_key)
+                    if not hasattr(model, "_client"):
+                        raise RuntimeError("Esta versión de google-generativeai no admite un cliente por clave")
+                    model._client = self._clients[key_index]
+                self._models[key] = model
+            return model
+
+    async def acquire_key(self, timeout: Optional[float] = None) -> ApiKey:
+        api_key = await self.key_pool.acquire(timeout)
+        if api_key is None:
+            raise KeysExhaustedError()
+        return api_key
+
+    def _key_for_call(self, api_key: Optional[ApiKey]) -> ApiKey:
+        """
+        Clave reservada por el llamador o, en llamadas directas, una libre sin esperar
+        """
+        api_key = api_key or self.key_pool.try_acquire()
+        if api_key is None:
+            raise KeysExhaustedError()
+        return api_key
+
+    def _report_error(self, api_key: ApiKey, error: Exception):
+        if is_quota_error(error):
+            self.key_pool.report_throttled(api_key)
+        else:
+            self.key_pool.report_error(api_key)
+
+    def generate(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Any:
+        api_key = self._key_for_call(api_key)
+        model = self.get_model(model_name, generation_config, api_key)
+        try:
+            return model.generate_content(
+                prompt,
+                request_options={"timeout": timeout} if timeout else None
+            )
+        except Exception as e:
+            self._report_error(api_key, e)
+            raise
+
+    def stream(
+            self,
+            model_name: str,
+            prompt: str,
+            generation_config: Dict[str, Any],
+            timeout: Optional[float] = None,
+            api_key: Optional[ApiKey] = None
+    ) -> Iterable[Any]:
+        api_key = self._key_for_call(api_key)
+        model = self.get_model(model_name, generation_config, api_key)
+        try:
+            yield from model.generate_content(
+                prompt,
+                stream=True,
+                request_options={"timeout": timeout} if timeout else None
+            )
+        except Exception as e:
+            self._report_error(api_key, e)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "models": len(self._models), "keys": self.key_pool.stats()}
+
+
+def build_llm_provider(name: str) -> LLMProvider:
+    """
+    Crea el proveedor configurado (gemini o fake)
+    """
+    name = (name or "gemini").lower()
+
+    if name == "gemini":
+        return GeminiProvider(
+            api_keys=settings.GEMINI_API_KEYS or [settings.GEMINI_API_KEY],
+            requests_per_minute=settings.GEMINI_KEY_REQUESTS_PER_MINUTE,
+            burst=settings.GEMINI_KEY_BURST,
+            cooldown_seconds=settings.GEMINI_KEY_COOLDOWN_SECONDS
+        )
+
+    if name == "fake":
+        from app.services.fake_llm_provider import FakeLLMProvider
+
+        return FakeLLMProvider(
+            latency_distribution=settings.FAKE_LLM_LATENCY_DISTRIBUTION,
+            latency_mean_ms=settings.FAKE_LLM_LATENCY_MEAN_MS,
+            latency_stddev_ms=settings.FAKE_LLM_LATENCY_STDDEV_MS,
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            seed=settings.FAKE_LLM_SEED,
+            fixtures_path=settings.FAKE_LLM_FIXTURES_PATH
+        )
+
+    raise ValueError(f"Proveedor de LLM no soportado: {name}")
@@ -0,0 +1,347 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from urllib.parse import quote
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.educational_video import EducationalVideo
+from app.models.video_media import VideoMedia
+from app.utils.metrics import metrics_registry
+from app.utils.resilience import RetryPolicy, UpstreamError, call_with_resilience
+import asyncio
+import hashlib
+import hmac
+import httpx
+import os
+import re
+import time
+import uuid
+
+settings = get_settings()
+
+SessionFactory = Callable[[], Session]
+
+# Tipos de archivo que se copian: extensión y tipo de contenido
+MEDIA_KINDS = {
+    "video": ("mp4", "video/mp4"),
+    "thumbnail": ("jpg", "image/jpeg"),
+}
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def sign_media(video_id: str, kind: str) -> str:
+    """
+    Firma de la URL de un archivo copiado (HMAC-SHA256 del id del talk y el tipo)
+    """
+    secret = (settings.DID_WEBHOOK_SECRET or settings.SECRET_KEY).encode()
+    return hmac.new(secret, f"{video_id}:{kind}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify_media_signature(video_id: str, kind: str, signature: str) -> bool:
+    return hmac.compare_digest(sign_media(video_id, kind), signature or "")
+
+
+def media_url(video_id: str, kind: str) -> str:
+    """
+    URL firmada con la que la API sirve la copia local (el reproductor no envía el token)
+    """
+    base = (settings.MEDIA_BASE_URL or "").rstrip("/")
+    return f"{base}/api/v1/video/media/{quote(video_id, safe='')}/{kind}?signature={sign_media(video_id, kind)}"
+
+
+def media_path(video_id: str, kind: str) -> str:
+    """
+    Ruta del archivo relativa a STORAGE_PATH
+    """
+    extension = MEDIA_KINDS[kind][0]
+    return os.path.join("videos", f"{_UNSAFE_CHARS.sub('_', video_id)}.{extension}")
+
+
+def add_pending_media(db: Session, video_id: str, source_url: str, thumbnail_source_url: Optional[str]):
+    """
+    Registra en la transacción de db un video pendiente de copiar (si no lo estaba ya)
+    """
+    db.execute(insert(VideoMedia).values(
+        video_id=video_id,
+        status="pending",
+        source_url=source_url,
+        thumbnail_source_url=thumbnail_source_url,
+        attempts=0,
+        created_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=[VideoMedia.video_id]))
+
+
+class MediaMirror:
+    """
+    Copia a STORAGE_PATH los videos y miniaturas terminados en D-ID
+
+    Las descargas van por bloques directamente a un archivo temporal (sin
+    cargar el video en memoria) que se renombra al terminar. Después se
+    cambian las URLs de los EducationalVideo de ese talk por las de la API.
+    Un intento fallido se repite en el proceso con backoff hasta
+    MEDIA_MIRROR_MAX_ATTEMPTS; los pendientes se reanudan al arrancar.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active: Set[str] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Reintentos programados, por id del talk
+        self._retries: Dict[str, asyncio.TimerHandle] = {}
+
+    def enqueue(self, video_id: str, session_factory: SessionFactory = SessionLocal):
+        self._ensure_workers()
+        self._queue.put_nowait((video_id, session_factory))
+
+    async def start(self):
+        """
+        Arranca los workers y reanuda las copias pendientes
+        """
+        self._ensure_workers()
+
+        def pending_media() -> List[str]:
+            db = SessionLocal()
+            try:
+                return [
+                    video_id for (video_id,) in db.query(VideoMedia.video_id).filter(
+                        VideoMedia.status == "pending"
+                    ).order_by(VideoMedia.created_at.asc()).all()
+                ]
+            finally:
+                db.close()
+
+        for video_id in await run_in_threadpool(pending_media):
+            self.enqueue(video_id)
+
+    async def stop(self):
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "active": len(self._active),
+            "retrying": len(self._retries)
+        }
+
+    def _ensure_workers(self):
+        if self._queue is not None and self._tasks and not self._tasks[0].done():
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            video_id, session_factory = await self._queue.get()
+            try:
+                await self.process(video_id, session_factory)
+            except Exception as e:
+                print(f"[Media] Error copiando el video {video_id}: {str(e)}")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Cliente compartido para las descargas (sin las cabeceras de D-ID: las URLs son firmadas)
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.workers * 2, max_keepalive_connections=self.workers)
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def process(self, video_id: str, session_factory: SessionFactory = SessionLocal):
+        """
+        Copia el video (y su miniatura, si la hay) de un talk pendiente
+        """
+        if video_id in self._active:
+            return
+        self._active.add(video_id)
+        try:
+            media = await run_in_threadpool(self._load, session_factory, video_id)
+            if media is None or media["status"] != "pending":
+                return
+
+            started = time.perf_counter()
+            try:
+                video_path = media_path(video_id, "video")
+                size, etag = await self._download(media["source_url"], video_path)
+
+                thumbnail_path = None
+                if media["thumbnail_source_url"]:
+                    try:
+                        thumbnail_path = media_path(video_id, "thumbnail")
+                        await self._download(media["thumbnail_source_url"], thumbnail_path)
+                    except Exception as e:
+                        # La miniatura es opcional: se conserva la URL de D-ID
+                        thumbnail_path = None
+                        print(f"[Media] No se pudo copiar la miniatura de {video_id}: {str(e)}")
+
+                await run_in_threadpool(
+                    self._finish, session_factory, video_id, video_path, thumbnail_path, size, etag
+                )
+                metrics_registry.increment("media_mirror_total", outcome="done")
+                metrics_registry.increment("media_mirror_bytes_total", size)
+                metrics_registry.observe("media_mirror_seconds", time.perf_counter() - started)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                attempts = await run_in_threadpool(self._record_failure, session_factory, video_id, str(e))
+                if attempts is None:
+                    metrics_registry.increment("media_mirror_total", outcome="error")
+                else:
+                    self._schedule_retry(video_id, session_factory, attempts)
+                    metrics_registry.increment("media_mirror_total", outcome="retry")
+        finally:
+            self._active.discard(video_id)
+
+    def _schedule_retry(self, video_id: str, session_factory: SessionFactory, attempts: int):
+        """
+        Vuelve a encolar la copia tras la espera del intento número attempts
+        """
+        def retry():
+            self._retries.pop(video_id, None)
+            self.enqueue(video_id, session_factory)
+
+        policy = RetryPolicy(
+            max_attempts=settings.MEDIA_MIRROR_MAX_ATTEMPTS,
+            base_delay=settings.MEDIA_MIRROR_RETRY_BASE_SECONDS,
+            max_delay=settings.MEDIA_MIRROR_RETRY_MAX_SECONDS
+        )
+        delay = policy.compute_delay(attempts - 1)
+        previous = self._retries.pop(video_id, None)
+        if previous is not None:
+            previous.cancel()
+        self._retries[video_id] = asyncio.get_running_loop().call_later(delay, retry)
+
+    async def _download(self, url: str, relative_path: str) -> Tuple[int, str]:
+        """
+        Descarga url por bloques a STORAGE_PATH/relative_path; devuelve (bytes, sha256)
+        """
+        target = os.path.join(settings.STORAGE_PATH, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f"{target}.{uuid.uuid4().hex}.part"
+
+        async def download(timeout):
+            digest = hashlib.sha256()
+            size = 0
+            async with self._get_client().stream("GET", url, timeout=timeout) as response:
+                if response.status_code != 200:
+                    raise UpstreamError(
+                        f"Error descargando {relative_path}: {response.status_code}",
+                        status_code=response.status_code
+                    )
+
+                with open(temporary, "wb") as file:
+                    async for chunk in response.aiter_bytes(settings.MEDIA_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > settings.MEDIA_MAX_BYTES:
+                            raise UpstreamError(f"{relative_path} supera MEDIA_MAX_BYTES", retryable=False)
+                        digest.update(chunk)
+                        await run_in_threadpool(file.write, chunk)
+
+            return size, digest.hexdigest()
+
+        try:
+            size, etag = await call_with_resilience(
+                "media",
+                download,
+                attempt_timeout=settings.MEDIA_MIRROR_TIMEOUT_SECONDS
+            )
+            os.replace(temporary, target)
+            return size, etag
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def _load(self, session_factory: SessionFactory, video_id: str) -> Optional[Dict[str, Any]]:
+        db = session_factory()
+        try:
+            media = db.query(VideoMedia).filter(VideoMedia.video_id == video_id).first()
+            if media is None:
+                return None
+            return {
+                "status": media.status,
+                "source_url": media.source_url,
+                "thumbnail_source_url": media.thumbnail_source_url
+            }
+        finally:
+            db.close()
+
+    def _finish(
+            self,
+            session_factory: SessionFactory,
+            video_id: str,
+            video_path: str,
+            thumbnail_path: Optional[str],
+            size: int,
+            etag: str
+    ):
+        """
+        Marca la copia como hecha y apunta los EducationalVideo del talk a la API
+        """
+        db = session_factory()
+        try:
+            db.query(VideoMedia).filter(VideoMedia.video_id == video_id).update({
+                "status": "done",
+                "video_path": video_path,
+                "thumbnail_path": thumbnail_path,
+                "size": size,
+                "etag": etag,
+                "error": None,
+                "mirrored_at": datetime.utcnow()
+            }, synchronize_session=False)
+
+            urls = {"video_url": media_url(video_id, "video")}
+            if thumbnail_path:
+                urls["thumbnail_url"] = media_url(video_id, "thumbnail")
+            db.query(EducationalVideo).filter(EducationalVideo.video_id == video_id).update(
+                urls, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _record_failure(self, session_factory: SessionFactory, video_id: str, error: str) -> Optional[int]:
+        """
+        Cuenta el intento fallido; tras MEDIA_MIRROR_MAX_ATTEMPTS queda en error con la URL de D-ID
+
+        Devuelve los intentos hechos si hay que reintentar, o None si no
+        """
+        db = session_factory()
+        try:
+            media = db.query(VideoMedia).filter(VideoMedia.video_id == video_id).first()
+            if media is None:
+                return None
+            media.attempts += 1
+            media.error = error
+            attempts = media.attempts
+            if attempts >= settings.MEDIA_MIRROR_MAX_ATTEMPTS:
+                media.status = "error"
+            db.commit()
+            return attempts if attempts < settings.MEDIA_MIRROR_MAX_ATTEMPTS else None
+        finally:
+            db.close()
+
+
+# Instancia singleton
+media_mirror = MediaMirror(workers=settings.MEDIA_MIRROR_WORKERS)
@@ -1,5 +1,6 @@
 from typing import List, Dict
 from app.services.gemini_service import gemini_service
+from app.schemas.pomodoro import PomodoroRecommendationsResponse
 
 
 class PomodoroService:
@@ -56,20 +57,24 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.7
+                profile="pomodoro",
+                service="pomodoro",
+                use_cache=True,
+                response_schema=PomodoroRecommendationsResponse
             )
 
-            recommendations = response.get("recommendations", [])
+            # Se conservan los subtemas con al menos 3 fuentes (recortando las sobrantes)
+            recommendations = [
+                {
+                    "sub_topic": rec.sub_topic,
+                    "sources": [source.model_dump() for source in rec.sources[:3]]
+                }
+                for rec in response.recommendations
+                if len(rec.sources) >= 3
+            ][:5]
 
-            if not recommendations or len(recommendations) < 3:
-                raise Exception("Se necesitan al menos 3 recomendaciones")
-
-            # Validar estructura
-            for rec in recommendations:
-                if not all(key in rec for key in ["sub_topic", "sources"]):
-                    raise Exception("Estructura de recomendación inválida")
-                if len(rec["sources"]) != 3:
-                    raise Exception("Cada subtema debe tener exactamente 3 fuentes")
+            if len(recommendations) < 3:
+                raise Exception("Se necesitan al menos 3 recomendaciones con 3 fuentes cada una")
 
             return recommendations
 
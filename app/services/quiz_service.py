@@ -1,5 +1,6 @@
 from typing import List, Dict
 from app.services.gemini_service import gemini_service
+from app.schemas.quiz import QuizGenerationResponse
 
 
 class QuizService:
@@ -54,24 +55,22 @@ Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             response = await gemini_service.generate_json(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.8
+                profile="quiz",
+                service="quiz",
+                response_schema=QuizGenerationResponse
             )
 
-            questions = response.get("questions", [])
+            # La estructura ya viene validada por el esquema; se descartan solo
+            # las preguntas que no cumplen las reglas en lugar de todo el quiz
+            questions = [
+                q.model_dump() for q in response.questions
+                if len(q.options) == 4 and q.correct_answer in q.options
+            ]
 
-            if len(questions) != num_questions:
-                raise Exception(f"Se esperaban {num_questions} preguntas, pero se generaron {len(questions)}")
+            if len(questions) < num_questions:
+                raise Exception(f"Se esperaban {num_questions} preguntas válidas, pero se generaron {len(questions)}")
 
-            # Validar estructura de cada pregunta
-            for q in questions:
-                if not all(key in q for key in ["question", "options", "correct_answer"]):
-                    raise Exception("Estructura de pregunta inválida")
-                if len(q["options"]) != 4:
-                    raise Exception("Cada pregunta debe tener exactamente 4 opciones")
-                if q["correct_answer"] not in q["options"]:
-                    raise Exception("La respuesta correcta debe estar en las opciones")
-
-            return questions
+            return questions[:num_questions]
 
         except Exception as e:
             raise Exception(f"Error generando quiz: {str(e)}")
@@ -0,0 +1,696 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.educational_video import EducationalVideo
+from app.models.video_generation_job import VideoGenerationJob
+from app.models.video_media import VideoMedia
+from app.models.video_render import VideoRender
+from app.services.media_mirror_service import add_pending_media, media_mirror
+from app.services.video_service import video_service
+from app.utils.cache import ResponseCache
+from app.utils.metrics import metrics_registry
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import socket
+import time
+import unicodedata
+import uuid
+
+settings = get_settings()
+
+SessionFactory = Callable[[], Session]
+
+# Progreso aproximado de cada etapa (y de los estados de D-ID durante el render)
+STAGE_PROGRESS = {
+    "created": 0,
+    "scripting": 10,
+    "rendering": 30,
+    "done": 100,
+    "error": 100,
+}
+PROVIDER_PROGRESS = {
+    "created": 40,
+    "started": 70,
+    "done": 95,
+}
+
+ACTIVE_STATUSES = ("created", "scripting", "rendering")
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    Forma canónica de un tema: minúsculas, sin tildes ni puntuación y con espacios simples
+    """
+    text = unicodedata.normalize("NFKD", topic.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def render_key(topic: str, duration: str) -> str:
+    """
+    Clave de contenido de un render de D-ID: (tema normalizado, duración, voz, avatar)
+    """
+    return ResponseCache.make_key(
+        "did-render", normalize_topic(topic), duration, settings.DID_VOICE_ID, settings.DID_AVATAR_URL
+    )
+
+
+def sign_webhook(job_id: uuid.UUID) -> str:
+    """
+    Firma del webhook de D-ID de un trabajo (HMAC-SHA256 de su id)
+    """
+    secret = (settings.DID_WEBHOOK_SECRET or settings.SECRET_KEY).encode()
+    return hmac.new(secret, str(job_id).encode(), hashlib.sha256).hexdigest()
+
+
+def verify_webhook_signature(job_id: uuid.UUID, signature: str) -> bool:
+    return hmac.compare_digest(sign_webhook(job_id), signature or "")
+
+
+class VideoJobQueue:
+    """
+    Cola de trabajos de generación de videos educativos
+
+    POST /video/generate solo crea el trabajo y devuelve su id; un grupo de
+    tareas del proceso lo avanza por las etapas created → scripting →
+    rendering → done (o error) y guarda cada cambio en la tabla
+    video_generation_jobs. El resultado se escribe en EducationalVideo.
+
+    Con varios procesos, cada trabajo se reserva (claimed_by, lease_until)
+    con un UPDATE condicional antes de avanzarlo y la reserva se renueva
+    mientras tanto. Cada VIDEO_JOB_LEASE_SECONDS se encolan los trabajos
+    activos sin reserva vigente: los que quedaron a medias al reiniciar o
+    cuyo proceso murió.
+
+    Los renders se indexan en video_renders por tema normalizado, duración y
+    voz: si ya existe uno terminado se copian su guión y resultado, y si otro
+    trabajo lo está renderizando se espera a que termine en vez de pedir
+    otro a D-ID.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        # Trabajos encolados o en curso en este proceso
+        self._local: Set[uuid.UUID] = set()
+        # Trabajos de este proceso esperando el webhook de D-ID
+        self._webhooks: Dict[uuid.UUID, asyncio.Future] = {}
+        # Renders en curso en este proceso, por clave; se resuelven al terminar
+        self._renders: Dict[str, asyncio.Future] = {}
+
+    async def submit(
+            self,
+            db: Session,
+            user_id: uuid.UUID,
+            topic: str,
+            duration: str,
+            study_session_id: Optional[uuid.UUID] = None
+    ) -> VideoGenerationJob:
+        """
+        Crea el trabajo y lo encola; los cambios posteriores se guardan sobre la base de datos de db
+        """
+        def create() -> VideoGenerationJob:
+            job = VideoGenerationJob(
+                user_id=user_id,
+                study_session_id=study_session_id,
+                topic=topic,
+                duration=duration,
+                status="created",
+                progress=STAGE_PROGRESS["created"]
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return job
+
+        job = await run_in_threadpool(create)
+        self.enqueue(job.id, sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind()))
+        metrics_registry.increment("video_jobs_total", outcome="submitted")
+        return job
+
+    def enqueue(self, job_id: uuid.UUID, session_factory: SessionFactory = SessionLocal):
+        self._ensure_workers()
+        if job_id in self._local:
+            return
+        self._local.add(job_id)
+        self._queue.put_nowait((job_id, session_factory))
+
+    async def start(self):
+        """
+        Arranca los workers y la búsqueda periódica de trabajos sin reserva
+        """
+        self._ensure_workers()
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def stop(self):
+        tasks = self._tasks + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._sweeper = None
+        self._queue = None
+        self._local.clear()
+
+        # Los trabajos a medias quedan libres para otro proceso sin esperar a que caduque la reserva
+        try:
+            await run_in_threadpool(self._release_all, SessionLocal)
+        except Exception as e:
+            print(f"[Video] No se pudieron liberar las reservas: {str(e)}")
+
+    async def _sweep(self):
+        """
+        Encola periódicamente los trabajos activos sin reserva vigente
+        """
+        while True:
+            try:
+                for job_id in await run_in_threadpool(self._unclaimed_jobs, SessionLocal):
+                    self.enqueue(job_id)
+            except Exception as e:
+                print(f"[Video] Error buscando trabajos pendientes: {str(e)}")
+            await asyncio.sleep(settings.VIDEO_JOB_LEASE_SECONDS)
+
+    def _unclaimed_jobs(self, session_factory: SessionFactory) -> List[uuid.UUID]:
+        db = session_factory()
+        try:
+            return [
+                job_id for (job_id,) in db.query(VideoGenerationJob.id).filter(
+                    VideoGenerationJob.status.in_(ACTIVE_STATUSES),
+                    or_(VideoGenerationJob.lease_until.is_(None), VideoGenerationJob.lease_until < datetime.utcnow())
+                ).order_by(VideoGenerationJob.created_at.asc()).all()
+            ]
+        finally:
+            db.close()
+
+    def _claim(self, session_factory: SessionFactory, job_id: uuid.UUID) -> bool:
+        """
+        Reserva el trabajo para este proceso; False si otro lo tiene reservado
+
+        UPDATE condicional: solo prospera si el trabajo sigue activo y no hay
+        reserva o la anterior caducó, así que dos procesos no lo avanzan a la vez
+        """
+        db = session_factory()
+        try:
+            now = datetime.utcnow()
+            claimed = db.query(VideoGenerationJob).filter(
+                VideoGenerationJob.id == job_id,
+                VideoGenerationJob.status.in_(ACTIVE_STATUSES),
+                or_(VideoGenerationJob.lease_until.is_(None), VideoGenerationJob.lease_until < now)
+            ).update({
+                "claimed_by": self.worker_id,
+                "lease_until": now + timedelta(seconds=settings.VIDEO_JOB_LEASE_SECONDS)
+            }, synchronize_session=False)
+            db.commit()
+            return bool(claimed)
+        finally:
+            db.close()
+
+    def _renew(self, session_factory: SessionFactory, job_id: uuid.UUID) -> bool:
+        db = session_factory()
+        try:
+            renewed = db.query(VideoGenerationJob).filter(
+                VideoGenerationJob.id == job_id,
+                VideoGenerationJob.claimed_by == self.worker_id
+            ).update({
+                "lease_until": datetime.utcnow() + timedelta(seconds=settings.VIDEO_JOB_LEASE_SECONDS)
+            }, synchronize_session=False)
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    def _release_all(self, session_factory: SessionFactory):
+        db = session_factory()
+        try:
+            db.query(VideoGenerationJob).filter(
+                VideoGenerationJob.claimed_by == self.worker_id
+            ).update({"claimed_by": None, "lease_until": None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _keep_lease(self, session_factory: SessionFactory, job_id: uuid.UUID):
+        """
+        Renueva la reserva mientras el trabajo avanza (a un tercio de su duración)
+
+        Solo termina si la reserva se pierde; un error al renovarla cuenta
+        igual, porque no se puede asegurar que otro proceso no la tome
+        """
+        while True:
+            await asyncio.sleep(settings.VIDEO_JOB_LEASE_SECONDS / 3)
+            try:
+                if not await run_in_threadpool(self._renew, session_factory, job_id):
+                    print(f"[Video] El trabajo {job_id} perdió su reserva")
+                    return
+            except Exception as e:
+                print(f"[Video] Error renovando la reserva de {job_id}: {str(e)}")
+                return
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "local_jobs": len(self._local),
+            "rendering_keys": len(self._renders)
+        }
+
+    def _ensure_workers(self):
+        if self._queue is not None and self._tasks and not self._tasks[0].done():
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            job_id, session_factory = await self._queue.get()
+            try:
+                await self.process(job_id, session_factory)
+            except Exception as e:
+                print(f"[Video] Error procesando el trabajo {job_id}: {str(e)}")
+            finally:
+                self._local.discard(job_id)
+
+    async def process(self, job_id: uuid.UUID, session_factory: SessionFactory = SessionLocal):
+        """
+        Avanza un trabajo hasta done o error, reanudando desde la última etapa guardada
+        """
+        job = await run_in_threadpool(self._load, session_factory, job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return
+        if not await run_in_threadpool(self._claim, session_factory, job_id):
+            # Otro proceso lo está avanzando
+            metrics_registry.increment("video_jobs_total", outcome="claimed_elsewhere")
+            return
+
+        # Si la reserva se pierde el trabajo se detiene: otro proceso puede reanudarlo
+        lease = asyncio.ensure_future(self._keep_lease(session_factory, job_id))
+        work = asyncio.ensure_future(self._advance(session_factory, job_id, job))
+        try:
+            await asyncio.wait({lease, work}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lease.cancel()
+            if not work.done():
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+
+        if work.cancelled():
+            metrics_registry.increment("video_jobs_total", outcome="lease_lost")
+        else:
+            work.result()
+
+    async def _advance(self, session_factory: SessionFactory, job_id: uuid.UUID, job: Dict[str, Any]):
+        """
+        Etapas del trabajo ya reservado; los errores quedan guardados en el trabajo
+        """
+        started = time.perf_counter()
+        key = render_key(job["topic"], job["duration"])
+        # Solo quien crea el aviso del render lo resuelve y lo quita al terminar
+        owns_render = False
+        try:
+            # 0. Reutilizar un render igual, o esperar al que ya está en curso
+            if settings.VIDEO_RENDER_REUSE:
+                waited = False
+                wait_until = time.monotonic() + settings.VIDEO_RENDER_MAX_WAIT_SECONDS
+                role, source = await run_in_threadpool(self._claim_render, session_factory, job_id, key, job)
+                while role == "wait":
+                    if not waited:
+                        waited = True
+                        await self._update(
+                            session_factory, job_id,
+                            status="rendering", progress=STAGE_PROGRESS["rendering"], provider_status="shared"
+                        )
+                    await self._wait_for_render(key)
+                    # Pasada la espera máxima el render ajeno se da por atascado y lo hace este trabajo
+                    take_over = time.monotonic() >= wait_until
+                    role, source = await run_in_threadpool(
+                        self._claim_render, session_factory, job_id, key, job, take_over
+                    )
+                    if take_over and role == "render":
+                        metrics_registry.increment("video_renders_total", outcome="taken_over")
+
+                if role == "reuse":
+                    await self._reuse(session_factory, job_id, job, source)
+                    metrics_registry.increment("video_renders_total", outcome="coalesced" if waited else "reused")
+                    return
+                if key not in self._renders:
+                    self._renders[key] = asyncio.get_running_loop().create_future()
+                    owns_render = True
+            metrics_registry.increment("video_renders_total", outcome="rendered")
+
+            # 1. Guión con Gemini (salvo que ya se hubiera generado)
+            if not job["script"]:
+                await self._update(session_factory, job_id, status="scripting", progress=STAGE_PROGRESS["scripting"])
+                stage_started = time.perf_counter()
+                script_data = await video_service.generate_script(job["topic"], job["duration"])
+                self._record_stage("scripting", stage_started)
+                job.update(script_data)
+                await self._update(session_factory, job_id, **script_data)
+
+            # 2. Crear el video en D-ID (avisará por webhook si está configurado)
+            stage_started = time.perf_counter()
+            webhook = self._webhooks[job_id] = asyncio.get_running_loop().create_future()
+            if not job["did_video_id"]:
+                talk = await video_service.create_talk(
+                    script=job["script"], duration=job["duration"], webhook_url=self._webhook_url(job_id)
+                )
+                job["did_video_id"] = talk["id"]
+            await self._update(
+                session_factory, job_id,
+                status="rendering", progress=STAGE_PROGRESS["rendering"], did_video_id=job["did_video_id"]
+            )
+
+            # 3. Esperar al render, guardando el progreso que informa D-ID
+            async def on_status(provider_status: str):
+                await self._update(
+                    session_factory, job_id,
+                    provider_status=provider_status,
+                    progress=PROVIDER_PROGRESS.get(provider_status, STAGE_PROGRESS["rendering"])
+                )
+
+            completed_video = await video_service.wait_for_talk(
+                job["did_video_id"], duration=job["duration"], on_status=on_status, webhook=webhook
+            )
+            self._record_stage("rendering", stage_started)
+
+            if await run_in_threadpool(self._complete, session_factory, job_id, job, completed_video):
+                metrics_registry.increment("video_jobs_total", outcome="done")
+                self._mirror(job, session_factory)
+
+        except asyncio.CancelledError:
+            # Apagado del proceso: el trabajo se reanuda en el siguiente arranque
+            raise
+        except Exception as e:
+            await self._fail(session_factory, job_id, str(e))
+            metrics_registry.increment("video_jobs_total", outcome="error")
+        finally:
+            self._webhooks.pop(job_id, None)
+            if owns_render:
+                render = self._renders.pop(key)
+                if not render.done():
+                    render.set_result(None)
+            self._record_stage("total", started)
+
+    def _claim_render(
+            self,
+            session_factory: SessionFactory,
+            job_id: uuid.UUID,
+            key: str,
+            job: Dict[str, Any],
+            take_over: bool = False
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Decide qué hace el trabajo con su render según el índice
+
+        Devuelve ("reuse", video) si ya hay un render terminado y copiado en
+        local, ("wait", None) si otro trabajo activo lo está renderizando o su
+        copia está en curso y ("render", None) si le toca renderizarlo (no
+        había, era suyo, el anterior se abandonó o no tiene copia local o,
+        con take_over, se cansó de esperarlo).
+        """
+        db = session_factory()
+        try:
+            render = db.query(VideoRender).filter(VideoRender.render_key == key).with_for_update().first()
+
+            if render is None:
+                db.add(VideoRender(
+                    render_key=key,
+                    topic=normalize_topic(job["topic"])[:255],
+                    duration=job["duration"],
+                    voice_id=settings.DID_VOICE_ID,
+                    status="rendering",
+                    job_id=job_id
+                ))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Otro proceso creó la entrada a la vez: se vuelve a leer
+                    db.rollback()
+                    return self._claim_render(session_factory, job_id, key, job, take_over)
+                return "render", None
+
+            media_status = None
+            if render.status == "done" and render.educational_video is not None:
+                media_status = db.query(VideoMedia.status).filter(
+                    VideoMedia.video_id == render.educational_video.video_id
+                ).scalar()
+
+            # Solo se reutiliza la copia local: la URL de D-ID caduca
+            if media_status == "done":
+                video = render.educational_video
+                source = {
+                    "script": video.script,
+                    "title": video.title,
+                    "key_points": video.key_points,
+                    "did_video_id": video.video_id,
+                    "result_url": video.video_url,
+                    "thumbnail_url": video.thumbnail_url
+                }
+                render.hits += 1
+                db.commit()
+                return "reuse", source
+
+            if media_status == "pending" and not take_over:
+                # La copia local está en curso
+                return "wait", None
+
+            if render.job_id == job_id:
+                return "render", None
+
+            owner_status = None
+            if render.job_id is not None:
+                owner_status = db.query(VideoGenerationJob.status).filter(
+                    VideoGenerationJob.id == render.job_id
+                ).scalar()
+            if render.status == "rendering" and owner_status in ACTIVE_STATUSES and not take_over:
+                return "wait", None
+
+            # El render anterior falló, se borró su video, no tiene copia local
+            # (desactivada o fallida) o no terminó a tiempo: lo hace este trabajo
+            render.status = "rendering"
+            render.job_id = job_id
+            render.educational_video_id = None
+            db.commit()
+            return "render", None
+        finally:
+            db.close()
+
+    async def _wait_for_render(self, key: str):
+        """
+        Espera a que termine el render en curso de key (o un rato, si está en otro proceso)
+        """
+        render = self._renders.get(key)
+        if render is None:
+            await asyncio.sleep(settings.VIDEO_RENDER_WAIT_SECONDS)
+        else:
+            await asyncio.wait({render}, timeout=settings.VIDEO_RENDER_WAIT_SECONDS)
+
+    async def _reuse(
+            self,
+            session_factory: SessionFactory,
+            job_id: uuid.UUID,
+            job: Dict[str, Any],
+            source: Dict[str, Any]
+    ):
+        """
+        Termina el trabajo con una copia del guión y el resultado de un render existente
+        """
+        fields = {name: source[name] for name in ("script", "title", "key_points", "did_video_id")}
+        job.update(fields)
+        await self._update(session_factory, job_id, **fields)
+        completed_video = {
+            "status": "done",
+            "result_url": source["result_url"],
+            "thumbnail_url": source["thumbnail_url"]
+        }
+        if await run_in_threadpool(self._complete, session_factory, job_id, job, completed_video):
+            metrics_registry.increment("video_jobs_total", outcome="done")
+
+    def _webhook_url(self, job_id: uuid.UUID) -> Optional[str]:
+        if not settings.DID_WEBHOOK_BASE_URL:
+            return None
+        return (
+            f"{settings.DID_WEBHOOK_BASE_URL.rstrip('/')}/api/v1/video/webhooks/d-id"
+            f"?job_id={job_id}&signature={sign_webhook(job_id)}"
+        )
+
+    async def handle_webhook(self, db: Session, job_id: uuid.UUID, talk: Dict[str, Any]) -> bool:
+        """
+        Procesa el aviso de D-ID de que un video terminó; False si el trabajo no existe
+
+        Si el trabajo espera en este proceso se le entrega el talk; si no (otro
+        proceso o tras un reinicio) se finaliza aquí. Terminar dos veces el
+        mismo trabajo no tiene efecto.
+        """
+        waiter = self._webhooks.get(job_id)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(talk)
+            metrics_registry.increment("did_webhooks_total", outcome="delivered")
+            return True
+
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        job = await run_in_threadpool(self._load, session_factory, job_id)
+        if job is None:
+            return False
+
+        if job["status"] != "rendering" or talk.get("id") != job["did_video_id"]:
+            metrics_registry.increment("did_webhooks_total", outcome="ignored")
+            return True
+
+        if talk.get("status") == "done":
+            if await run_in_threadpool(self._complete, session_factory, job_id, job, talk):
+                self._mirror(job, session_factory)
+        elif talk.get("status") == "error":
+            await self._fail(
+                session_factory, job_id, f"Error al generar el video: {talk.get('error', 'Error desconocido')}"
+            )
+        metrics_registry.increment("did_webhooks_total", outcome="finalized")
+        return True
+
+    def _mirror(self, job: Dict[str, Any], session_factory: SessionFactory):
+        """
+        Encola la copia local del video terminado (las URLs de D-ID caducan)
+        """
+        if settings.MEDIA_MIRROR_ENABLED:
+            media_mirror.enqueue(job["did_video_id"], session_factory)
+
+    def _record_stage(self, stage: str, started: float):
+        metrics_registry.observe("video_job_stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def _load(self, session_factory: SessionFactory, job_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        db = session_factory()
+        try:
+            job = db.query(VideoGenerationJob).filter(VideoGenerationJob.id == job_id).first()
+            if job is None:
+                return None
+            return {
+                "user_id": job.user_id,
+                "study_session_id": job.study_session_id,
+                "topic": job.topic,
+                "duration": job.duration,
+                "status": job.status,
+                "script": job.script,
+                "title": job.title,
+                "key_points": job.key_points,
+                "did_video_id": job.did_video_id
+            }
+        finally:
+            db.close()
+
+    async def _update(self, session_factory: SessionFactory, job_id: uuid.UUID, **fields):
+        def update():
+            db = session_factory()
+            try:
+                db.query(VideoGenerationJob).filter(VideoGenerationJob.id == job_id).update(
+                    {**fields, "updated_at": datetime.utcnow()}
+                )
+                db.commit()
+            finally:
+                db.close()
+
+        await run_in_threadpool(update)
+
+    async def _fail(self, session_factory: SessionFactory, job_id: uuid.UUID, error: str):
+        """
+        Marca el trabajo con error, salvo que ya esté terminado
+        """
+        def fail():
+            db = session_factory()
+            try:
+                now = datetime.utcnow()
+                db.query(VideoGenerationJob).filter(
+                    VideoGenerationJob.id == job_id,
+                    VideoGenerationJob.status.in_(ACTIVE_STATUSES)
+                ).update({
+                    "status": "error",
+                    "progress": STAGE_PROGRESS["error"],
+                    "error": error,
+                    "updated_at": now,
+                    "finished_at": now
+                }, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+
+        await run_in_threadpool(fail)
+
+    def _complete(
+            self,
+            session_factory: SessionFactory,
+            job_id: uuid.UUID,
+            job: Dict[str, Any],
+            completed_video: Dict[str, Any]
+    ) -> bool:
+        """
+        Guarda el video en EducationalVideo y cierra el trabajo en la misma transacción
+
+        Devuelve False si el trabajo ya estaba terminado (p. ej. por el webhook)
+        """
+        db = session_factory()
+        try:
+            now = datetime.utcnow()
+            closed = db.query(VideoGenerationJob).filter(
+                VideoGenerationJob.id == job_id,
+                VideoGenerationJob.status.in_(ACTIVE_STATUSES)
+            ).update({
+                "status": "done",
+                "progress": STAGE_PROGRESS["done"],
+                "provider_status": completed_video.get("status"),
+                "updated_at": now,
+                "finished_at": now
+            }, synchronize_session=False)
+            if not closed:
+                db.rollback()
+                return False
+
+            video = EducationalVideo(
+                user_id=job["user_id"],
+                study_session_id=job["study_session_id"],
+                topic=job["topic"],
+                duration=job["duration"],
+                script=job["script"],
+                title=job["title"] or f"Video Educativo: {job['topic']}",
+                key_points=job["key_points"],
+                video_url=completed_video["result_url"],
+                video_id=job["did_video_id"],
+                thumbnail_url=completed_video.get("thumbnail_url"),
+                estimated_duration=video_service.get_duration_text(job["duration"]),
+                status="done"
+            )
+            db.add(video)
+            db.flush()
+
+            db.query(VideoGenerationJob).filter(VideoGenerationJob.id == job_id).update(
+                {"educational_video_id": video.id}, synchronize_session=False
+            )
+            if settings.MEDIA_MIRROR_ENABLED:
+                add_pending_media(db, job["did_video_id"], video.video_url, video.thumbnail_url)
+
+            # Si este trabajo renderizaba para el índice, el video queda disponible para reutilizarse
+            db.query(VideoRender).filter(
+                VideoRender.render_key == render_key(job["topic"], job["duration"]),
+                VideoRender.job_id == job_id
+            ).update({
+                "status": "done",
+                "educational_video_id": video.id,
+                "updated_at": now
+            }, synchronize_session=False)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+
+# Instancia singleton
+video_job_queue = VideoJobQueue(workers=settings.VIDEO_JOB_WORKERS)
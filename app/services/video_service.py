@@ -1,12 +1,35 @@
 import httpx
 import asyncio
 import base64
-from typing import Dict, List
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
 from app.config import get_settings
 from app.services.gemini_service import gemini_service
+from app.utils.metrics import metrics_registry
+from app.schemas.educational_video import VideoScriptGeneration
+from app.utils.resilience import (
+    UpstreamError,
+    call_with_resilience,
+    is_retryable_before_send
+)
 
 settings = get_settings()
 
+# Buckets de las métricas de espera de D-ID (segundos y número de consultas)
+DID_COMPLETION_BUCKETS = (10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0, 600.0, 900.0)
+DID_POLL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 12, 20, 30, 60)
+
+
+def _http2_available() -> bool:
+    """
+    HTTP/2 en httpx necesita el paquete h2 (httpx[http2])
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
 class VideoService:
     """
@@ -15,7 +38,66 @@ class VideoService:
 
     def __init__(self):
         self.api_key = settings.D_ID_API_KEY
-        self.base_url = "https://api.d-id.com"
+        self.base_url = settings.D_ID_BASE_URL
+        self._auth_header = base64.b64encode(f"{self.api_key}:".encode()).decode()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """
+        Abre el cliente HTTP compartido con D-ID (se llama al arrancar la aplicación)
+        """
+        self._get_client()
+
+    async def close(self):
+        """
+        Cierra el cliente HTTP y sus conexiones (se llama al apagar la aplicación)
+        """
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Cliente de larga duración para todo el tráfico con D-ID
+
+        Mantiene las conexiones abiertas (keep-alive, HTTP/2 si está h2) para
+        no repetir el handshake TCP/TLS en cada llamada. Si no se abrió al
+        arrancar, o se abrió en otro event loop, se crea aquí.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=settings.DID_HTTP2 and _http2_available(),
+                limits=httpx.Limits(
+                    max_connections=settings.DID_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.DID_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.DID_KEEPALIVE_EXPIRY_SECONDS
+                ),
+                timeout=self._timeout(settings.DID_TIMEOUT_SECONDS),
+                headers={
+                    "Authorization": f"Basic {self._auth_header}",
+                    "Accept": "application/json"
+                }
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        """
+        Timeout de una ruta, con la conexión acotada a DID_CONNECT_TIMEOUT_SECONDS
+        """
+        connect = settings.DID_CONNECT_TIMEOUT_SECONDS
+        return httpx.Timeout(timeout, connect=min(timeout, connect) if timeout else connect)
+
+    def get_client_stats(self) -> Dict[str, any]:
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": settings.DID_HTTP2 and _http2_available(),
+            "max_connections": settings.DID_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.DID_MAX_KEEPALIVE_CONNECTIONS
+        }
 
     async def generate_educational_video(
             self,
@@ -27,17 +109,18 @@ class VideoService:
         """
         try:
             # 1. Generar el guión con Gemini
-            script_data = await self._generate_script(topic, duration)
+            script_data = await self.generate_script(topic, duration)
 
             # 2. Crear el video con D-ID
-            video_data = await self._create_video_with_did(
+            video_data = await self.create_talk(
                 script=script_data["script"],
                 duration=duration
             )
 
             # 3. Esperar a que el video esté listo
-            completed_video = await self._wait_for_video_completion(
-                video_id=video_data["id"]
+            completed_video = await self.wait_for_talk(
+                video_id=video_data["id"],
+                duration=duration
             )
 
             return {
@@ -46,7 +129,7 @@ class VideoService:
                 "script": script_data["script"],
                 "title": script_data["title"],
                 "key_points": script_data["key_points"],
-                "estimated_duration": self._get_duration_text(duration),
+                "estimated_duration": self.get_duration_text(duration),
                 "thumbnail_url": completed_video.get("thumbnail_url"),
                 "status": "done"
             }
@@ -54,7 +137,7 @@ class VideoService:
         except Exception as e:
             raise Exception(f"Error generando video educativo: {str(e)}")
 
-    async def _generate_script(self, topic: str, duration: str) -> Dict[str, any]:
+    async def generate_script(self, topic: str, duration: str) -> Dict[str, any]:
         """
         Genera el guión del video usando Gemini
         """
@@ -105,12 +188,14 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
         response = await gemini_service.generate_json(
             prompt=prompt,
             system_instruction=system_instruction,
-            temperature=0.8
+            profile="video_script",
+            service="video",
+            response_schema=VideoScriptGeneration
         )
 
-        script = response.get("script", "")
-        title = response.get("title", f"Video Educativo: {topic}")
-        key_points = response.get("key_points", [])
+        script = response.script
+        title = response.title or f"Video Educativo: {topic}"
+        key_points = response.key_points
 
         # Limitar el script al máximo de caracteres
         if len(script) > limit["max_chars"]:
@@ -122,87 +207,152 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
             "key_points": key_points
         }
 
-    async def _create_video_with_did(self, script: str, duration: str) -> Dict[str, any]:
+    async def create_talk(self, script: str, duration: str, webhook_url: Optional[str] = None) -> Dict[str, any]:
         """
         Crea el video usando la API de D-ID
+
+        Con webhook_url D-ID avisa a esa URL cuando el video termina
         """
         try:
-            auth_header = base64.b64encode(f"{self.api_key}:".encode()).decode()
-
             request_body = {
                 "script": {
                     "type": "text",
                     "input": script,
                     "provider": {
                         "type": "microsoft",
-                        "voice_id": "es-ES-ElviraNeural"
+                        "voice_id": settings.DID_VOICE_ID
                     }
                 },
-                "source_url": "https://d-id-public-bucket.s3.amazonaws.com/alice.jpg"
+                "source_url": settings.DID_AVATAR_URL
             }
+            if webhook_url:
+                request_body["webhook"] = webhook_url
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/talks",
-                    headers={
-                        "Authorization": f"Basic {auth_header}",
-                        "Content-Type": "application/json",
-                        "Accept": "application/json"
-                    },
+            async def create(timeout):
+                response = await self._get_client().post(
+                    "/talks",
                     json=request_body,
-                    timeout=30.0
+                    timeout=self._timeout(timeout)
                 )
 
                 if response.status_code != 201:
                     error_text = response.text
-                    raise Exception(f"Error de D-ID ({response.status_code}): {error_text}")
+                    raise UpstreamError(
+                        f"Error de D-ID ({response.status_code}): {error_text}",
+                        status_code=response.status_code
+                    )
 
                 return response.json()
 
+            # Crear un video no es idempotente: solo se reintenta si D-ID no lo procesó
+            return await call_with_resilience(
+                "d-id",
+                create,
+                attempt_timeout=settings.DID_TIMEOUT_SECONDS,
+                deadline=settings.DID_DEADLINE_SECONDS,
+                retryable=is_retryable_before_send
+            )
+
         except Exception as e:
             raise Exception(f"Error creando video con D-ID: {str(e)}")
 
-    async def _wait_for_video_completion(
+    async def wait_for_talk(
             self,
             video_id: str,
-            max_attempts: int = 60
+            duration: str = "medium",
+            on_status: Optional[Callable[[str], Awaitable[None]]] = None,
+            webhook: Optional[asyncio.Future] = None
     ) -> Dict[str, any]:
         """
         Espera a que el video esté completamente procesado
+
+        Si llega el webhook de D-ID (webhook se resuelve con el talk) se
+        termina sin esperar a la siguiente consulta. Si no, se consulta el
+        estado con un calendario adaptado a la duración pedida: una espera
+        inicial y después intervalos que crecen exponencialmente hasta un
+        máximo. on_status se llama cada vez que D-ID informa un estado distinto
         """
-        auth_header = base64.b64encode(f"{self.api_key}:".encode()).decode()
-
-        async with httpx.AsyncClient() as client:
-            for attempt in range(max_attempts):
-                response = await client.get(
-                    f"{self.base_url}/talks/{video_id}",
-                    headers={
-                        "Authorization": f"Basic {auth_header}",
-                        "Content-Type": "application/json"
-                    },
-                    timeout=30.0
+        schedule = settings.DID_POLL_SCHEDULES.get(duration, settings.DID_POLL_SCHEDULES["medium"])
+        started = time.monotonic()
+        deadline = started + schedule["timeout"]
+        delay = schedule["initial_delay"]
+        interval = schedule["interval"]
+        polls = 0
+        status = None
+
+        async def get_status(timeout):
+            response = await self._get_client().get(f"/talks/{video_id}", timeout=self._timeout(timeout))
+
+            if response.status_code != 200:
+                raise UpstreamError(
+                    f"Error verificando estado del video: {response.status_code}",
+                    status_code=response.status_code
                 )
 
-                if response.status_code != 200:
-                    raise Exception(f"Error verificando estado del video: {response.status_code}")
+            return response.json()
+
+        while True:
+            data = await self._wait_for_webhook(webhook, delay)
+            source = "webhook"
+            if data is None:
+                polls += 1
+                metrics_registry.increment("did_polls_total", duration=duration)
+                data = await call_with_resilience(
+                    "d-id",
+                    get_status,
+                    attempt_timeout=settings.DID_STATUS_TIMEOUT_SECONDS,
+                    deadline=settings.DID_DEADLINE_SECONDS
+                )
+                source = "poll"
+            else:
+                # El webhook solo se usa una vez
+                webhook = None
+
+            previous_status, status = status, data.get("status")
 
-                data = response.json()
-                status = data.get("status")
+            print(f"[D-ID] Consulta {polls} ({source}) - Estado: {status}")
 
-                print(f"[D-ID] Intento {attempt + 1}/{max_attempts} - Estado: {status}")
+            if on_status and status != previous_status:
+                await on_status(status)
 
-                if status == "done":
-                    return data
-                elif status == "error":
-                    error_msg = data.get("error", "Error desconocido")
-                    raise Exception(f"Error al generar el video: {error_msg}")
+            if status == "done":
+                self._record_completion(duration, source, "done", started, polls)
+                return data
+            elif status == "error":
+                self._record_completion(duration, source, "error", started, polls)
+                error_msg = data.get("error", "Error desconocido")
+                raise UpstreamError(f"Error al generar el video: {error_msg}", retryable=False)
 
-                # Esperar 3 segundos antes del siguiente intento
-                await asyncio.sleep(3)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            delay = min(interval, remaining)
+            interval = min(interval * settings.DID_POLL_BACKOFF, schedule["max_interval"])
 
+        self._record_completion(duration, "poll", "timeout", started, polls)
         raise Exception("El video tardó demasiado en generarse. Por favor, intenta de nuevo.")
 
-    def _get_duration_text(self, duration: str) -> str:
+    async def _wait_for_webhook(self, webhook: Optional[asyncio.Future], delay: float) -> Optional[Dict[str, any]]:
+        """
+        Espera delay segundos o hasta que llegue el webhook; devuelve su talk si llegó
+        """
+        if webhook is None:
+            await asyncio.sleep(delay)
+            return None
+
+        done, _ = await asyncio.wait({webhook}, timeout=delay)
+        return webhook.result() if done else None
+
+    def _record_completion(self, duration: str, source: str, outcome: str, started: float, polls: int):
+        metrics_registry.observe(
+            "did_completion_seconds", time.monotonic() - started,
+            buckets=DID_COMPLETION_BUCKETS, duration=duration, source=source, outcome=outcome
+        )
+        metrics_registry.observe(
+            "did_polls_per_video", polls, buckets=DID_POLL_COUNT_BUCKETS, duration=duration
+        )
+
+    def get_duration_text(self, duration: str) -> str:
         """
         Obtiene el texto descriptivo de la duración
         """
@@ -218,31 +368,29 @@ IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
         Prueba la conexión con D-ID
         """
         try:
-            auth_header = base64.b64encode(f"{self.api_key}:".encode()).decode()
-
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/credits",
-                    headers={
-                        "Authorization": f"Basic {auth_header}",
-                        "Accept": "application/json"
-                    },
-                    timeout=10.0
-                )
-
-                if response.status_code != 200:
-                    return {
-                        "success": False,
-                        "message": f"Error {response.status_code}: {response.text}"
-                    }
+            async def get_credits(timeout):
+                return await self._get_client().get("/credits", timeout=self._timeout(timeout))
+
+            response = await call_with_resilience(
+                "d-id",
+                get_credits,
+                attempt_timeout=settings.DID_STATUS_TIMEOUT_SECONDS,
+                deadline=settings.DID_DEADLINE_SECONDS
+            )
 
-                data = response.json()
+            if response.status_code != 200:
                 return {
-                    "success": True,
-                    "message": "Conexión exitosa con D-ID",
-                    "credits": data.get("remaining")
+                    "success": False,
+                    "message": f"Error {response.status_code}: {response.text}"
                 }
 
+            data = response.json()
+            return {
+                "success": True,
+                "message": "Conexión exitosa con D-ID",
+                "credits": data.get("remaining")
+            }
+
         except Exception as e:
             return {
                 "success": False,
@@ -1,6 +1,15 @@
-from typing import List, Dict
+from typing import Any, Awaitable, List, Dict, Optional, Tuple, AsyncIterator
+from app.config import get_settings
 from app.services.gemini_service import gemini_service
 from app.services.audio_service import audio_service
+from app.schemas.voice_tutor import FollowUpSuggestions, TutorAnswer
+from app.utils.json_extractor import extract_json, JSONExtractionError
+from app.utils.metrics import metrics_registry
+from app.utils.sentence_splitter import SentenceSplitter
+import asyncio
+import time
+
+settings = get_settings()
 
 
 class VoiceTutorService:
@@ -8,6 +17,13 @@ class VoiceTutorService:
     Servicio para el tutor de voz conversacional
     """
 
+    # Sugerencias usadas si falla la generación
+    FALLBACK_SUGGESTIONS = [
+        "¿Puedes darme un ejemplo práctico?",
+        "¿Cómo se relaciona esto con otros conceptos?",
+        "¿Cuáles son los errores comunes al aprender esto?"
+    ]
+
     async def ask_tutor(
             self,
             topic: str,
@@ -18,18 +34,248 @@ class VoiceTutorService:
         Procesa una pregunta del usuario y genera respuesta en texto y audio
         """
         try:
-            # Construir contexto de conversación
-            context = ""
-            if conversation_history:
-                context = "\n".join([
-                    f"{'Estudiante' if msg['role'] == 'user' else 'Tutor'}: {msg['content']}"
-                    for msg in conversation_history[-10:]  # Últimos 10 mensajes
-                ])
-
-            system_instruction = f"""Eres un tutor experto, paciente y motivador especializado en {topic}.
+            started = time.perf_counter()
+            if settings.VOICE_TUTOR_SINGLE_CALL:
+                # Respuesta y sugerencias en una sola llamada a Gemini
+                text_response, follow_up_suggestions = await self._generate_answer_with_suggestions(
+                    topic, user_question, conversation_history
+                )
+            else:
+                system_instruction, prompt = self._build_prompt(topic, user_question, conversation_history)
+
+                # Generar respuesta de texto
+                text_response = await gemini_service.generate_text(
+                    prompt=prompt,
+                    system_instruction=system_instruction,
+                    profile="tutor",
+                    service="voice_tutor"
+                )
+                follow_up_suggestions = None
+            self._record_stage("answer", started)
+
+            return await self._finish_answer(topic, user_question, text_response, follow_up_suggestions)
+
+        except Exception as e:
+            raise Exception(f"Error en tutor de voz: {str(e)}")
+
+    async def stream_answer(
+            self,
+            topic: str,
+            user_question: str,
+            conversation_history: List[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Genera la respuesta de texto del tutor en streaming
+        """
+        system_instruction, prompt = self._build_prompt(topic, user_question, conversation_history)
+
+        async for chunk in gemini_service.stream_text(
+                prompt=prompt,
+                system_instruction=system_instruction,
+                profile="tutor",
+                service="voice_tutor"
+        ):
+            yield chunk
+
+    async def stream_speech(
+            self,
+            topic: str,
+            user_question: str,
+            conversation_history: List[Dict[str, str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Genera la respuesta del tutor en streaming con audio por frases
+
+        Mientras Gemini transmite el texto, cada frase completa se envía a
+        síntesis de voz (hasta VOICE_TUTOR_TTS_CONCURRENCY a la vez) y su
+        audio se emite en orden en cuanto está listo, de modo que el
+        estudiante empieza a escuchar tras la primera frase.
+
+        Produce pares (evento, datos): "token" con cada fragmento de texto,
+        "audio" con el audio de cada frase, "done" con el texto completo y
+        las sugerencias, y "error" si algo falla.
+        """
+        started = time.perf_counter()
+        events: asyncio.Queue = asyncio.Queue()
+        sentences: asyncio.Queue = asyncio.Queue()
+        tts_slots = asyncio.Semaphore(settings.VOICE_TUTOR_TTS_CONCURRENCY)
+        end_of_stream = object()
+
+        async def synthesize(sentence: str) -> str:
+            async with tts_slots:
+                return await audio_service.generate_audio(sentence)
+
+        def queue_sentence(sentence: str):
+            sentences.put_nowait((sentence, asyncio.ensure_future(synthesize(sentence))))
+
+        async def produce_text() -> str:
+            splitter = SentenceSplitter(
+                settings.VOICE_TUTOR_MIN_SENTENCE_CHARS, settings.VOICE_TUTOR_MAX_SENTENCE_CHARS
+            )
+            chunks = []
+            try:
+                async for chunk in self.stream_answer(topic, user_question, conversation_history):
+                    if not chunks:
+                        self._record_stage("first_token", started)
+                    chunks.append(chunk)
+                    events.put_nowait(("token", {"text": chunk}))
+                    for sentence in splitter.feed(chunk):
+                        queue_sentence(sentence)
+                for sentence in splitter.flush():
+                    queue_sentence(sentence)
+            finally:
+                sentences.put_nowait(end_of_stream)
+            self._record_stage("answer", started)
+            return "".join(chunks)
+
+        async def emit_audio():
+            index = 0
+            while True:
+                item = await sentences.get()
+                if item is end_of_stream:
+                    return
+                sentence, task = item
+                audio = await task
+                if index == 0:
+                    self._record_stage("first_audio", started)
+                events.put_nowait(("audio", {"index": index, "text": sentence, "audio": audio}))
+                index += 1
+
+        async def run() -> Dict[str, Any]:
+            text_task = asyncio.ensure_future(produce_text())
+            audio_task = asyncio.ensure_future(emit_audio())
+            try:
+                text_response = await text_task
+                # Las sugerencias se generan mientras termina el audio pendiente
+                follow_up_suggestions, _ = await asyncio.gather(
+                    self._timed_stage(
+                        "suggestions", self._suggestions_with_deadline(topic, user_question, text_response)
+                    ),
+                    audio_task
+                )
+                return {"text_response": text_response, "follow_up_suggestions": follow_up_suggestions}
+            finally:
+                audio_task.cancel()
+                while not sentences.empty():
+                    item = sentences.get_nowait()
+                    if item is not end_of_stream:
+                        item[1].cancel()
+
+        pipeline = asyncio.ensure_future(run())
+        pipeline.add_done_callback(lambda _: events.put_nowait(end_of_stream))
+
+        try:
+            while True:
+                item = await events.get()
+                if item is end_of_stream:
+                    break
+                yield item
+
+            if pipeline.exception() is not None:
+                yield "error", {"message": f"Error en tutor de voz: {str(pipeline.exception())}"}
+            else:
+                yield "done", pipeline.result()
+        finally:
+            # Si el cliente se desconecta se detienen el stream y la síntesis pendiente
+            pipeline.cancel()
+
+    async def complete_answer(
+            self,
+            topic: str,
+            user_question: str,
+            text_response: str
+    ) -> Dict[str, any]:
+        """
+        Genera el audio y las sugerencias para una respuesta ya generada
+        """
+        try:
+            return await self._finish_answer(topic, user_question, text_response)
+        except Exception as e:
+            raise Exception(f"Error en tutor de voz: {str(e)}")
+
+    async def _finish_answer(
+            self,
+            topic: str,
+            user_question: str,
+            text_response: str,
+            follow_up_suggestions: Optional[List[str]] = None
+    ) -> Dict[str, any]:
+        """
+        Genera a la vez el audio y (si faltan) las sugerencias de una respuesta
+
+        Las dos etapas no dependen entre sí: se lanzan como tareas
+        concurrentes y cada una registra su duración. Las sugerencias tienen
+        un plazo propio; si no llegan a tiempo se usan las de por defecto.
+        """
+        audio_task = asyncio.ensure_future(
+            self._timed_stage("audio", audio_service.generate_audio(text_response))
+        )
+        suggestions_task = None
+        if follow_up_suggestions is None:
+            suggestions_task = asyncio.ensure_future(
+                self._timed_stage("suggestions", self._suggestions_with_deadline(topic, user_question, text_response))
+            )
+
+        try:
+            audio_response = await audio_task
+            if suggestions_task is not None:
+                follow_up_suggestions = await suggestions_task
+        finally:
+            # Si falla el audio no tiene sentido seguir esperando las sugerencias
+            if suggestions_task is not None and not suggestions_task.done():
+                suggestions_task.cancel()
+
+        return {
+            "text_response": text_response,
+            "audio_response": audio_response,
+            "follow_up_suggestions": follow_up_suggestions
+        }
+
+    async def _suggestions_with_deadline(self, topic: str, user_question: str, text_response: str) -> List[str]:
+        try:
+            return await asyncio.wait_for(
+                self._generate_suggestions(topic, user_question, text_response),
+                settings.VOICE_TUTOR_SUGGESTIONS_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            metrics_registry.increment("voice_tutor_suggestions_timeouts_total")
+            return list(self.FALLBACK_SUGGESTIONS)
+
+    async def _timed_stage(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record_stage(stage, started)
+
+    def _record_stage(self, stage: str, started: float):
+        metrics_registry.observe("voice_tutor_stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def _build_prompt(
+            self,
+            topic: str,
+            user_question: str,
+            conversation_history: List[Dict[str, str]] = None,
+            with_suggestions: bool = False
+    ) -> Tuple[str, str]:
+        """
+        Construye la instrucción de sistema y el prompt del tutor
+
+        Con with_suggestions el modelo devuelve además las preguntas de
+        seguimiento, en un JSON con "answer" y "suggestions"
+        """
+        # Construir contexto de conversación
+        context = ""
+        if conversation_history:
+            context = "\n".join([
+                f"{'Estudiante' if msg['role'] == 'user' else 'Tutor'}: {msg['content']}"
+                for msg in conversation_history[-10:]  # Últimos 10 mensajes
+            ])
+
+        system_instruction = f"""Eres un tutor experto, paciente y motivador especializado en {topic}.
 Tu objetivo es ayudar al estudiante a comprender conceptos de manera clara y didáctica."""
 
-            prompt = f"""{'Contexto de la conversación anterior:' + context if context else ''}
+        prompt = f"""{'Contexto de la conversación anterior:' + context if context else ''}
 
 El estudiante pregunta: "{user_question}"
 
@@ -43,18 +289,102 @@ Instrucciones:
 
 Responde SOLO con la explicación, sin mencionar que eres un tutor o una IA."""
 
-            # Generar respuesta de texto
-            text_response = await gemini_service.generate_text(
+        if with_suggestions:
+            prompt += """
+
+Además, propón exactamente 3 preguntas de seguimiento que el estudiante podría hacer para profundizar.
+
+Devuelve el resultado en formato JSON:
+{
+  "answer": "La explicación para el estudiante",
+  "suggestions": [
+    "¿Pregunta 1?",
+    "¿Pregunta 2?",
+    "¿Pregunta 3?"
+  ]
+}
+
+IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
+
+        return system_instruction, prompt
+
+    async def _generate_answer_with_suggestions(
+            self,
+            topic: str,
+            user_question: str,
+            conversation_history: List[Dict[str, str]] = None
+    ) -> Tuple[str, List[str]]:
+        """
+        Genera la respuesta y las sugerencias de seguimiento en una sola llamada
+
+        Si las sugerencias no se pueden leer se usan las de por defecto; si
+        tampoco hay respuesta se pide solo la explicación
+        """
+        system_instruction, prompt = self._build_prompt(
+            topic, user_question, conversation_history, with_suggestions=True
+        )
+        raw_response = await gemini_service.generate_text(
+            prompt=prompt,
+            system_instruction=system_instruction,
+            profile="tutor_combined",
+            service="voice_tutor",
+            response_schema=TutorAnswer
+        )
+
+        answer, suggestions = self._parse_answer(raw_response)
+        if answer is None:
+            system_instruction, prompt = self._build_prompt(topic, user_question, conversation_history)
+            answer = await gemini_service.generate_text(
                 prompt=prompt,
                 system_instruction=system_instruction,
-                temperature=0.8
+                profile="tutor",
+                service="voice_tutor"
             )
 
-            # Generar audio de la respuesta
-            audio_response = await audio_service.generate_audio(text_response)
+        return answer, suggestions
+
+    def _parse_answer(self, raw_response: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Extrae la explicación y las sugerencias del JSON del modelo
+        """
+        try:
+            data = extract_json(raw_response)
+        except JSONExtractionError:
+            data = None
+
+        if not isinstance(data, dict):
+            metrics_registry.increment("llm_json_parse_total", service="voice_tutor", outcome="invalid_json")
+            return None, list(self.FALLBACK_SUGGESTIONS)
+
+        answer = data.get("answer")
+        if not isinstance(answer, str) or not answer.strip():
+            answer = None
+
+        suggestions = [
+            suggestion.strip()
+            for suggestion in data.get("suggestions") or []
+            if isinstance(suggestion, str) and suggestion.strip()
+        ][:3]
 
-            # Generar sugerencias de seguimiento
-            suggestions_prompt = f"""Basándote en esta pregunta sobre {topic}: "{user_question}"
+        if answer is None or len(suggestions) < 3:
+            metrics_registry.increment("llm_json_parse_total", service="voice_tutor", outcome="schema_mismatch")
+            if len(suggestions) < 3:
+                suggestions = list(self.FALLBACK_SUGGESTIONS)
+        else:
+            metrics_registry.increment("llm_json_parse_total", service="voice_tutor", outcome="success")
+
+        return answer.strip() if answer else None, suggestions
+
+    async def _generate_suggestions(
+            self,
+            topic: str,
+            user_question: str,
+            text_response: str
+    ) -> List[str]:
+        """
+        Genera preguntas de seguimiento (con sugerencias por defecto si falla)
+        """
+        suggestions_prompt = f"""Basándote en esta pregunta sobre {topic}: "{user_question}"
 Y esta respuesta: "{text_response}"
 
 Genera exactamente 3 preguntas de seguimiento que un estudiante podría hacer para profundizar.
@@ -70,29 +400,26 @@ Devuelve el resultado en formato JSON:
 
 IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional ni markdown."""
 
-            try:
-                suggestions_response = await gemini_service.generate_json(
-                    prompt=suggestions_prompt,
-                    temperature=0.7
-                )
-                follow_up_suggestions = suggestions_response.get("suggestions", [])
-            except:
-                # Fallback si falla la generación
-                follow_up_suggestions = [
-                    "¿Puedes darme un ejemplo práctico?",
-                    "¿Cómo se relaciona esto con otros conceptos?",
-                    "¿Cuáles son los errores comunes al aprender esto?"
-                ]
-
-            return {
-                "text_response": text_response,
-                "audio_response": audio_response,
-                "follow_up_suggestions": follow_up_suggestions
-            }
-
-        except Exception as e:
-            raise Exception(f"Error en tutor de voz: {str(e)}")
+        try:
+            suggestions_response = await gemini_service.generate_json(
+                prompt=suggestions_prompt,
+                profile="tutor_suggestions",
+                service="voice_tutor",
+                response_schema=FollowUpSuggestions
+            )
+            suggestions = [
+                suggestion.strip()
+                for suggestion in suggestions_response.suggestions
+                if suggestion.strip()
+            ][:3]
+            # Con menos de 3 sugerencias se usan las de por defecto, como en _parse_answer
+            if len(suggestions) < 3:
+                return list(self.FALLBACK_SUGGESTIONS)
+            return suggestions
+        except Exception:
+            # Fallback si falla la generación
+            return list(self.FALLBACK_SUGGESTIONS)
 
 
 # Instancia singleton
-voice_tutor_service = VoiceTutorService()
\ No newline at end of file
+voice_tutor_service = VoiceTutorService()
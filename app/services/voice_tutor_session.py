@@ -0,0 +1,182 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.models.voice_conversation import VoiceConversation, VoiceConversationMessage
+from app.services.voice_tutor_service import voice_tutor_service
+from app.utils.dependencies import get_user_from_token
+from app.utils.metrics import metrics_registry
+import asyncio
+import uuid
+
+settings = get_settings()
+
+
+class ConversationWriter:
+    """
+    Guarda en segundo plano los mensajes de una conversación
+
+    Los mensajes se encolan sin esperar a la base de datos; una tarea los
+    escribe por lotes (una transacción por lote) en el pool de hilos.
+    """
+
+    def __init__(self, conversation_id: uuid.UUID, session_factory: Callable[[], Session]):
+        self.conversation_id = conversation_id
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+
+    def add(self, role: str, content: str, audio_url: Optional[str] = None):
+        self._queue.put_nowait({
+            "role": role,
+            "content": content,
+            "audio_url": audio_url,
+            "created_at": datetime.utcnow()
+        })
+
+    async def close(self):
+        """
+        Espera a que se guarden los mensajes pendientes
+        """
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _run(self):
+        closed = False
+        while not closed:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            closed = None in batch
+            batch = [message for message in batch if message is not None]
+            if not batch:
+                continue
+
+            try:
+                await run_in_threadpool(self._write, batch)
+            except Exception:
+                metrics_registry.increment("voice_tutor_persist_errors_total")
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        db = self._session_factory()
+        try:
+            db.add_all([
+                VoiceConversationMessage(conversation_id=self.conversation_id, **message)
+                for message in batch
+            ])
+            db.query(VoiceConversation).filter(
+                VoiceConversation.id == self.conversation_id
+            ).update({"last_message_at": batch[-1]["created_at"]})
+            db.commit()
+        finally:
+            db.close()
+
+
+class VoiceTutorSession:
+    """
+    Conversación con el tutor de voz abierta por WebSocket
+
+    El historial se mantiene en memoria, de modo que cada turno solo envía
+    la pregunta y solo cuesta el trabajo del modelo.
+    """
+
+    def __init__(
+            self,
+            conversation_id: uuid.UUID,
+            topic: str,
+            history: List[Dict[str, str]],
+            session_factory: Callable[[], Session]
+    ):
+        self.conversation_id = conversation_id
+        self.topic = topic
+        self.history = history
+        self._writer = ConversationWriter(conversation_id, session_factory)
+
+    async def ask(self, question: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Responde una pregunta con texto y audio por frases (ver stream_speech)
+        """
+        async for event, data in voice_tutor_service.stream_speech(
+                topic=self.topic,
+                user_question=question,
+                conversation_history=list(self.history)
+        ):
+            if event == "done":
+                self._remember("user", question)
+                self._remember("assistant", data["text_response"])
+            yield event, data
+
+    def _remember(self, role: str, content: str):
+        self.history.append({"role": role, "content": content})
+        del self.history[:-settings.MAX_CONVERSATION_HISTORY]
+        self._writer.add(role, content)
+
+    async def close(self):
+        await self._writer.close()
+
+
+def _load_conversation(
+        db: Session,
+        token: str,
+        conversation_id: Optional[uuid.UUID],
+        topic: Optional[str]
+) -> Tuple[VoiceConversation, List[Dict[str, str]]]:
+    """
+    Autentica al usuario y abre (o crea) su conversación con el historial reciente
+    """
+    try:
+        user = get_user_from_token(token, db)
+
+        if conversation_id is not None:
+            conversation = db.query(VoiceConversation).filter(
+                VoiceConversation.id == conversation_id,
+                VoiceConversation.user_id == user.id
+            ).first()
+            if not conversation:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Conversación no encontrada"
+                )
+        elif topic and topic.strip():
+            conversation = VoiceConversation(user_id=user.id, topic=topic.strip())
+            db.add(conversation)
+            db.commit()
+            db.refresh(conversation)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Indica conversation_id o topic"
+            )
+
+        messages = db.query(VoiceConversationMessage).filter(
+            VoiceConversationMessage.conversation_id == conversation.id
+        ).order_by(VoiceConversationMessage.created_at.desc()).limit(settings.MAX_CONVERSATION_HISTORY).all()
+
+        history = [{"role": message.role, "content": message.content} for message in reversed(messages)]
+        return conversation, history
+    finally:
+        # La sesión no se vuelve a usar: se libera la conexión mientras dure el WebSocket
+        db.close()
+
+
+async def open_voice_tutor_session(
+        db: Session,
+        token: str,
+        conversation_id: Optional[uuid.UUID] = None,
+        topic: Optional[str] = None
+) -> VoiceTutorSession:
+    """
+    Abre una sesión del tutor; lanza HTTPException si el token o la conversación no son válidos
+
+    Los mensajes se guardan después con sesiones nuevas sobre la misma base de datos que db
+    """
+    conversation, history = await run_in_threadpool(_load_conversation, db, token, conversation_id, topic)
+    return VoiceTutorSession(
+        conversation.id,
+        conversation.topic,
+        history,
+        sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    )
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from typing import Optional, Dict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class CacheBackend:
+    """
+    Interfaz común para los backends de caché
+    """
+
+    evictions: int = 0
+    # Las operaciones hacen E/S y no deben ejecutarse en el event loop
+    blocking: bool = False
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: int):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Caché en memoria del proceso con TTL y desalojo LRU
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+
+            # Marcar como usado recientemente
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Caché persistente en disco (SQLite) que sobrevive a reinicios
+
+    Los aciertos no escriben en disco: last_access se acumula en memoria y
+    se guarda en bloque en el siguiente set o cada touch_batch aciertos.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 1000, touch_batch: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at < now:
+                self._touched.pop(key, None)
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touches()
+                self._conn.commit()
+            return value
+
+    def _flush_touches(self):
+        """
+        Escribe los last_access pendientes (sin commit; lo hace quien llama)
+        """
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache_entries SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def set(self, key: str, value: str, ttl: int):
+        now = time.time()
+        with self._lock:
+            # El desalojo necesita los accesos recientes
+            self._flush_touches()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+
+            # Desalojar las entradas menos usadas si se supera el límite
+            count = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    """DELETE FROM cache_entries WHERE key IN (
+                        SELECT key FROM cache_entries ORDER BY last_access ASC LIMIT ?
+                    )""",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Caché de respuestas con contadores de aciertos y fallos
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Genera una clave determinista a partir de los parámetros de la llamada
+        """
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        self.backend.set(key, value, ttl)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self.backend.size(),
+                "evictions": self.backend.evictions
+            }
+
+
+def build_cache_backend(backend: str, max_entries: int, path: str) -> Optional[CacheBackend]:
+    """
+    Crea el backend configurado (memory, sqlite o none)
+    """
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(path=path, max_entries=max_entries)
+    if backend == "none":
+        return None
+    raise ValueError(f"Backend de caché desconocido: {backend}")
@@ -0,0 +1,319 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from collections import deque
+from app.config import get_settings
+from app.utils.metrics import metrics_registry
+import asyncio
+import threading
+import time
+
+settings = get_settings()
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas idénticas en curso para que compartan un único resultado
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta func una sola vez por clave mientras haya una llamada en curso
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+
+            def forget(done: asyncio.Future):
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            future.add_done_callback(forget)
+
+        # shield: cancelar a un solicitante no cancela la llamada compartida
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight_keys": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    El proveedor está saturado: la llamada no obtuvo turno a tiempo
+    """
+
+    def __init__(self, name: str, limit: int):
+        super().__init__(f"Demasiadas peticiones en curso a {name} (límite actual {limit})")
+        self.status_code = 503
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Límite de llamadas en curso a un proveedor que se ajusta solo (AIMD)
+
+    Mientras la latencia reciente se mantiene cerca de la habitual el límite
+    crece en 1/límite por llamada correcta (≈ +1 por ronda completa); si la
+    latencia reciente supera latency_tolerance veces la habitual, o la llamada
+    falla por sobrecarga (timeout, 429, 5xx), el límite se multiplica por
+    backoff_ratio, como mucho una vez por intervalo de latencia. Las llamadas
+    que no obtienen turno en max_wait segundos se rechazan.
+    """
+
+    SUCCESS = "success"
+    OVERLOAD = "overload"
+    IGNORE = "ignore"
+
+    def __init__(
+            self,
+            name: str,
+            initial_limit: int = 8,
+            min_limit: int = 1,
+            max_limit: int = 64,
+            latency_tolerance: float = 2.0,
+            backoff_ratio: float = 0.7,
+            max_wait: float = 10.0
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.max_wait = max_wait
+
+        self.in_flight = 0
+        self.rejections = 0
+        # Latencia habitual (media lenta) y reciente (media rápida)
+        self.long_latency: Optional[float] = None
+        self.short_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self, max_wait: Optional[float] = None) -> float:
+        """
+        Espera turno y devuelve el instante de inicio para medir la latencia
+        """
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return time.monotonic()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        wait_started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait if max_wait is None else max_wait)
+        except asyncio.TimeoutError:
+            self.rejections += 1
+            metrics_registry.increment("upstream_limiter_rejections_total", provider=self.name)
+            raise ConcurrencyLimitExceeded(self.name, self.current_limit)
+        except asyncio.CancelledError:
+            # Si ya se le había cedido el turno, se devuelve
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake_waiters()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        metrics_registry.observe(
+            "upstream_limiter_wait_seconds", time.monotonic() - wait_started, provider=self.name
+        )
+        return time.monotonic()
+
+    def release(self, started: float, outcome: str, latency: Optional[float] = None):
+        """
+        Libera el turno y ajusta el límite según el resultado de la llamada
+        """
+        now = time.monotonic()
+        if latency is None:
+            latency = now - started
+
+        with self._lock:
+            self.in_flight -= 1
+            if outcome == self.SUCCESS:
+                self._on_success(latency, now)
+            elif outcome == self.OVERLOAD:
+                self._decrease(now)
+
+        self._publish()
+        self._wake_waiters()
+
+    def _on_success(self, latency: float, now: float):
+        if self.long_latency is None:
+            self.long_latency = self.short_latency = latency
+        else:
+            self.long_latency += 0.02 * (latency - self.long_latency)
+            self.short_latency += 0.2 * (latency - self.short_latency)
+
+        if self.short_latency > self.long_latency * self.latency_tolerance:
+            self._decrease(now)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self, now: float):
+        # Un solo recorte por intervalo de latencia: una ráfaga de fallos
+        # simultáneos no debe hundir el límite
+        interval = self.short_latency or 1.0
+        if now - self._last_decrease < interval:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._publish()
+
+    def _publish(self):
+        metrics_registry.set_gauge("upstream_concurrency_limit", self.current_limit, provider=self.name)
+        metrics_registry.set_gauge("upstream_in_flight", self.in_flight, provider=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rejections": self.rejections,
+            "latency_long": round(self.long_latency, 4) if self.long_latency is not None else None,
+            "latency_short": round(self.short_latency, 4) if self.short_latency is not None else None
+        }
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(provider: str) -> Optional[AdaptiveConcurrencyLimiter]:
+    """
+    Devuelve el limitador del proveedor ("gemini:fast", "d-id"...) o None si
+    su familia no tiene límite adaptativo configurado
+    """
+    config = settings.ADAPTIVE_CONCURRENCY.get(provider.split(":")[0])
+    if not config:
+        return None
+
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = AdaptiveConcurrencyLimiter(provider, **config)
+        return _limiters[provider]
+
+
+def get_concurrency_limiter_states() -> Dict[str, Dict[str, Any]]:
+    """
+    Estado de todos los limitadores creados
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+class LatencyWindow:
+    """
+    Últimas latencias observadas, para estimar percentiles recientes
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """
+    Limita las peticiones duplicadas a una fracción de las peticiones totales
+
+    Cada petición aporta ratio créditos (hasta burst) y cada duplicado
+    consume uno, de modo que a largo plazo los duplicados nunca superan
+    ratio veces el tráfico normal.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = burst
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.credits = min(self.burst, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.credits < 1:
+                return False
+            self.credits -= 1
+            return True
+
+
+async def hedged_call(
+        func: Callable[[], Awaitable[Any]],
+        delay: float,
+        can_hedge: Callable[[], bool],
+        is_valid: Callable[[Any], bool] = lambda result: True,
+        on_hedge: Optional[Callable[[], None]] = None
+) -> Tuple[Any, bool]:
+    """
+    Ejecuta func y, si no termina en delay segundos, lanza un duplicado
+
+    Devuelve el primer resultado válido y si lo aportó el duplicado; la
+    llamada perdedora se cancela. Solo se duplica si can_hedge() lo permite.
+    Si ninguna da un resultado válido se propaga el de la original.
+    """
+    primary = asyncio.ensure_future(func())
+    tasks = [primary]
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not can_hedge():
+            return await primary, False
+
+        if on_hedge:
+            on_hedge()
+        hedge = asyncio.ensure_future(func())
+        tasks.append(hedge)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Si terminan a la vez se prefiere la original
+            for task in sorted(done, key=lambda finished: finished is hedge):
+                if task.exception() is None and is_valid(task.result()):
+                    return task.result(), task is hedge
+        # Ninguna dio un resultado válido: se devuelve el de la original
+        return await primary, False
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
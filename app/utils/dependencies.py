@@ -1,13 +1,18 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.config import get_settings
 from app.database import get_db
 from app.utils.security import decode_access_token
 from app.models.user import User
 from typing import Optional
+import hmac
 import uuid
 
+settings = get_settings()
+
 security = HTTPBearer()
+metrics_security = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
@@ -17,13 +22,19 @@ async def get_current_user(
     """
     Obtiene el usuario actual desde el token JWT
     """
+    return get_user_from_token(credentials.credentials, db)
+
+
+def get_user_from_token(token: str, db: Session) -> User:
+    """
+    Valida el token JWT y devuelve su usuario (también para WebSockets)
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = credentials.credentials
     payload = decode_access_token(token)
 
     if payload is None:
@@ -63,4 +74,21 @@ async def get_current_active_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuario inactivo"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def verify_metrics_token(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_security)
+):
+    """
+    Protege los endpoints de estado interno con METRICS_TOKEN (sin él no existen)
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if credentials is None or not hmac.compare_digest(credentials.credentials, settings.METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas no válido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
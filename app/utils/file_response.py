@@ -0,0 +1,104 @@
+from typing import Iterator, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from app.config import get_settings
+import os
+import re
+
+settings = get_settings()
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta una cabecera Range de un solo rango sobre un archivo de size bytes
+
+    Devuelve (inicio, fin) inclusivos, o None si el rango no se puede servir.
+    Lanza ValueError si la cabecera no es de bytes con un único rango (en
+    ese caso se responde el archivo completo, como permite HTTP)
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        raise ValueError(f"Range no soportado: {header}")
+
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError(f"Range no soportado: {header}")
+
+    if not start:
+        # Sufijo: los últimos N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(settings.MEDIA_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+        request: Request,
+        path: str,
+        media_type: str,
+        etag: Optional[str] = None,
+        cache_control: str = "private, max-age=86400"
+) -> Response:
+    """
+    Sirve un archivo con ETag, If-None-Match y peticiones Range de un rango
+
+    El archivo completo va por FileResponse y un rango se lee del disco en
+    bloques de MEDIA_CHUNK_BYTES. Starlette 0.35 no usa sendfile: en ambos
+    casos el archivo se lee por bloques en Python, sin cargarlo entero.
+    """
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    etag = f'"{etag}"' if etag else None
+    headers = {"accept-ranges": "bytes", "cache-control": cache_control}
+    if etag:
+        headers["etag"] = etag
+
+    if etag and etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range: el rango solo vale si el cliente tiene la misma versión del archivo
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            # Varios rangos o unidades que no son bytes: se envía el archivo completo
+            pass
+        else:
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    if byte_range is not None:
+        start, end = byte_range
+        return StreamingResponse(
+            _iter_file(path, start, end - start + 1),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **headers,
+                "content-range": f"bytes {start}-{end}/{size}",
+                "content-length": str(end - start + 1)
+            }
+        )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
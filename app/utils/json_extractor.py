@@ -0,0 +1,96 @@
+from typing import Any, Optional
+import json
+import re
+
+# Inicio de un objeto o array JSON
+_OPENER_RE = re.compile(r"[{\[]")
+
+# Tokens estructurales: cadenas completas (con escapes) y corchetes.
+# Patrón "desenrollado" sin cuantificadores ambiguos: lineal incluso si falla.
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.DOTALL)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+_DECODER = json.JSONDecoder()
+
+
+class JSONExtractionError(ValueError):
+    """
+    Error al extraer JSON de una respuesta del modelo, con la posición exacta
+    """
+
+    def __init__(self, message: str, text: str, position: int):
+        self.message = message
+        self.position = position
+        self.line = text.count("\n", 0, position) + 1
+        self.column = position - (text.rfind("\n", 0, position) + 1) + 1
+        self.snippet = text[max(0, position - 40):position + 40]
+        super().__init__(
+            f"{message} (línea {self.line}, columna {self.column}, posición {position}): "
+            f"...{self.snippet}..."
+        )
+
+
+def extract_json(text: str) -> Any:
+    """
+    Extrae el primer objeto o array JSON balanceado de un texto
+
+    Tolera bloques de código markdown y texto antes o después del JSON.
+    Cada carácter se examina como máximo una vez por el decodificador y una
+    por el escáner de corchetes; si no hay JSON válido lanza
+    JSONExtractionError indicando dónde falló el análisis.
+    """
+    first_error: Optional[JSONExtractionError] = None
+    search_from = 0
+
+    while True:
+        opener = _OPENER_RE.search(text, search_from)
+        if opener is None:
+            break
+
+        start = opener.start()
+
+        # raw_decode ignora lo que venga después del valor (``` o texto final)
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError as e:
+            if first_error is None:
+                first_error = JSONExtractionError(f"JSON inválido: {e.msg}", text, e.pos)
+
+        # Saltar el candidato completo para continuar sin volver a recorrerlo
+        end = _skip_balanced(text, start)
+        if end is None:
+            break
+        search_from = end
+
+    if first_error is not None:
+        raise first_error
+
+    raise JSONExtractionError("No se encontró ningún objeto o array JSON", text, 0)
+
+
+def _skip_balanced(text: str, start: int) -> Optional[int]:
+    """
+    Devuelve la posición siguiente al bloque balanceado que empieza en start
+
+    Respeta cadenas y escapes. Si encuentra un cierre que no corresponde
+    devuelve la posición siguiente a ese cierre; si el bloque no se cierra
+    antes del final del texto devuelve None.
+    """
+    stack = []
+
+    for token in _TOKEN_RE.finditer(text, start):
+        value = token.group()
+        if value[0] == '"':
+            continue
+
+        if value in _CLOSERS:
+            stack.append(_CLOSERS[value])
+        elif not stack or stack.pop() != value:
+            return token.end()
+
+        if not stack:
+            return token.end()
+
+    return None
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens: rate tokens por segundo hasta un máximo de capacity
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def wait_time(self, now: float) -> float:
+        """
+        Segundos hasta que haya un token disponible
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class ApiKey:
+    """
+    Clave de API del pool con su cubeta (si hay límite), enfriamiento y contadores de uso
+    """
+
+    def __init__(self, index: int, value: str, rate: Optional[float], capacity: float):
+        self.index = index
+        self.value = value
+        self.bucket = TokenBucket(rate, capacity) if rate else None
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    @property
+    def label(self) -> str:
+        # No se expone ninguna parte de la clave
+        return f"key-{self.index}"
+
+
+class ApiKeyPool:
+    """
+    Reparte las peticiones entre varias claves de API
+
+    Con requests_per_minute cada clave tiene su propia cubeta de tokens
+    (peticiones por minuto del proyecto) y se elige la de más capacidad
+    disponible; sin él no hay límite en el cliente y se elige la menos usada.
+    Las claves que reciben 429 o errores de cuota se enfrían durante
+    cooldown_seconds.
+    """
+
+    def __init__(
+            self,
+            keys: List[str],
+            requests_per_minute: Optional[float] = None,
+            burst: float = 10.0,
+            cooldown_seconds: float = 60.0
+    ):
+        if not keys:
+            raise ValueError("El pool necesita al menos una clave de API")
+
+        self.cooldown_seconds = cooldown_seconds
+        self.keys = [
+            ApiKey(index, value, requests_per_minute / 60.0 if requests_per_minute else None, burst)
+            for index, value in enumerate(keys)
+        ]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def try_acquire(self) -> Optional[ApiKey]:
+        """
+        Reserva una petición en la clave con más capacidad; None si no hay ninguna libre
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                key for key in self.keys
+                if key.cooldown_until <= now and (key.bucket is None or key.bucket.available(now) >= 1)
+            ]
+            if not candidates:
+                return None
+
+            key = max(candidates, key=lambda candidate: (
+                candidate.bucket.tokens if candidate.bucket else float("inf"), -candidate.requests
+            ))
+            if key.bucket is not None:
+                key.bucket.take(now)
+            key.requests += 1
+            return key
+
+    def wait_time(self) -> float:
+        """
+        Segundos hasta que alguna clave vuelva a tener capacidad
+        """
+        with self._lock:
+            now = time.monotonic()
+            return min(
+                max(key.cooldown_until - now, key.bucket.wait_time(now) if key.bucket else 0.0)
+                for key in self.keys
+            )
+
+    async def acquire(self, timeout: Optional[float] = None) -> Optional[ApiKey]:
+        """
+        Espera (como máximo timeout segundos) a que haya una clave disponible
+
+        La espera es en el event loop, antes de ocupar un hilo del pool de Gemini
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            key = self.try_acquire()
+            if key is not None:
+                return key
+
+            wait = self.wait_time()
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return None
+            await asyncio.sleep(max(wait, 0.01))
+
+    def report_throttled(self, key: ApiKey, retry_after: Optional[float] = None):
+        """
+        La clave recibió 429 o agotó su cuota: se deja de usar durante un tiempo
+        """
+        with self._lock:
+            key.throttled += 1
+            key.errors += 1
+            key.cooldown_until = time.monotonic() + (retry_after or self.cooldown_seconds)
+
+    def report_error(self, key: ApiKey):
+        with self._lock:
+            key.errors += 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": key.label,
+                    "requests": key.requests,
+                    "errors": key.errors,
+                    "throttled": key.throttled,
+                    "available_tokens": round(key.bucket.available(now), 2) if key.bucket else None,
+                    "cooldown_remaining": round(max(0.0, key.cooldown_until - now), 1)
+                }
+                for key in self.keys
+            ]
@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Optional, Tuple
+import bisect
+import threading
+
+# Límites de los buckets de latencia en segundos
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _label_set(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """
+    Histograma con buckets fijos: cuenta, suma y percentiles aproximados
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Un bucket extra para los valores por encima del último límite
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estima el percentil q (0-1) como el límite superior de su bucket
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": {
+                **{str(limit): count for limit, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en memoria del proceso (contadores, valores e histogramas con etiquetas)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Suma value al contador name con las etiquetas dadas
+        """
+        key = _label_set(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """
+        Fija el valor actual de name (p. ej. un límite o una cola)
+        """
+        key = _label_set(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def get_gauge(self, name: str, **labels) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(name, {}).get(_label_set(labels))
+
+    def observe(self, name: str, value: float, buckets: Optional[Tuple[float, ...]] = None, **labels):
+        """
+        Registra una observación en el histograma name
+        """
+        key = _label_set(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets or DEFAULT_LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_set(labels), 0)
+
+    def get_histogram(self, name: str, **labels) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_set(labels))
+            return histogram.snapshot() if histogram else None
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Devuelve todas las series, opcionalmente filtradas por prefijo de nombre
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for name, series in sorted(self._counters.items())
+                if prefix is None or name.startswith(prefix)
+                for labels, value in sorted(series.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for name, series in sorted(self._gauges.items())
+                if prefix is None or name.startswith(prefix)
+                for labels, value in sorted(series.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                for name, series in sorted(self._histograms.items())
+                if prefix is None or name.startswith(prefix)
+                for labels, histogram in sorted(series.items())
+            ]
+
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Registro global del proceso
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,361 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config import get_settings
+from app.utils.concurrency import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+import asyncio
+import random
+import threading
+import time
+import httpx
+
+settings = get_settings()
+
+# Códigos HTTP que indican un fallo transitorio del proveedor
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Nombres de excepciones de red de librerías de terceros (requests, gTTS, google-api-core)
+_RETRYABLE_EXCEPTION_NAMES = {
+    "ConnectionError",
+    "Timeout",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "ResourceExhausted",
+    "InternalServerError",
+    "TooManyRequests",
+}
+
+
+class UpstreamError(Exception):
+    """
+    Error devuelto por un proveedor externo (Gemini, gTTS, D-ID)
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class CircuitOpenError(UpstreamError):
+    """
+    El circuito del proveedor está abierto: se falla rápido sin llamarlo
+    """
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(
+            f"Servicio {provider} no disponible temporalmente. Intenta de nuevo en {retry_in:.0f}s",
+            status_code=503,
+            retryable=False
+        )
+        self.provider = provider
+
+
+class DeadlineExceededError(UpstreamError):
+    """
+    Se agotó el presupuesto de tiempo de la petición
+    """
+
+    def __init__(self, provider: str, budget: float):
+        super().__init__(
+            f"Tiempo agotado esperando a {provider} ({budget:.0f}s)",
+            status_code=504,
+            retryable=False
+        )
+
+
+def get_status_code(exc: Exception) -> Optional[int]:
+    """
+    Obtiene el código HTTP asociado a una excepción, si lo hay
+    """
+    status_code = getattr(exc, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code
+
+    # google-api-core expone el código HTTP en .code
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+
+    response = getattr(exc, "response", None) or getattr(exc, "rsp", None)
+    status_code = getattr(response, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code
+
+    return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Clasifica un error como reintentable (transitorio) o terminal
+    """
+    if isinstance(exc, UpstreamError) and exc.retryable is not None:
+        return exc.retryable
+
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+
+    status_code = get_status_code(exc)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+
+    return any(cls.__name__ in _RETRYABLE_EXCEPTION_NAMES for cls in type(exc).__mro__)
+
+
+def is_retryable_before_send(exc: Exception) -> bool:
+    """
+    Clasificación para peticiones no idempotentes (p. ej. crear un video):
+    solo se reintenta si la petición no llegó a procesarse
+    """
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return get_status_code(exc) == 429
+
+
+def is_quota_error(exc: Exception) -> bool:
+    """
+    Indica si el error se debe a límite de peticiones (429) o cuota agotada
+    """
+    if get_status_code(exc) == 429:
+        return True
+    if any(cls.__name__ in ("ResourceExhausted", "TooManyRequests") for cls in type(exc).__mro__):
+        return True
+    return "quota" in str(exc).lower()
+
+
+class RetryPolicy:
+    """
+    Reintentos con backoff exponencial y jitter completo
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay: float = 0.5,
+            max_delay: float = 8.0,
+            multiplier: float = 2.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def compute_delay(self, attempt: int) -> float:
+        """
+        Espera antes del reintento número attempt (empezando en 0)
+        """
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** attempt))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Circuito por proveedor: tras varios fallos seguidos deja de llamarlo
+    durante un tiempo y después deja pasar una llamada de prueba
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Lanza CircuitOpenError si el circuito no admite llamadas
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+
+            raise CircuitOpenError(self.name, max(0.0, self.recovery_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        Libera la llamada de prueba sin registrar resultado (p. ej. si se cancela)
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class Deadline:
+    """
+    Presupuesto de tiempo total para una llamada (incluidos los reintentos)
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Devuelve el circuito del proveedor (uno por proceso)
+    """
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_SECONDS
+            )
+        return _breakers[provider]
+
+
+def get_circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """
+    Estado de todos los circuitos registrados
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=settings.RESILIENCE_MAX_ATTEMPTS,
+        base_delay=settings.RESILIENCE_BASE_DELAY,
+        max_delay=settings.RESILIENCE_MAX_DELAY
+    )
+
+
+async def call_with_resilience(
+        provider: str,
+        func: Callable[[Optional[float]], Awaitable[Any]],
+        attempt_timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        policy: Optional[RetryPolicy] = None,
+        retryable: Callable[[Exception], bool] = is_retryable,
+        on_retry: Optional[Callable[[int, Exception], None]] = None
+) -> Any:
+    """
+    Llama a un proveedor externo con circuito, reintentos y presupuesto de tiempo
+
+    func recibe el timeout disponible para el intento (segundos o None) para
+    poder propagarlo al cliente HTTP/SDK. Si el proveedor tiene límite de
+    concurrencia adaptativo, cada intento espera turno; el rechazo por
+    saturación (ConcurrencyLimitExceeded) no se reintenta.
+    """
+    breaker = get_circuit_breaker(provider)
+    limiter = get_concurrency_limiter(provider)
+    policy = policy or default_retry_policy()
+    budget = Deadline(deadline)
+
+    attempt = 0
+    while True:
+        started = None
+        if limiter is not None:
+            remaining = budget.remaining()
+            started = await limiter.acquire(
+                min(limiter.max_wait, max(remaining, 0.0)) if remaining is not None else None
+            )
+
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            if limiter is not None:
+                limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+            raise
+
+        timeout = attempt_timeout
+        remaining = budget.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                breaker.release()
+                if limiter is not None:
+                    limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+                raise DeadlineExceededError(provider, deadline)
+            timeout = min(timeout, remaining) if timeout else remaining
+
+        try:
+            if timeout:
+                result = await asyncio.wait_for(func(timeout), timeout)
+            else:
+                result = await func(timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            if limiter is not None:
+                limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+            raise
+        except Exception as e:
+            if isinstance(e, CircuitOpenError):
+                if limiter is not None:
+                    limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+                raise
+
+            transient = retryable(e)
+            if transient:
+                breaker.record_failure()
+            else:
+                # El proveedor respondió (p. ej. 400): no indica que esté caído
+                breaker.record_success()
+            if limiter is not None:
+                limiter.release(
+                    started,
+                    AdaptiveConcurrencyLimiter.OVERLOAD if transient else AdaptiveConcurrencyLimiter.IGNORE
+                )
+
+            attempt += 1
+            delay = policy.compute_delay(attempt - 1)
+            remaining = budget.remaining()
+            # Sin más intentos o sin tiempo para el siguiente se devuelve el error
+            if not transient or attempt >= policy.max_attempts or (remaining is not None and delay >= remaining):
+                if isinstance(e, asyncio.TimeoutError):
+                    raise UpstreamError(f"Tiempo agotado esperando a {provider}", status_code=504, retryable=True)
+                raise
+
+            if on_retry:
+                on_retry(attempt, e)
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            if limiter is not None:
+                limiter.release(started, AdaptiveConcurrencyLimiter.SUCCESS)
+            return result
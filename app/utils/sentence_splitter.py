@@ -0,0 +1,56 @@
+from typing import List
+import re
+
+# Fin de frase: puntuación final (con comillas o paréntesis de cierre) seguida
+# de espacio, o un salto de línea. "3.14" o "p.ej" no cortan la frase
+_SENTENCE_END = re.compile(r'[.!?…]+["»”)\]]*\s+|\n+')
+
+
+class SentenceSplitter:
+    """
+    Corta en frases completas un texto que llega por fragmentos (streaming)
+
+    Las frases más cortas que min_chars se unen a la siguiente para no
+    sintetizar audio de dos palabras; las que superan max_chars sin
+    puntuación se cortan en la última coma o espacio.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 250):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Añade un fragmento y devuelve las frases que ya están completas
+        """
+        self._buffer += text
+        sentences = []
+
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+
+        while len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(", ", 0, self.max_chars) + 1
+            if cut < self.min_chars:
+                cut = self._buffer.rfind(" ", 0, self.max_chars)
+            if cut < self.min_chars:
+                cut = self.max_chars
+            sentences.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:]
+
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        Devuelve el texto pendiente al terminar el stream
+        """
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
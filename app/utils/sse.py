@@ -0,0 +1,28 @@
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Optional
+import json
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """
+    Formatea un evento Server-Sent Events con datos JSON
+    """
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return message
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Crea la respuesta HTTP para un stream de eventos SSE
+    """
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # evitar buffering en proxies (nginx)
+        }
+    )
@@ -0,0 +1,93 @@
+"""
+Benchmark de la API completa sin consumir cuota de Gemini
+
+Levanta la aplicación FastAPI en proceso (ASGI) con el proveedor de LLM
+simulado y lanza peticiones concurrentes contra los endpoints de IA.
+Necesita una base de datos accesible en DATABASE_URL (Postgres de pruebas).
+
+Uso:
+    LLM_PROVIDER=fake FAKE_LLM_LATENCY_MEAN_MS=400 FAKE_LLM_ERROR_RATE=0.05 \\
+        python -m benchmarks.bench_api_offline --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx
+from app.main import app
+from app.utils.metrics import metrics_registry
+
+ENDPOINTS = {
+    "flashcards": ("/api/v1/flashcards/generate", {"topic": "Fotosíntesis"}),
+    "concept_map": ("/api/v1/concept-map/generate", {"topic": "Fotosíntesis"}),
+    "feynman": ("/api/v1/feynman/explanation", {"topic": "Fotosíntesis"}),
+}
+
+
+async def register(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": f"bench-{uuid.uuid4().hex[:8]}@gmail.com",
+            "password": "Bench123",
+            "full_name": "Benchmark"
+        }
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(endpoint: str, total: int, concurrency: int, vary_topic: bool):
+    path, body = ENDPOINTS[endpoint]
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        headers = {"Authorization": f"Bearer {await register(client)}"}
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        statuses = {}
+
+        async def one(index: int):
+            payload = dict(body)
+            if vary_topic and "topic" in payload:
+                payload["topic"] = f"{payload['topic']} {index}"
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(path, json=payload, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(total)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{endpoint}: {total} peticiones, concurrencia {concurrency}, {elapsed:.2f}s")
+    print(f"  throughput: {total / elapsed:.1f} req/s")
+    print(f"  p50: {statistics.median(latencies) * 1000:.0f} ms")
+    print(f"  p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"  p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms")
+    print(f"  estados: {statuses}")
+
+    for histogram in metrics_registry.snapshot("llm_latency")["histograms"]:
+        print(f"  {histogram['labels']}: n={histogram['count']} p50={histogram['p50']} p99={histogram['p99']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="flashcards")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--same-topic", action="store_true", help="repite el tema (mide caché y agrupación)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.endpoint, args.requests, args.concurrency, not args.same_topic))
+
+
+if __name__ == "__main__":
+    main()
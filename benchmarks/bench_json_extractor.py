@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: extractor JSON de una pasada vs. el parseo anterior con regex
+
+Uso:
+    python -m benchmarks.bench_json_extractor
+"""
+import json
+import re
+import timeit
+from app.utils.json_extractor import extract_json, JSONExtractionError
+
+
+def legacy_parse(text_response: str):
+    """
+    Implementación anterior de GeminiService.generate_json (limpieza + regex)
+    """
+    cleaned_text = text_response.strip()
+
+    if cleaned_text.startswith("```json"):
+        cleaned_text = cleaned_text[7:]
+    elif cleaned_text.startswith("```"):
+        cleaned_text = cleaned_text[3:]
+
+    if cleaned_text.endswith("```"):
+        cleaned_text = cleaned_text[:-3]
+
+    cleaned_text = cleaned_text.strip()
+
+    try:
+        return json.loads(cleaned_text)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{.*\}', cleaned_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group(0))
+            except json.JSONDecodeError:
+                pass
+
+        array_match = re.search(r'\[.*\]', cleaned_text, re.DOTALL)
+        if array_match:
+            try:
+                return {"data": json.loads(array_match.group(0))}
+            except json.JSONDecodeError:
+                pass
+
+        raise Exception("No se pudo extraer JSON válido")
+
+
+def build_quiz_payload(questions: int) -> str:
+    """
+    Respuesta tipo quiz de gran tamaño (~8192 tokens con 120 preguntas)
+    """
+    data = {
+        "questions": [
+            {
+                "question": f"¿Cuál es la función {{principal}} del concepto número {i} en la \"fotosíntesis\"?",
+                "options": [f"Opción {c} de la pregunta {i} con [corchetes] y {{llaves}}" for c in "ABCD"],
+                "correct_answer": f"Opción B de la pregunta {i} con [corchetes] y {{llaves}}"
+            }
+            for i in range(questions)
+        ]
+    }
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def build_cases():
+    payload = build_quiz_payload(120)
+    prose = "Claro, aquí tienes el quiz solicitado sobre el tema {Fotosíntesis}:\n\n"
+    trailing = "\n\nEspero que te sirva. Si necesitas [más preguntas] avísame."
+
+    return {
+        "json puro": payload,
+        "bloque ```json": f"```json\n{payload}\n```",
+        "texto antes y después": prose + payload + trailing,
+        "coma final (malformado)": payload[:-2] + ",\n}",
+        "truncado (malformado)": payload[: len(payload) // 2],
+    }
+
+
+def run(func, text):
+    """
+    Ejecuta el parser y resume el resultado (claves de primer nivel o error)
+    """
+    try:
+        result = func(text)
+    except (Exception, JSONExtractionError):
+        return "error"
+    if isinstance(result, dict):
+        return "{" + ",".join(result) + "}"
+    return type(result).__name__
+
+
+def main(number: int = 200):
+    print(f"{'caso':<26} {'bytes':>8} {'regex (ms)':>12} {'extractor (ms)':>15} {'aceleración':>12}  resultado (regex / extractor)")
+    for name, text in build_cases().items():
+        legacy = timeit.timeit(lambda: run(legacy_parse, text), number=number) / number * 1000
+        current = timeit.timeit(lambda: run(extract_json, text), number=number) / number * 1000
+        outcome = f"{run(legacy_parse, text)} / {run(extract_json, text)}"
+        print(f"{name:<26} {len(text.encode()):>8} {legacy:>12.3f} {current:>15.3f} {legacy / current:>11.1f}x  {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: coste por llamada de preparar el modelo de Gemini
+
+Compara el camino anterior (diccionario de configuración nuevo y
+GenerativeModel nuevo en cada llamada) con el registro de modelos del
+proveedor y la configuración memorizada de GeminiService. No hace
+peticiones de red: mide solo la preparación previa a generate_content.
+
+Uso:
+    python -m benchmarks.bench_model_registry
+"""
+import timeit
+import google.generativeai as genai
+from app.schemas.flashcard import FlashcardGenerationResponse
+from app.services.gemini_service import gemini_service
+from app.services.llm_provider import GeminiProvider
+
+MODEL_NAME = "gemini-2.5-flash"
+
+
+def legacy_prepare(temperature: float, response_schema=None):
+    """
+    Preparación anterior de _generate_text_uncached
+    """
+    generation_config = {
+        "temperature": temperature,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,
+    }
+    if response_schema is not None:
+        generation_config["response_mime_type"] = "application/json"
+        generation_config["response_schema"] = response_schema
+
+    model = genai.GenerativeModel(model_name=MODEL_NAME)
+    return model, generation_config
+
+
+def registry_prepare(provider: GeminiProvider, temperature: float, response_schema=None):
+    """
+    Preparación actual: configuración memorizada y modelo del registro
+    """
+    generation_config = gemini_service._generation_config("default", temperature, response_schema)
+    return provider.get_model(MODEL_NAME, generation_config)
+
+
+def main():
+    provider = GeminiProvider(api_keys=["benchmark"])
+    number = 20000
+
+    cases = [
+        ("texto", 0.8, None),
+        ("JSON con esquema", 0.8, FlashcardGenerationResponse),
+    ]
+
+    print(f"{'caso':<20}{'anterior (µs)':>16}{'registro (µs)':>16}{'mejora':>10}")
+    for label, temperature, schema in cases:
+        legacy = timeit.timeit(lambda: legacy_prepare(temperature, schema), number=number)
+        current = timeit.timeit(lambda: registry_prepare(provider, temperature, schema), number=number)
+        print(
+            f"{label:<20}{legacy / number * 1e6:>16.2f}{current / number * 1e6:>16.2f}"
+            f"{legacy / current:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
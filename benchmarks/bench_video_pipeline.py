@@ -0,0 +1,132 @@
+"""
+Benchmark del pipeline de videos contra un D-ID simulado
+
+Arranca en el mismo proceso el servidor de benchmarks.fake_did_server y la
+aplicación (ASGI) con el proveedor de LLM simulado, encola --videos trabajos
+por POST /video/generate y consulta /video/jobs/{id} hasta que terminan.
+Informa del tiempo hasta done por trabajo y de las llamadas que recibió D-ID.
+Necesita una base de datos accesible en DATABASE_URL (Postgres de pruebas).
+
+Uso:
+    LLM_PROVIDER=fake python -m benchmarks.bench_video_pipeline --videos 50 --render-seconds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("D_ID_BASE_URL", "http://127.0.0.1:8081")
+
+import httpx
+import uvicorn
+from app.config import get_settings
+from app.main import app
+from app.services.video_service import video_service
+from app.utils.metrics import metrics_registry
+from benchmarks.fake_did_server import create_app
+
+settings = get_settings()
+
+
+async def register(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": f"bench-{uuid.uuid4().hex[:8]}@gmail.com",
+            "password": "Bench123",
+            "full_name": "Benchmark"
+        }
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def start_fake_did(render_seconds: float, error_rate: float) -> uvicorn.Server:
+    host, port = settings.D_ID_BASE_URL.rsplit("//", 1)[1].split(":")
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(render_seconds, error_rate=error_rate), host=host, port=int(port), log_level="warning"
+    ))
+    asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+async def run_job(client: httpx.AsyncClient, headers: dict, index: int, timeout: float) -> tuple:
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/v1/video/generate",
+        json={"topic": f"Fotosíntesis {index}", "duration": "short"},
+        headers=headers
+    )
+    response.raise_for_status()
+    job_id = response.json()["id"]
+
+    while time.perf_counter() - started < timeout:
+        await asyncio.sleep(0.5)
+        job = (await client.get(f"/api/v1/video/jobs/{job_id}", headers=headers)).json()
+        if job["status"] in ("done", "error"):
+            return job["status"], time.perf_counter() - started
+    return "timeout", time.perf_counter() - started
+
+
+async def run(total: int, render_seconds: float, error_rate: float):
+    # Calendario de consultas proporcional al render simulado
+    settings.DID_POLL_SCHEDULES["short"] = {
+        "initial_delay": render_seconds * 0.5,
+        "interval": max(render_seconds * 0.1, 0.2),
+        "max_interval": max(render_seconds * 0.5, 1.0),
+        "timeout": render_seconds * 10
+    }
+
+    server = await start_fake_did(render_seconds, error_rate)
+    await video_service.start()
+    transport = httpx.ASGITransport(app=app)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            headers = {"Authorization": f"Bearer {await register(client)}"}
+            started = time.perf_counter()
+            results = await asyncio.gather(*[
+                run_job(client, headers, i, render_seconds * 20) for i in range(total)
+            ])
+            elapsed = time.perf_counter() - started
+
+        async with httpx.AsyncClient(base_url=settings.D_ID_BASE_URL) as did_client:
+            did_stats = (await did_client.get("/stats")).json()
+    finally:
+        await video_service.close()
+        server.should_exit = True
+
+    latencies = sorted(latency for status, latency in results if status == "done")
+    outcomes = {}
+    for status, _ in results:
+        outcomes[status] = outcomes.get(status, 0) + 1
+
+    print(f"{total} videos en {elapsed:.1f} s (render simulado {render_seconds:.1f} s)")
+    print(f"  resultados: {outcomes}")
+    if latencies:
+        print(f"  p50 hasta done: {statistics.median(latencies):.2f} s")
+        print(f"  p95 hasta done: {latencies[max(int(len(latencies) * 0.95) - 1, 0)]:.2f} s")
+    print(f"  videos creados en D-ID: {did_stats['created']}")
+    print(f"  consultas de estado: {did_stats['status_requests']}")
+    histogram = metrics_registry.get_histogram("did_polls_per_video", duration="short")
+    if histogram:
+        print(f"  consultas por video: media {histogram['avg']}, máx {histogram['max']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--render-seconds", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.videos, args.render_seconds, args.error_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de /voice-tutor/ask: dos llamadas a Gemini frente a una sola
+
+Levanta la aplicación en proceso (ASGI) con el proveedor de LLM simulado y
+mide la latencia de extremo a extremo de /voice-tutor/ask con
+VOICE_TUTOR_SINGLE_CALL desactivado (respuesta y sugerencias por separado)
+y activado (una sola llamada estructurada). La síntesis de voz se sustituye
+por una espera fija para que solo cambie la parte de Gemini.
+Necesita una base de datos accesible en DATABASE_URL (Postgres de pruebas).
+
+Uso:
+    LLM_PROVIDER=fake FAKE_LLM_LATENCY_MEAN_MS=800 \\
+        python -m benchmarks.bench_voice_tutor --requests 50 --concurrency 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx
+from app.config import get_settings
+from app.main import app
+from app.services.audio_service import audio_service
+
+settings = get_settings()
+
+PAYLOAD = {
+    "topic": "Fotosíntesis",
+    "user_question": "¿Por qué las plantas necesitan luz?",
+    "conversation_history": []
+}
+
+
+def stub_audio(latency: float):
+    async def generate_audio(text: str) -> str:
+        await asyncio.sleep(latency)
+        return "data:audio/wav;base64,AAAA"
+
+    audio_service.generate_audio = generate_audio
+
+
+async def register(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": f"bench-{uuid.uuid4().hex[:8]}@gmail.com",
+            "password": "Bench123",
+            "full_name": "Benchmark"
+        }
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def measure(client: httpx.AsyncClient, headers: dict, total: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int):
+        payload = dict(PAYLOAD, user_question=f"{PAYLOAD['user_question']} ({index})")
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/voice-tutor/ask", json=payload, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[one(i) for i in range(total)])
+    return sorted(latencies)
+
+
+def report(label: str, latencies: list):
+    print(f"{label}:")
+    print(f"  p50: {statistics.median(latencies) * 1000:.0f} ms")
+    print(f"  p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"  p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms")
+
+
+async def run(total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        headers = {"Authorization": f"Bearer {await register(client)}"}
+
+        for single_call, label in ((False, "dos llamadas"), (True, "una llamada")):
+            settings.VOICE_TUTOR_SINGLE_CALL = single_call
+            report(label, await measure(client, headers, total, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--audio-ms", type=float, default=300, help="latencia simulada de la síntesis de voz")
+    args = parser.parse_args()
+
+    stub_audio(args.audio_ms / 1000)
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
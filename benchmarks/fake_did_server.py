@@ -0,0 +1,128 @@
+"""
+Servidor local que imita la API de D-ID (/talks y /credits)
+
+Permite probar con carga el pipeline de videos sin red ni créditos. Cada
+video pasa por created → started → done en un tiempo de render simulado
+(con algo de variación) y, si la petición traía webhook, se avisa a esa URL
+al terminar, como hace D-ID. Con --error-rate una parte de los videos
+termina en error.
+
+Uso:
+    python -m benchmarks.fake_did_server --port 8081 --render-seconds 20
+    D_ID_BASE_URL=http://127.0.0.1:8081 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(
+        render_seconds: float = 20.0,
+        jitter: float = 0.25,
+        latency_ms: float = 50.0,
+        error_rate: float = 0.0
+) -> FastAPI:
+    fake_app = FastAPI(title="D-ID simulado")
+    talks = {}
+    stats = {"created": 0, "status_requests": 0, "webhooks": 0}
+
+    async def api_latency():
+        if latency_ms:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * latency_ms / 1000)
+
+    def snapshot(talk: dict) -> dict:
+        elapsed = time.monotonic() - talk["started"]
+        data = {"id": talk["id"], "created_at": talk["created_at"]}
+        if elapsed >= talk["render_seconds"]:
+            if talk["fails"]:
+                data.update(status="error", error="Render simulado fallido")
+            else:
+                data.update(
+                    status="done",
+                    result_url=f"https://fake-did.local/talks/{talk['id']}.mp4",
+                    thumbnail_url=f"https://fake-did.local/talks/{talk['id']}.jpg",
+                    duration=talk["render_seconds"]
+                )
+        elif elapsed >= talk["render_seconds"] * 0.2:
+            data["status"] = "started"
+        else:
+            data["status"] = "created"
+        return data
+
+    async def notify(talk: dict):
+        await asyncio.sleep(talk["render_seconds"])
+        try:
+            async with httpx.AsyncClient() as client:
+                await client.post(talk["webhook"], json=snapshot(talk), timeout=10)
+            stats["webhooks"] += 1
+        except httpx.HTTPError as e:
+            print(f"[D-ID simulado] Webhook fallido para {talk['id']}: {str(e)}")
+
+    @fake_app.post("/talks", status_code=201)
+    async def create_talk(request: Request):
+        body = await request.json()
+        if not body.get("script", {}).get("input"):
+            return JSONResponse(status_code=400, content={"kind": "ValidationError", "description": "script requerido"})
+
+        await api_latency()
+        talk = {
+            "id": f"tlk_{uuid.uuid4().hex[:16]}",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "started": time.monotonic(),
+            "render_seconds": render_seconds * random.uniform(1 - jitter, 1 + jitter),
+            "fails": random.random() < error_rate,
+            "webhook": body.get("webhook")
+        }
+        talks[talk["id"]] = talk
+        stats["created"] += 1
+        if talk["webhook"]:
+            asyncio.ensure_future(notify(talk))
+        return {"id": talk["id"], "created_at": talk["created_at"], "status": "created"}
+
+    @fake_app.get("/talks/{talk_id}")
+    async def get_talk(talk_id: str):
+        await api_latency()
+        stats["status_requests"] += 1
+        talk = talks.get(talk_id)
+        if talk is None:
+            raise HTTPException(status_code=404, detail="Talk no encontrado")
+        return snapshot(talk)
+
+    @fake_app.get("/credits")
+    async def get_credits():
+        await api_latency()
+        return {"remaining": 1000, "total": 1000}
+
+    @fake_app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return fake_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--render-seconds", type=float, default=20.0, help="tiempo medio de render por video")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="latencia media de cada llamada a la API")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de videos que terminan en error")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.render_seconds, latency_ms=args.latency_ms, error_rate=args.error_rate),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
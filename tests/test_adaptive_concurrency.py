@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from app.utils.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from app.utils.metrics import metrics_registry
+
+
+def build_limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    options = {"initial_limit": 4, "min_limit": 1, "max_limit": 16}
+    options.update(kwargs)
+    return AdaptiveConcurrencyLimiter("prueba", **options)
+
+
+class TestAdaptiveConcurrencyLimiter:
+
+    def test_grows_while_latency_is_flat(self):
+        """Prueba que el límite crece mientras la latencia se mantiene estable"""
+        limiter = build_limiter()
+
+        async def run():
+            for _ in range(40):
+                started = await limiter.acquire()
+                limiter.release(started, AdaptiveConcurrencyLimiter.SUCCESS, latency=0.1)
+
+        asyncio.run(run())
+        assert limiter.current_limit > 4
+        assert metrics_registry.get_gauge("upstream_concurrency_limit", provider="prueba") == limiter.current_limit
+
+    def test_shrinks_on_overload(self):
+        """Prueba que un fallo por sobrecarga reduce el límite"""
+        limiter = build_limiter(initial_limit=10, backoff_ratio=0.5)
+
+        async def run():
+            started = await limiter.acquire()
+            limiter.release(started, AdaptiveConcurrencyLimiter.OVERLOAD)
+
+        asyncio.run(run())
+        assert limiter.current_limit == 5
+
+    def test_shrinks_when_latency_rises(self):
+        """Prueba que el límite baja cuando la latencia reciente se dispara"""
+        limiter = build_limiter(initial_limit=10, latency_tolerance=1.5)
+
+        async def run():
+            for _ in range(20):
+                started = await limiter.acquire()
+                limiter.release(started, AdaptiveConcurrencyLimiter.SUCCESS, latency=0.1)
+            grown = limiter.limit
+            for _ in range(5):
+                started = await limiter.acquire()
+                limiter.release(started, AdaptiveConcurrencyLimiter.SUCCESS, latency=2.0)
+            return grown
+
+        grown = asyncio.run(run())
+        assert limiter.limit < grown
+
+    def test_ignored_errors_do_not_change_limit(self):
+        """Prueba que un error del cliente (p. ej. 400) no modifica el límite"""
+        limiter = build_limiter()
+
+        async def run():
+            started = await limiter.acquire()
+            limiter.release(started, AdaptiveConcurrencyLimiter.IGNORE)
+
+        asyncio.run(run())
+        assert limiter.current_limit == 4
+        assert limiter.in_flight == 0
+
+    def test_rejects_after_max_wait(self):
+        """Prueba que las llamadas sin turno se rechazan y se cuentan"""
+        limiter = AdaptiveConcurrencyLimiter("prueba-rechazo", initial_limit=1, max_limit=1, max_wait=0.01)
+
+        async def run():
+            await limiter.acquire()
+            with pytest.raises(ConcurrencyLimitExceeded):
+                await limiter.acquire()
+
+        asyncio.run(run())
+        assert limiter.rejections == 1
+        assert metrics_registry.get_counter("upstream_limiter_rejections_total", provider="prueba-rechazo") == 1
+
+    def test_waiter_gets_slot_on_release(self):
+        """Prueba que al liberar un turno entra la siguiente llamada en espera"""
+        limiter = build_limiter(initial_limit=1, max_limit=1)
+
+        async def run():
+            started = await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            assert not waiter.done()
+
+            limiter.release(started, AdaptiveConcurrencyLimiter.SUCCESS)
+            await asyncio.wait_for(waiter, 1)
+
+        asyncio.run(run())
+        assert limiter.in_flight == 1
@@ -0,0 +1,96 @@
+import json
+import pytest
+from app.services.fake_llm_provider import FakeLLMProvider
+from app.schemas.flashcard import FlashcardGenerationResponse, MultiTopicFlashcardGenerationResponse
+from app.schemas.quiz import QuizGenerationResponse
+from app.schemas.pomodoro import PomodoroRecommendationsResponse
+from app.utils.resilience import UpstreamError
+
+
+def build_provider(**kwargs) -> FakeLLMProvider:
+    return FakeLLMProvider(latency_distribution="none", seed=7, **kwargs)
+
+
+class TestFakeLLMProvider:
+
+    def test_schema_valid_response(self):
+        """Prueba que la respuesta cumple el esquema y respeta el número pedido"""
+        provider = build_provider()
+        response = provider.generate(
+            "gemini-2.5-flash",
+            "Genera exactamente 10 tarjetas de estudio sobre Fotosíntesis",
+            {"response_schema": FlashcardGenerationResponse}
+        )
+
+        parsed = FlashcardGenerationResponse.model_validate_json(response.text)
+        assert len(parsed.flashcards) == 10
+        assert response.usage_metadata.candidates_token_count > 0
+
+    def test_packed_prompt_echoes_topics(self):
+        """Prueba que el prompt agrupado recibe un mazo por cada tema pedido"""
+        provider = build_provider()
+        response = provider.generate(
+            "gemini-2.5-flash",
+            "Genera tarjetas de estudio en español para CADA uno de estos temas:\n- Python\n- Álgebra\n\n"
+            "- Genera exactamente 4 tarjetas de estudio por tema.",
+            {"response_schema": MultiTopicFlashcardGenerationResponse}
+        )
+
+        parsed = MultiTopicFlashcardGenerationResponse.model_validate_json(response.text)
+        assert [deck.topic for deck in parsed.decks] == ["Python", "Álgebra"]
+        assert all(len(deck.flashcards) == 4 for deck in parsed.decks)
+
+    def test_quiz_answers_match_options(self):
+        """Prueba que las preguntas simuladas pasan las reglas del quiz"""
+        provider = build_provider()
+        response = provider.generate("gemini-2.5-flash", "Genera exactamente 5 preguntas", {
+            "response_schema": QuizGenerationResponse
+        })
+
+        parsed = QuizGenerationResponse.model_validate_json(response.text)
+        for question in parsed.questions:
+            assert len(question.options) == 4
+            assert question.correct_answer in question.options
+
+    def test_deterministic_output(self):
+        """Prueba que el mismo prompt produce la misma respuesta"""
+        config = {"response_schema": PomodoroRecommendationsResponse}
+        first = build_provider().generate("gemini-2.5-flash", "Pomodoro: Álgebra", config)
+        second = build_provider().generate("gemini-2.5-flash", "Pomodoro: Álgebra", config)
+        assert first.text == second.text
+
+    def test_fixtures(self, tmp_path):
+        """Prueba las respuestas fijas por nombre de esquema"""
+        fixtures = tmp_path / "fixtures.json"
+        fixtures.write_text(json.dumps({
+            "FlashcardGenerationResponse": {"flashcards": [{"question": "¿A?", "answer": "B"}]}
+        }))
+        provider = build_provider(fixtures_path=str(fixtures))
+
+        response = provider.generate("gemini-2.5-flash", "Tema", {
+            "response_schema": FlashcardGenerationResponse
+        })
+        assert json.loads(response.text)["flashcards"][0]["question"] == "¿A?"
+
+    def test_error_rate(self):
+        """Prueba que con error_rate=1 todas las llamadas fallan con 503"""
+        provider = build_provider(error_rate=1.0)
+        with pytest.raises(UpstreamError) as exc_info:
+            provider.generate("gemini-2.5-flash", "Tema", {})
+        assert exc_info.value.status_code == 503
+
+    def test_stream_reassembles_text(self):
+        """Prueba que los fragmentos del stream forman el texto completo"""
+        provider = build_provider()
+        chunks = list(provider.stream("gemini-2.5-flash", "Explica la fotosíntesis", {}))
+
+        assert "".join(chunk.text for chunk in chunks) == provider.render("Explica la fotosíntesis", {})
+        assert chunks[-1].usage_metadata is not None
+
+    def test_lognormal_latency_mean(self):
+        """Prueba que la latencia simulada tiene la media configurada"""
+        provider = FakeLLMProvider(
+            latency_distribution="lognormal", latency_mean_ms=200, latency_stddev_ms=50, seed=1
+        )
+        samples = [provider.sample_latency() for _ in range(5000)]
+        assert sum(samples) / len(samples) == pytest.approx(0.2, rel=0.05)
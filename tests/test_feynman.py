@@ -196,4 +196,45 @@ class TestFeynman:
             json={"topic": "Test"}
         )
         # Debe manejar explicaciones largas
-        assert response.status_code in [200, 500]
\ No newline at end of file
+        assert response.status_code in [200, 500]
+    @patch('app.services.feynman_service.feynman_service.stream_explanation')
+    def test_stream_feynman_explanation(self, mock_stream, client, auth_token):
+        """Prueba obtener la explicación Feynman en streaming"""
+        async def fake_stream():
+            for chunk in ["La fotosíntesis ", "es como cocinar ", "con luz solar."]:
+                yield chunk
+
+        mock_stream.return_value = fake_stream()
+
+        response = client.post(
+            "/api/v1/feynman/explanation/stream",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={"topic": "Fotosíntesis"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.count("event: token") == 3
+        assert "event: done" in response.text
+        assert "La fotosíntesis es como cocinar con luz solar." in response.text
+
+    @patch('app.services.feynman_service.feynman_service.stream_analysis')
+    def test_stream_feynman_analysis(self, mock_stream, client, auth_token):
+        """Prueba analizar la explicación del usuario en streaming"""
+        async def fake_stream():
+            yield "BRECHAS:\n- No mencionaste la clorofila\n"
+            yield "SIMPLIFICACIONES:\n- Compara la hoja con una fábrica"
+
+        mock_stream.return_value = fake_stream()
+
+        response = client.post(
+            "/api/v1/feynman/analyze/stream",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={
+                "topic": "Fotosíntesis",
+                "user_explanation": "Las plantas usan la luz para crecer"
+            }
+        )
+        assert response.status_code == 200
+        assert "event: done" in response.text
+        assert "No mencionaste la clorofila" in response.text
+        assert "Compara la hoja con una fábrica" in response.text
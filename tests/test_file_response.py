@@ -0,0 +1,31 @@
+import pytest
+from app.utils.file_response import parse_range
+
+
+class TestParseRange:
+
+    def test_closed_range(self):
+        """Prueba un rango con inicio y fin"""
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+
+    def test_open_and_suffix_ranges(self):
+        """Prueba los rangos abiertos y los últimos N bytes"""
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+    def test_end_is_clamped(self):
+        """Prueba que un fin más allá del archivo se recorta"""
+        assert parse_range("bytes=500-5000", 1000) == (500, 999)
+
+    def test_unsatisfiable(self):
+        """Prueba los rangos fuera del archivo"""
+        assert parse_range("bytes=1000-", 1000) is None
+        assert parse_range("bytes=10-5", 1000) is None
+
+    def test_unsupported(self):
+        """Prueba que varios rangos u otras unidades no se interpretan"""
+        with pytest.raises(ValueError):
+            parse_range("bytes=0-1,5-6", 1000)
+        with pytest.raises(ValueError):
+            parse_range("items=0-1", 1000)
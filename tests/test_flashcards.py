@@ -5,6 +5,10 @@ from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import Base, get_db
 from unittest.mock import patch, AsyncMock
+from app.services.flashcard_service import flashcard_service
+from app.schemas.flashcard import FlashcardGenerationResponse, MultiTopicFlashcardGenerationResponse
+from app.utils.resilience import UpstreamError
+import asyncio
 import os
 from sqlalchemy import create_engine
 
@@ -79,6 +83,82 @@ class TestFlashcards:
         assert "question" in data["flashcards"][0]
         assert "answer" in data["flashcards"][0]
 
+    @patch('app.services.flashcard_service.flashcard_service.generate_flashcards_batch')
+    def test_generate_flashcards_batch_partial_failure(self, mock_batch, client, auth_token):
+        """Prueba el lote de varios temas con un tema fallido"""
+        mock_batch.return_value = [
+            {"topic": "Python", "flashcards": [
+                {"question": "¿Qué es Python?", "answer": "Un lenguaje de programación"}
+            ]},
+            {"topic": "Álgebra", "error": "Error generando flashcards: sin respuesta"}
+        ]
+
+        response = client.post(
+            "/api/v1/flashcards/generate/batch",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={"topics": ["Python", "Álgebra", "python"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert mock_batch.call_args.kwargs["topics"] == ["Python", "Álgebra"]
+        assert data["total_flashcards"] == 1
+        assert data["failed_topics"] == 1
+        assert data["results"][0]["success"] is True
+        assert data["results"][0]["flashcards"][0]["topic"] == "Python"
+        assert data["results"][1]["success"] is False
+
+    @patch('app.services.flashcard_service.flashcard_service.generate_flashcards_batch')
+    def test_generate_flashcards_batch_topic_too_long(self, mock_batch, client, auth_token):
+        """Prueba que un tema más largo que la columna se informa como fallido sin romper el lote"""
+        long_topic = "Historia " * 40
+        mock_batch.return_value = [
+            {"topic": "Python", "flashcards": [
+                {"question": "¿Qué es Python?", "answer": "Un lenguaje de programación"}
+            ]}
+        ]
+
+        response = client.post(
+            "/api/v1/flashcards/generate/batch",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={"topics": [long_topic, "Python"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert mock_batch.call_args.kwargs["topics"] == ["Python"]
+        assert data["total_flashcards"] == 1
+        assert data["failed_topics"] == 1
+        assert data["results"][0]["success"] is False
+        assert "255" in data["results"][0]["error"]
+        assert data["results"][1]["success"] is True
+
+    def test_generate_flashcards_batch_packs_topics(self):
+        """Prueba que los temas se agrupan y los que faltan se piden por separado"""
+        packed = MultiTopicFlashcardGenerationResponse(decks=[
+            {"topic": "Python", "flashcards": [{"question": "¿P?", "answer": "R"}] * 2}
+        ])
+        single = FlashcardGenerationResponse(flashcards=[{"question": "¿A?", "answer": "B"}] * 2)
+
+        with patch(
+                'app.services.flashcard_service.gemini_service.generate_json',
+                new=AsyncMock(side_effect=[packed, single])
+        ) as mock_json:
+            results = asyncio.run(flashcard_service.generate_flashcards_batch(["Python", "Álgebra"], count=2))
+
+        assert mock_json.call_count == 2
+        assert [len(result["flashcards"]) for result in results] == [2, 2]
+
+    def test_generate_flashcards_batch_upstream_error_not_fanned_out(self):
+        """Prueba que un error del proveedor en el prompt agrupado no se reparte por tema"""
+        with patch(
+                'app.services.flashcard_service.gemini_service.generate_json',
+                new=AsyncMock(side_effect=UpstreamError("Límite de peticiones", status_code=429))
+        ) as mock_json:
+            results = asyncio.run(flashcard_service.generate_flashcards_batch(["Python", "Álgebra"], count=2))
+
+        assert mock_json.call_count == 1
+        assert [result["topic"] for result in results] == ["Python", "Álgebra"]
+        assert all("Límite de peticiones" in result["error"] for result in results)
+
     def test_create_flashcard_manual(self, client, auth_token):
         """Prueba crear flashcard manualmente"""
         response = client.post(
@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.utils.cache import (
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    ResponseCache
+)
+from app.services.gemini_service import GeminiService
+
+
+class TestMemoryCache:
+
+    def test_set_and_get(self):
+        """Prueba guardar y leer una entrada"""
+        backend = MemoryCacheBackend(max_entries=10)
+        backend.set("clave", "valor", ttl=60)
+        assert backend.get("clave") == "valor"
+
+    def test_expired_entry(self):
+        """Prueba que las entradas caducadas no se devuelven"""
+        backend = MemoryCacheBackend(max_entries=10)
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            backend.set("clave", "valor", ttl=10)
+        with patch("app.utils.cache.time.time", return_value=1011.0):
+            assert backend.get("clave") is None
+        assert backend.size() == 0
+
+    def test_lru_eviction(self):
+        """Prueba que se desaloja la entrada menos usada"""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", "1", ttl=60)
+        backend.set("b", "2", ttl=60)
+        backend.get("a")
+        backend.set("c", "3", ttl=60)
+
+        assert backend.get("a") == "1"
+        assert backend.get("b") is None
+        assert backend.get("c") == "3"
+        assert backend.evictions == 1
+
+
+class TestSQLiteCache:
+
+    def test_survives_restart(self, tmp_path):
+        """Prueba que la caché en disco persiste entre instancias"""
+        path = str(tmp_path / "cache.sqlite3")
+        SQLiteCacheBackend(path=path).set("clave", "valor", ttl=60)
+
+        assert SQLiteCacheBackend(path=path).get("clave") == "valor"
+
+    def test_lru_eviction(self, tmp_path):
+        """Prueba el límite de entradas en disco"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            backend.set("a", "1", ttl=60)
+        with patch("app.utils.cache.time.time", return_value=1001.0):
+            backend.set("b", "2", ttl=60)
+        with patch("app.utils.cache.time.time", return_value=1002.0):
+            backend.set("c", "3", ttl=60)
+
+        assert backend.size() == 2
+        assert backend.get("a") is None
+
+    def test_hits_touch_in_batches(self, tmp_path):
+        """Prueba que los aciertos no escriben en disco hasta completar un bloque"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), touch_batch=3)
+        backend.set("clave", "valor", ttl=60)
+        changes = backend._conn.total_changes
+
+        backend.get("clave")
+        backend.get("clave")
+        assert backend._conn.total_changes == changes
+
+        backend.get("otra")
+        backend.get("clave")
+        backend.set("nueva", "valor", ttl=60)
+        assert backend._touched == {}
+
+    def test_eviction_uses_pending_touches(self, tmp_path):
+        """Prueba que el desalojo tiene en cuenta los accesos aún no guardados"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            backend.set("a", "1", ttl=60)
+        with patch("app.utils.cache.time.time", return_value=1001.0):
+            backend.set("b", "2", ttl=60)
+        with patch("app.utils.cache.time.time", return_value=1002.0):
+            backend.get("a")
+        with patch("app.utils.cache.time.time", return_value=1003.0):
+            backend.set("c", "3", ttl=60)
+
+        with patch("app.utils.cache.time.time", return_value=1004.0):
+            assert backend.get("a") == "1"
+            assert backend.get("b") is None
+
+
+class TestResponseCache:
+
+    def test_hit_miss_counters(self):
+        """Prueba los contadores de aciertos y fallos"""
+        cache = ResponseCache(MemoryCacheBackend())
+        key = ResponseCache.make_key("gemini-2.5-flash", None, "Fotosíntesis", 0.7)
+
+        assert cache.get(key) is None
+        cache.set(key, "{}", ttl=60)
+        assert cache.get(key) == "{}"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_key_depends_on_temperature(self):
+        """Prueba que la clave cambia con los parámetros"""
+        key_a = ResponseCache.make_key("gemini-2.5-flash", None, "Tema", 0.7)
+        key_b = ResponseCache.make_key("gemini-2.5-flash", None, "Tema", 0.9)
+        assert key_a != key_b
+
+
+class TestGeminiServiceCache:
+
+    def test_sqlite_cache_runs_off_event_loop(self, tmp_path):
+        """Prueba que la caché en disco se lee y escribe fuera del hilo del event loop"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"))
+        threads = []
+        get, set_ = backend.get, backend.set
+
+        def tracked_get(key):
+            threads.append(threading.current_thread())
+            return get(key)
+
+        def tracked_set(key, value, ttl):
+            threads.append(threading.current_thread())
+            set_(key, value, ttl)
+
+        backend.get, backend.set = tracked_get, tracked_set
+        provider = MagicMock(
+            generate=MagicMock(return_value=SimpleNamespace(text="respuesta", usage_metadata=None)),
+            acquire_key=AsyncMock(return_value=None)
+        )
+        service = GeminiService(provider=provider)
+        service.cache = ResponseCache(backend)
+
+        async def run():
+            first = await service.generate_text("Tema", use_cache=True)
+            second = await service.generate_text("Tema", use_cache=True)
+            return first, second, threading.current_thread()
+
+        first, second, loop_thread = asyncio.run(run())
+
+        assert first == second == "respuesta"
+        assert provider.generate.call_count == 1
+        assert len(threads) == 3
+        assert loop_thread not in threads
+        service.shutdown()
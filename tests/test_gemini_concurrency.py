@@ -0,0 +1,226 @@
+import asyncio
+import pytest
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from app.config import get_settings
+from app.services.gemini_service import GeminiService
+from app.utils.concurrency import HedgeBudget, LatencyWindow, SingleFlight, hedged_call
+
+settings = get_settings()
+
+
+class TestSingleFlight:
+
+    def test_identical_calls_share_upstream(self):
+        """Prueba que las llamadas idénticas simultáneas se agrupan"""
+        single_flight = SingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return '{"mermaid_graph": "graph TD; A --> B;"}'
+
+        async def run():
+            return await asyncio.gather(*[
+                single_flight.do("concept_map:Fotosíntesis", upstream)
+                for _ in range(40)
+            ])
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert len(results) == 40
+        assert single_flight.stats()["coalesced"] == 39
+        assert single_flight.stats()["in_flight_keys"] == 0
+
+    def test_different_keys_not_shared(self):
+        """Prueba que claves distintas no se agrupan"""
+        single_flight = SingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def run():
+            return await asyncio.gather(
+                single_flight.do("a", upstream),
+                single_flight.do("b", upstream)
+            )
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_error_propagates_to_all_waiters(self):
+        """Prueba que el error se entrega a todos los solicitantes"""
+        single_flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise Exception("Gemini no disponible")
+
+        async def run():
+            return await asyncio.gather(
+                single_flight.do("a", upstream),
+                single_flight.do("a", upstream),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, Exception) for r in results)
+
+
+class TestHedgedCall:
+
+    def test_fast_call_is_not_hedged(self):
+        """Prueba que una respuesta rápida no lanza duplicado"""
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            return "ok"
+
+        result, hedged = asyncio.run(hedged_call(upstream, 0.5, lambda: True))
+        assert (result, hedged) == ("ok", False)
+        assert len(calls) == 1
+
+    def test_slow_call_is_hedged_and_loser_cancelled(self):
+        """Prueba que el duplicado gana a una respuesta lenta y la original se cancela"""
+        delays = [1.0, 0.01]
+        cancelled = []
+
+        async def upstream():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return f"respuesta tras {delay}"
+
+        result, hedged = asyncio.run(hedged_call(upstream, 0.02, lambda: True))
+        assert hedged
+        assert result == "respuesta tras 0.01"
+        assert cancelled == [1.0]
+
+    def test_invalid_result_waits_for_other(self):
+        """Prueba que se espera a la otra llamada si la primera falla"""
+        outcomes = [(0.05, None), (0.2, "ok")]
+
+        async def upstream():
+            delay, value = outcomes.pop(0)
+            await asyncio.sleep(delay)
+            if value is None:
+                raise Exception("Gemini no disponible")
+            return value
+
+        result, hedged = asyncio.run(hedged_call(upstream, 0.01, lambda: True))
+        assert (result, hedged) == ("ok", True)
+
+    def test_budget_blocks_hedge(self):
+        """Prueba que sin presupuesto no se duplica"""
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        budget = HedgeBudget(ratio=0.1, burst=0)
+        result, hedged = asyncio.run(hedged_call(upstream, 0.01, budget.try_spend))
+        assert (result, hedged) == ("ok", False)
+        assert len(calls) == 1
+
+    def test_budget_caps_extra_load(self):
+        """Prueba que los duplicados no superan la fracción configurada"""
+        budget = HedgeBudget(ratio=0.1, burst=1)
+        hedges = 0
+        for _ in range(100):
+            budget.record_request()
+            hedges += budget.try_spend()
+        assert hedges <= 11
+
+    def test_latency_window_percentile(self):
+        """Prueba el percentil de las latencias recientes"""
+        window = LatencyWindow(size=100)
+        for value in range(1, 101):
+            window.add(value / 100)
+        assert window.percentile(0.95) == pytest.approx(0.96)
+
+
+class TestGeminiExecutor:
+
+    def test_blocking_call_does_not_block_loop(self):
+        """Prueba que el event loop sigue atendiendo otras corrutinas durante una llamada lenta"""
+        service = GeminiService(provider=MagicMock())
+        ticks = []
+
+        def slow_call():
+            time.sleep(0.2)
+            return "respuesta"
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            task = asyncio.ensure_future(ticker())
+            started = time.perf_counter()
+            result = await service._run_blocking(slow_call)
+            task.cancel()
+            return result, started
+
+        result, started = asyncio.run(run())
+
+        assert result == "respuesta"
+        assert len([tick for tick in ticks if tick > started]) >= 5
+        service.shutdown()
+
+    def test_executor_gauges_return_to_zero(self):
+        """Prueba que la cola y las llamadas en curso suben con la carga y vuelven a 0"""
+        with patch.object(settings, "GEMINI_MAX_WORKERS", 1):
+            service = GeminiService(provider=MagicMock())
+        release = threading.Event()
+        observed = []
+
+        async def run():
+            calls = [asyncio.ensure_future(service._run_blocking(release.wait, 5)) for _ in range(2)]
+            while service.get_executor_stats()["in_flight"] < 1:
+                await asyncio.sleep(0.005)
+            observed.append(service.get_executor_stats())
+            release.set()
+            await asyncio.gather(*calls)
+
+        asyncio.run(run())
+
+        assert observed[0]["max_workers"] == 1
+        assert observed[0]["in_flight"] == 1
+        assert observed[0]["queue_depth"] == 1
+        assert service.get_executor_stats() == {"max_workers": 1, "queue_depth": 0, "in_flight": 0}
+        service.shutdown()
+
+    def test_cancelled_queued_call_leaves_queue(self):
+        """Prueba que una llamada cancelada antes de ejecutarse no queda contada en la cola"""
+        with patch.object(settings, "GEMINI_MAX_WORKERS", 1):
+            service = GeminiService(provider=MagicMock())
+        release = threading.Event()
+
+        async def run():
+            running = asyncio.ensure_future(service._run_blocking(release.wait, 5))
+            queued = asyncio.ensure_future(service._run_blocking(release.wait, 5))
+            while service.get_executor_stats()["queue_depth"] < 1:
+                await asyncio.sleep(0.005)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            depth = service.get_executor_stats()["queue_depth"]
+            release.set()
+            await running
+            return depth
+
+        assert asyncio.run(run()) == 0
+        assert service.get_executor_stats()["in_flight"] == 0
+        service.shutdown()
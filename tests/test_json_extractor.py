@@ -0,0 +1,47 @@
+import pytest
+from app.utils.json_extractor import extract_json, JSONExtractionError
+
+
+class TestJSONExtractor:
+
+    def test_plain_json(self):
+        """Prueba extraer JSON sin texto adicional"""
+        assert extract_json('{"explanation": "Hola"}') == {"explanation": "Hola"}
+
+    def test_markdown_fence(self):
+        """Prueba extraer JSON dentro de un bloque de código"""
+        text = '```json\n{"flashcards": [{"question": "¿Qué?", "answer": "Eso"}]}\n```'
+        assert extract_json(text)["flashcards"][0]["answer"] == "Eso"
+
+    def test_prose_before_and_after(self):
+        """Prueba ignorar texto (con llaves) antes y después del JSON"""
+        text = 'Aquí tienes el mapa {Fotosíntesis}:\n{"mermaid_graph": "graph TD; A --> B;"}\nSaludos [fin]'
+        assert extract_json(text) == {"mermaid_graph": "graph TD; A --> B;"}
+
+    def test_braces_inside_strings(self):
+        """Prueba que las llaves dentro de cadenas y los escapes no rompen el balanceo"""
+        text = 'Resultado: {"a": "x } y", "b": "comilla \\" y {"}'
+        assert extract_json(text) == {"a": "x } y", "b": 'comilla " y {'}
+
+    def test_array(self):
+        """Prueba extraer un array JSON"""
+        assert extract_json("Sugerencias: [\"¿Uno?\", \"¿Dos?\"] listo") == ["¿Uno?", "¿Dos?"]
+
+    def test_error_reports_position(self):
+        """Prueba que el error indica la posición exacta del fallo"""
+        text = '{\n  "questions": [1, 2,]\n}'
+        with pytest.raises(JSONExtractionError) as exc_info:
+            extract_json(text)
+
+        assert exc_info.value.line == 2
+        assert exc_info.value.position == text.index("]")
+
+    def test_truncated_json(self):
+        """Prueba una respuesta truncada"""
+        with pytest.raises(JSONExtractionError):
+            extract_json('{"questions": [{"question": "¿Qué es')
+
+    def test_no_json(self):
+        """Prueba un texto sin JSON"""
+        with pytest.raises(JSONExtractionError):
+            extract_json("Lo siento, no puedo ayudar con eso.")
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.utils.key_pool import ApiKeyPool, TokenBucket
+from app.utils.resilience import UpstreamError, is_quota_error
+
+
+class TestTokenBucket:
+
+    def test_refill_rate(self):
+        """Prueba que la cubeta se rellena según la tasa configurada"""
+        with patch("app.utils.key_pool.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=1.0, capacity=2)
+            bucket.take(100.0)
+            bucket.take(100.0)
+
+        assert bucket.wait_time(100.0) == pytest.approx(1.0)
+        assert bucket.available(101.5) == pytest.approx(1.5)
+
+
+class TestApiKeyPool:
+
+    def test_spreads_requests_across_keys(self):
+        """Prueba que las peticiones se reparten entre las claves"""
+        pool = ApiKeyPool(["clave-a-1111", "clave-b-2222"], requests_per_minute=60, burst=5)
+
+        used = [pool.try_acquire().index for _ in range(10)]
+
+        assert used.count(0) == 5
+        assert used.count(1) == 5
+        assert pool.try_acquire() is None
+
+    def test_throttled_key_cools_down(self):
+        """Prueba que una clave con 429 deja de usarse durante el enfriamiento"""
+        pool = ApiKeyPool(["clave-a-1111", "clave-b-2222"], burst=5, cooldown_seconds=60)
+        pool.report_throttled(pool.keys[0])
+
+        assert {pool.try_acquire().index for _ in range(4)} == {1}
+        assert pool.stats()[0]["throttled"] == 1
+        assert pool.stats()[0]["cooldown_remaining"] > 0
+
+    def test_acquire_timeout(self):
+        """Prueba que acquire devuelve None si no hay capacidad a tiempo"""
+        pool = ApiKeyPool(["clave-a-1111"], requests_per_minute=1, burst=1)
+        pool.try_acquire()
+
+        assert asyncio.run(pool.acquire(timeout=0.05)) is None
+
+    def test_acquire_waits_without_blocking_loop(self):
+        """Prueba que la espera por una clave no bloquea el event loop"""
+        pool = ApiKeyPool(["clave-a-1111"], requests_per_minute=600, burst=1)
+        pool.try_acquire()
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            key, _ = await asyncio.gather(pool.acquire(timeout=1), ticker())
+            return key
+
+        assert asyncio.run(run()) is not None
+        assert len(ticks) == 5
+
+    def test_no_limit_by_default(self):
+        """Prueba que sin límite configurado no se frena ninguna petición y se alternan las claves"""
+        pool = ApiKeyPool(["clave-a-1111", "clave-b-2222"])
+
+        used = [pool.try_acquire().index for _ in range(100)]
+
+        assert used.count(0) == 50
+        assert used.count(1) == 50
+        assert pool.stats()[0]["available_tokens"] is None
+
+    def test_stats_do_not_expose_keys(self):
+        """Prueba que las estadísticas no muestran ninguna parte de la clave"""
+        pool = ApiKeyPool(["AIzaSecretoMuyLargo1234"])
+        assert pool.stats()[0]["key"] == "key-0"
+
+    def test_quota_errors(self):
+        """Prueba la detección de errores de cuota"""
+        assert is_quota_error(UpstreamError("rate limit", status_code=429))
+        assert is_quota_error(Exception("Quota exceeded for project"))
+        assert not is_quota_error(UpstreamError("caído", status_code=503))
@@ -0,0 +1,334 @@
+import asyncio
+import pytest
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.config import get_settings
+from app.services.llm_provider import GeminiProvider, KeysExhaustedError
+from app.services.gemini_service import GeminiService, gemini_service
+from app.utils.concurrency import AdaptiveConcurrencyLimiter
+from app.utils.metrics import metrics_registry
+from app.utils.resilience import CircuitBreaker, CircuitOpenError, UpstreamError
+from app.schemas.flashcard import FlashcardGenerationResponse
+
+settings = get_settings()
+
+
+class TestModelRegistry:
+
+    @patch("google.generativeai.GenerativeModel")
+    def test_model_reused_per_configuration(self, mock_model):
+        """Prueba que se crea un solo modelo por configuración"""
+        provider = GeminiProvider(api_keys=["test"])
+        config = gemini_service._generation_config("default", 0.8, FlashcardGenerationResponse)
+
+        first = provider.get_model("gemini-2.5-flash", config)
+        second = provider.get_model("gemini-2.5-flash", dict(config))
+
+        assert first is second
+        assert mock_model.call_count == 1
+
+    @patch("google.generativeai.GenerativeModel")
+    def test_distinct_configurations(self, mock_model):
+        """Prueba que configuraciones distintas usan modelos distintos"""
+        provider = GeminiProvider(api_keys=["test"])
+
+        provider.get_model("gemini-2.5-flash", gemini_service._generation_config("default", 0.7))
+        provider.get_model("gemini-2.5-flash", gemini_service._generation_config("default", 0.9))
+
+        assert mock_model.call_count == 2
+        assert provider.stats()["models"] == 2
+
+    def test_generation_config_memoized(self):
+        """Prueba que la configuración de generación no se reconstruye"""
+        first = gemini_service._generation_config("default", 0.7, FlashcardGenerationResponse)
+        second = gemini_service._generation_config("default", 0.7, FlashcardGenerationResponse)
+
+        assert first is second
+        assert first["response_mime_type"] == "application/json"
+
+
+class TestPerKeyClients:
+
+    def test_sdk_model_uses_assigned_client(self):
+        """Prueba que la versión fijada del SDK sigue llamando al cliente asignado en _client"""
+        genai = pytest.importorskip("google.generativeai")
+        model = genai.GenerativeModel("gemini-2.5-flash")
+        assert hasattr(model, "_client")
+
+        model._client = MagicMock()
+        model._client.generate_content.side_effect = RuntimeError("cliente por clave")
+        with pytest.raises(RuntimeError, match="cliente por clave"):
+            model.generate_content("Hola")
+
+    @patch("google.generativeai.GenerativeModel")
+    def test_each_key_gets_its_own_client(self, mock_model):
+        """Prueba que con varias claves cada una crea su cliente con la API pública"""
+        glm = pytest.importorskip("google.ai.generativelanguage")
+        provider = GeminiProvider(api_keys=["clave-a-1111", "clave-b-2222"])
+        config = gemini_service._generation_config("default", 0.7)
+
+        with patch.object(glm, "GenerativeServiceClient") as mock_client:
+            provider.get_model("gemini-2.5-flash", config, provider.key_pool.keys[1])
+
+        mock_client.assert_called_once_with(client_options={"api_key": "clave-b-2222"})
+        assert mock_model.return_value._client is mock_client.return_value
+
+
+class TestGenerationProfiles:
+
+    def test_profile_settings_applied(self):
+        """Prueba que el perfil fija el límite de tokens y las secuencias de parada"""
+        profile, temperature = gemini_service._resolve_profile("tutor", None)
+        config = gemini_service._generation_config(profile, temperature)
+
+        assert temperature == 0.8
+        assert config["max_output_tokens"] == 768
+        assert config["stop_sequences"] == ["\nEstudiante:"]
+
+    def test_explicit_temperature_overrides_profile(self):
+        """Prueba que una temperatura explícita tiene prioridad sobre el perfil"""
+        assert gemini_service._resolve_profile("aida", 0.2) == ("aida", 0.2)
+
+    def test_unknown_profile(self):
+        """Prueba que un perfil inexistente se rechaza"""
+        with pytest.raises(ValueError):
+            gemini_service._resolve_profile("inexistente", None)
+
+
+class TestModelRouting:
+
+    def test_route_by_profile(self):
+        """Prueba que cada perfil se enruta a su nivel con el otro como alternativa"""
+        fast_route = gemini_service._route("tutor_suggestions")
+        capable_route = gemini_service._route("quiz")
+
+        assert fast_route[0][0] == "fast"
+        assert capable_route[0][0] == "capable"
+        assert [tier for tier, _ in fast_route] == ["fast", "capable"]
+
+    def test_fallback_to_other_tier(self):
+        """Prueba que un fallo transitorio del nivel rápido recurre al capaz"""
+        fast_model = settings.GEMINI_MODEL_TIERS["fast"]["model"]
+        calls = []
+
+        def generate(model_name, prompt, generation_config, timeout=None, api_key=None):
+            calls.append(model_name)
+            if model_name == fast_model:
+                raise UpstreamError("no disponible", status_code=503)
+            return SimpleNamespace(text="respuesta", usage_metadata=None)
+
+        service = GeminiService(provider=MagicMock(generate=generate, acquire_key=AsyncMock(return_value=None)))
+        with patch.object(settings, "RESILIENCE_MAX_ATTEMPTS", 1):
+            text = asyncio.run(service.generate_text("Sugerencias", profile="tutor_suggestions"))
+
+        assert text == "respuesta"
+        assert calls == [fast_model, settings.GEMINI_MODEL_TIERS["capable"]["model"]]
+        assert metrics_registry.get_counter(
+            "llm_tier_fallbacks_total", service="untagged", from_tier="fast", to_tier="capable"
+        ) >= 1
+        service.shutdown()
+
+    def test_no_fallback_on_terminal_error(self):
+        """Prueba que un error de la petición (400) no cambia de nivel"""
+        calls = []
+
+        def generate(model_name, prompt, generation_config, timeout=None, api_key=None):
+            calls.append(model_name)
+            raise UpstreamError("petición inválida", status_code=400)
+
+        service = GeminiService(provider=MagicMock(generate=generate, acquire_key=AsyncMock(return_value=None)))
+        with pytest.raises(UpstreamError):
+            asyncio.run(service.generate_text("Tema", profile="quiz"))
+
+        assert len(calls) == 1
+        service.shutdown()
+
+    def test_keys_exhausted_is_not_upstream_failure(self):
+        """Prueba que quedarse sin claves no abre el circuito, no ocupa turno ni cambia de nivel"""
+        breaker = CircuitBreaker("gemini:prueba", failure_threshold=1, recovery_timeout=30.0)
+        limiter = AdaptiveConcurrencyLimiter("gemini:prueba", initial_limit=2)
+        provider = MagicMock(acquire_key=AsyncMock(side_effect=KeysExhaustedError()))
+
+        service = GeminiService(provider=provider)
+        with patch("app.utils.resilience.get_circuit_breaker", return_value=breaker), \
+                patch("app.utils.resilience.get_concurrency_limiter", return_value=limiter):
+            with pytest.raises(KeysExhaustedError):
+                asyncio.run(service.generate_text("Sugerencias", profile="tutor_suggestions"))
+
+        assert provider.acquire_key.await_count == 1
+        provider.generate.assert_not_called()
+        assert breaker.snapshot()["state"] == CircuitBreaker.CLOSED
+        assert limiter.in_flight == 0
+        assert limiter.current_limit == 2
+        service.shutdown()
+
+    def test_reserved_key_passed_to_provider(self):
+        """Prueba que la clave se reserva una vez antes de los intentos y llega al proveedor"""
+        api_key = object()
+        calls = []
+
+        def generate(model_name, prompt, generation_config, timeout=None, api_key=None):
+            calls.append(api_key)
+            if len(calls) == 1:
+                raise UpstreamError("no disponible", status_code=503)
+            return SimpleNamespace(text="respuesta", usage_metadata=None)
+
+        provider = MagicMock(generate=generate, acquire_key=AsyncMock(return_value=api_key))
+        service = GeminiService(provider=provider)
+        with patch.object(settings, "RESILIENCE_BASE_DELAY", 0.001):
+            assert asyncio.run(service.generate_text("Tema", profile="quiz")) == "respuesta"
+
+        assert calls == [api_key, api_key]
+        assert provider.acquire_key.await_count == 1
+        service.shutdown()
+
+
+class TestErrorPropagation:
+
+    def test_generate_json_keeps_upstream_error(self):
+        """Prueba que generate_json no oculta el código de un error del proveedor"""
+        def generate(model_name, prompt, generation_config, timeout=None, api_key=None):
+            raise UpstreamError("no disponible", status_code=503)
+
+        service = GeminiService(provider=MagicMock(generate=generate, acquire_key=AsyncMock(return_value=None)))
+        with patch.object(settings, "RESILIENCE_MAX_ATTEMPTS", 1):
+            with pytest.raises(UpstreamError) as error:
+                asyncio.run(service.generate_json("Tema", profile="quiz"))
+
+        assert error.value.status_code == 503
+        service.shutdown()
+
+    def test_generate_json_keeps_circuit_open(self):
+        """Prueba que con el circuito abierto generate_json lanza CircuitOpenError"""
+        breaker = CircuitBreaker("gemini", failure_threshold=1, recovery_timeout=60.0)
+        breaker.record_failure()
+        provider = MagicMock(acquire_key=AsyncMock(return_value=None))
+
+        service = GeminiService(provider=provider)
+        with patch("app.utils.resilience.get_circuit_breaker", return_value=breaker):
+            with pytest.raises(CircuitOpenError):
+                asyncio.run(service.generate_json("Tema", profile="quiz"))
+
+        provider.generate.assert_not_called()
+        service.shutdown()
+
+    def test_generate_json_wraps_parse_errors(self):
+        """Prueba que una respuesta que no es JSON sí se envuelve como error de parseo"""
+        def generate(model_name, prompt, generation_config, timeout=None, api_key=None):
+            return SimpleNamespace(text="sin json", usage_metadata=None)
+
+        service = GeminiService(provider=MagicMock(generate=generate, acquire_key=AsyncMock(return_value=None)))
+        with pytest.raises(Exception, match="Error generando JSON con Gemini") as error:
+            asyncio.run(service.generate_json("Tema", profile="quiz"))
+
+        assert not isinstance(error.value, UpstreamError)
+        service.shutdown()
+
+
+class TestStreamText:
+
+    def build_service(self, stream):
+        """
+        Servicio con un stream simulado, un circuito y un limitador propios de la prueba
+        """
+        breaker = CircuitBreaker("gemini:prueba", failure_threshold=5, recovery_timeout=30.0)
+        limiter = AdaptiveConcurrencyLimiter("gemini:prueba", initial_limit=2)
+        service = GeminiService(provider=MagicMock(stream=stream, acquire_key=AsyncMock(return_value=None)))
+        patches = [
+            patch("app.services.gemini_service.get_circuit_breaker", return_value=breaker),
+            patch("app.services.gemini_service.get_concurrency_limiter", return_value=limiter)
+        ]
+        for active in patches:
+            active.start()
+        return service, breaker, limiter, patches
+
+    def chunk(self, text):
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+    def test_stream_completes(self):
+        """Prueba que los fragmentos llegan en orden y el turno del limitador se libera"""
+        def stream(model_name, prompt, generation_config, timeout=None, api_key=None):
+            return iter([self.chunk("Hola, "), self.chunk(""), self.chunk("mundo")])
+
+        service, breaker, limiter, patches = self.build_service(stream)
+
+        async def run():
+            return [text async for text in service.stream_text("Saluda", profile="quiz")]
+
+        try:
+            assert asyncio.run(run()) == ["Hola, ", "mundo"]
+            assert limiter.in_flight == 0
+            assert breaker.snapshot()["state"] == CircuitBreaker.CLOSED
+        finally:
+            for active in patches:
+                active.stop()
+            service.shutdown()
+
+    def test_stream_upstream_error_mid_stream(self):
+        """Prueba que un error tras enviar texto llega al cliente sin cambiar de nivel"""
+        calls = []
+
+        def stream(model_name, prompt, generation_config, timeout=None, api_key=None):
+            calls.append(model_name)
+            yield self.chunk("Hola, ")
+            raise UpstreamError("no disponible", status_code=503)
+
+        service, breaker, limiter, patches = self.build_service(stream)
+        received = []
+
+        async def run():
+            async for text in service.stream_text("Saluda", profile="quiz"):
+                received.append(text)
+
+        try:
+            with pytest.raises(UpstreamError) as error:
+                asyncio.run(run())
+
+            assert received == ["Hola, "]
+            assert error.value.status_code == 503
+            assert len(calls) == 1
+            assert limiter.in_flight == 0
+        finally:
+            for active in patches:
+                active.stop()
+            service.shutdown()
+
+    def test_stream_consumer_disconnect(self):
+        """Prueba que si el cliente se va se detiene la lectura y se libera el turno"""
+        produced = []
+        finished = threading.Event()
+
+        def stream(model_name, prompt, generation_config, timeout=None, api_key=None):
+            try:
+                for index in range(100):
+                    produced.append(index)
+                    time.sleep(0.01)
+                    yield self.chunk(f"fragmento {index} ")
+            finally:
+                finished.set()
+
+        service, breaker, limiter, patches = self.build_service(stream)
+
+        async def run():
+            stream_text = service.stream_text("Saluda", profile="quiz")
+            first = await stream_text.__anext__()
+            in_flight = limiter.in_flight
+            await stream_text.aclose()
+            return first, in_flight
+
+        try:
+            first, in_flight = asyncio.run(run())
+
+            assert first == "fragmento 0 "
+            assert in_flight == 1
+            assert limiter.in_flight == 0
+            # El productor ve la señal de parada y no consume el stream entero
+            assert finished.wait(2)
+            assert len(produced) < 100
+            assert breaker.snapshot()["state"] == CircuitBreaker.CLOSED
+        finally:
+            for active in patches:
+                active.stop()
+            service.shutdown()
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock
+from app.config import get_settings
+from app.utils.dependencies import verify_metrics_token
+from app.utils.metrics import Histogram, MetricsRegistry, metrics_registry
+from app.services.gemini_service import gemini_service
+from app.schemas.voice_tutor import FollowUpSuggestions
+
+settings = get_settings()
+
+
+class TestMetricsRegistry:
+
+    def test_counters_by_label(self):
+        """Prueba que los contadores se separan por etiquetas"""
+        registry = MetricsRegistry()
+        registry.increment("llm_requests_total", service="quiz", outcome="success")
+        registry.increment("llm_requests_total", service="quiz", outcome="success")
+        registry.increment("llm_requests_total", service="aida", outcome="success")
+
+        assert registry.get_counter("llm_requests_total", service="quiz", outcome="success") == 2
+        assert registry.get_counter("llm_requests_total", service="aida", outcome="success") == 1
+
+    def test_histogram_percentiles(self):
+        """Prueba los percentiles aproximados del histograma"""
+        histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+        for _ in range(98):
+            histogram.observe(0.05)
+        histogram.observe(5.0)
+        histogram.observe(50.0)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 100
+        assert snapshot["p50"] == 0.1
+        assert snapshot["p99"] == 10.0
+        assert snapshot["buckets"]["+Inf"] == 1
+
+    def test_snapshot_prefix(self):
+        """Prueba el filtro por prefijo del snapshot"""
+        registry = MetricsRegistry()
+        registry.increment("llm_retries_total", service="video", provider="gemini")
+        registry.observe("did_poll_seconds", 1.0)
+
+        snapshot = registry.snapshot("llm_")
+        assert [c["name"] for c in snapshot["counters"]] == ["llm_retries_total"]
+        assert snapshot["histograms"] == []
+
+
+class TestGeminiInstrumentation:
+
+    def test_generate_json_records_service_metrics(self):
+        """Prueba que generate_json registra latencia y parseo por servicio"""
+        metrics_registry.reset()
+
+        with patch.object(
+                gemini_service, "_generate_text_uncached",
+                new=AsyncMock(return_value='{"suggestions": ["¿A?", "¿B?", "¿C?"]}')
+        ):
+            asyncio.run(gemini_service.generate_json(
+                prompt="Sugerencias sobre fotosíntesis",
+                service="voice_tutor",
+                response_schema=FollowUpSuggestions
+            ))
+
+        assert metrics_registry.get_counter(
+            "llm_requests_total", service="voice_tutor", operation="generate_json", outcome="success"
+        ) == 1
+        assert metrics_registry.get_counter(
+            "llm_json_parse_total", service="voice_tutor", outcome="success"
+        ) == 1
+        assert metrics_registry.get_histogram(
+            "llm_latency_seconds", service="voice_tutor", operation="generate_json"
+        )["count"] == 1
+
+    def test_parse_failure_is_counted(self):
+        """Prueba que las respuestas sin JSON válido se cuentan como fallo"""
+        metrics_registry.reset()
+
+        with patch.object(
+                gemini_service, "_generate_text_uncached",
+                new=AsyncMock(return_value="Lo siento, no puedo ayudarte")
+        ):
+            with pytest.raises(Exception):
+                asyncio.run(gemini_service.generate_json(prompt="Tarjetas", service="flashcards"))
+
+        assert metrics_registry.get_counter(
+            "llm_json_parse_total", service="flashcards", outcome="invalid_json"
+        ) == 1
+        assert metrics_registry.get_counter(
+            "llm_requests_total", service="flashcards", operation="generate_json", outcome="error"
+        ) == 1
+
+
+class TestMetricsAccess:
+
+    def build_client(self) -> TestClient:
+        metrics_app = FastAPI()
+
+        @metrics_app.get("/metrics", dependencies=[Depends(verify_metrics_token)])
+        async def get_metrics():
+            return {"ok": True}
+
+        return TestClient(metrics_app)
+
+    def test_disabled_without_token(self):
+        """Prueba que sin METRICS_TOKEN las métricas no se sirven"""
+        with patch.object(settings, "METRICS_TOKEN", None):
+            response = self.build_client().get("/metrics", headers={"Authorization": "Bearer cualquiera"})
+        assert response.status_code == 404
+
+    def test_requires_token(self):
+        """Prueba que las métricas solo se sirven con el token configurado"""
+        client = self.build_client()
+        with patch.object(settings, "METRICS_TOKEN", "secreto"):
+            missing = client.get("/metrics")
+            wrong = client.get("/metrics", headers={"Authorization": "Bearer otro"})
+            valid = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+
+        assert missing.status_code == 401
+        assert wrong.status_code == 401
+        assert valid.json() == {"ok": True}
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    UpstreamError,
+    call_with_resilience,
+    is_retryable,
+    is_retryable_before_send
+)
+
+FAST_POLICY = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+
+
+class TestErrorClassification:
+
+    def test_transient_status_codes(self):
+        """Prueba que 429 y 5xx se reintentan y 4xx no"""
+        assert is_retryable(UpstreamError("rate limit", status_code=429))
+        assert is_retryable(UpstreamError("caído", status_code=503))
+        assert not is_retryable(UpstreamError("petición inválida", status_code=400))
+
+    def test_non_idempotent_only_retries_rate_limit(self):
+        """Prueba que crear un video no se reintenta tras un 500"""
+        assert is_retryable_before_send(UpstreamError("rate limit", status_code=429))
+        assert not is_retryable_before_send(UpstreamError("error", status_code=500))
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        """Prueba que el circuito se abre tras fallos consecutivos"""
+        breaker = CircuitBreaker("prueba", failure_threshold=2, recovery_timeout=30.0)
+        breaker.record_failure()
+        breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_allows_single_probe(self):
+        """Prueba que tras el tiempo de recuperación pasa una sola llamada"""
+        breaker = CircuitBreaker("prueba", failure_threshold=1, recovery_timeout=10.0)
+        with patch("app.utils.resilience.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch("app.utils.resilience.time.monotonic", return_value=111.0):
+            breaker.before_call()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.snapshot()["state"] == CircuitBreaker.CLOSED
+
+
+class TestCallWithResilience:
+
+    def test_retries_transient_errors(self):
+        """Prueba que un fallo transitorio se reintenta hasta tener éxito"""
+        calls = []
+
+        async def upstream(timeout):
+            calls.append(timeout)
+            if len(calls) < 3:
+                raise UpstreamError("no disponible", status_code=503)
+            return "ok"
+
+        result = asyncio.run(call_with_resilience(
+            "prueba-reintentos", upstream, attempt_timeout=1.0, policy=FAST_POLICY
+        ))
+
+        assert result == "ok"
+        assert len(calls) == 3
+
+    def test_terminal_errors_fail_fast(self):
+        """Prueba que un error terminal no se reintenta"""
+        calls = []
+
+        async def upstream(timeout):
+            calls.append(timeout)
+            raise UpstreamError("petición inválida", status_code=400)
+
+        with pytest.raises(UpstreamError):
+            asyncio.run(call_with_resilience("prueba-terminal", upstream, policy=FAST_POLICY))
+
+        assert len(calls) == 1
+
+    def test_attempt_timeout(self):
+        """Prueba que un intento lento se convierte en 504"""
+        async def upstream(timeout):
+            await asyncio.sleep(1)
+
+        with pytest.raises(UpstreamError) as exc_info:
+            asyncio.run(call_with_resilience(
+                "prueba-timeout", upstream, attempt_timeout=0.01, policy=FAST_POLICY
+            ))
+
+        assert exc_info.value.status_code == 504
+
+    def test_timeout_without_time_for_retry(self):
+        """Prueba que si el siguiente reintento no cabe en el plazo el timeout también es 504"""
+        calls = []
+
+        async def upstream(timeout):
+            calls.append(timeout)
+            await asyncio.sleep(1)
+
+        policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=1.0)
+        with patch("app.utils.resilience.random.uniform", return_value=1.0):
+            with pytest.raises(UpstreamError) as exc_info:
+                asyncio.run(call_with_resilience(
+                    "prueba-plazo", upstream, attempt_timeout=0.01, deadline=0.5, policy=policy
+                ))
+
+        assert exc_info.value.status_code == 504
+        assert len(calls) == 1
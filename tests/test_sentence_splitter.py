@@ -0,0 +1,45 @@
+from app.utils.sentence_splitter import SentenceSplitter
+
+
+def feed_in_chunks(splitter: SentenceSplitter, text: str, size: int = 7) -> list:
+    sentences = []
+    for start in range(0, len(text), size):
+        sentences.extend(splitter.feed(text[start:start + size]))
+    return sentences + splitter.flush()
+
+
+class TestSentenceSplitter:
+
+    def test_splits_streamed_text_into_sentences(self):
+        """Prueba que el texto por fragmentos se corta en frases completas"""
+        text = (
+            "La fotosíntesis es el proceso que usan las plantas. "
+            "¿Sabías que necesitan luz solar para hacerla? "
+            "Así producen su propio alimento."
+        )
+        assert feed_in_chunks(SentenceSplitter(), text) == [
+            "La fotosíntesis es el proceso que usan las plantas.",
+            "¿Sabías que necesitan luz solar para hacerla?",
+            "Así producen su propio alimento."
+        ]
+
+    def test_sentence_waits_for_following_space(self):
+        """Prueba que un punto sin espacio detrás (p. ej. 3.14) no corta la frase"""
+        splitter = SentenceSplitter(min_chars=5)
+        assert splitter.feed("El número pi vale 3.") == []
+        assert splitter.feed("14 aproximadamente. Y") == ["El número pi vale 3.14 aproximadamente."]
+        assert splitter.flush() == ["Y"]
+
+    def test_short_sentences_are_merged(self):
+        """Prueba que las frases muy cortas se unen a la siguiente"""
+        splitter = SentenceSplitter(min_chars=20)
+        assert splitter.feed("¡Hola! Hoy vamos a estudiar biología. ") == [
+            "¡Hola! Hoy vamos a estudiar biología."
+        ]
+
+    def test_long_text_without_punctuation_is_cut(self):
+        """Prueba que un texto largo sin puntuación se corta en una coma"""
+        splitter = SentenceSplitter(min_chars=5, max_chars=40)
+        sentences = splitter.feed("primero la luz, después el agua, luego el dióxido de carbono y la clorofila")
+        assert sentences[0] == "primero la luz, después el agua,"
+        assert all(len(sentence) <= 40 for sentence in sentences)
@@ -4,8 +4,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import Base, get_db
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
+from starlette.websockets import WebSocketDisconnect
+from app.services.voice_tutor_service import voice_tutor_service, VoiceTutorService
+from app.schemas.voice_tutor import FollowUpSuggestions
+import asyncio
 import base64
+import time
 import os
 from sqlalchemy import create_engine
 
@@ -112,6 +117,37 @@ class TestVoiceTutor:
         )
         assert response.status_code == 200
 
+    @patch('app.services.voice_tutor_service.voice_tutor_service.complete_answer')
+    @patch('app.services.voice_tutor_service.voice_tutor_service.stream_answer')
+    def test_ask_voice_tutor_stream(self, mock_stream, mock_complete, client, auth_token):
+        """Prueba la respuesta del tutor en streaming"""
+        async def fake_stream():
+            for chunk in ["Python es ", "un lenguaje ", "de programación."]:
+                yield chunk
+
+        fake_audio = base64.b64encode(b"fake_audio").decode()
+        mock_stream.return_value = fake_stream()
+        mock_complete.return_value = {
+            "text_response": "Python es un lenguaje de programación.",
+            "audio_response": f"data:audio/wav;base64,{fake_audio}",
+            "follow_up_suggestions": ["¿Qué puedo hacer con Python?"]
+        }
+
+        response = client.post(
+            "/api/v1/voice-tutor/ask/stream",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={
+                "topic": "Python",
+                "user_question": "¿Qué es Python?",
+                "conversation_history": []
+            }
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.count("event: token") == 3
+        assert "event: done" in response.text
+        assert mock_complete.call_args.kwargs["text_response"] == "Python es un lenguaje de programación."
+
     def test_create_voice_conversation(self, client, auth_token):
         """Prueba crear conversación de voz"""
         response = client.post(
@@ -262,4 +298,213 @@ class TestVoiceTutor:
                 "conversation_history": []
             }
         )
-        assert response.status_code == 403
\ No newline at end of file
+        assert response.status_code == 403
+
+class TestVoiceTutorSingleCall:
+
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_text', new_callable=AsyncMock)
+    def test_answer_and_suggestions_in_one_call(self, mock_generate, mock_audio):
+        """Prueba que respuesta y sugerencias llegan en una sola llamada a Gemini"""
+        mock_generate.return_value = (
+            '{"answer": "Python es un lenguaje de programación.", '
+            '"suggestions": ["¿Qué es una variable?", "¿Qué es una función?", "¿Qué es una clase?"]}'
+        )
+        mock_audio.return_value = "data:audio/wav;base64,AAAA"
+
+        response = asyncio.run(voice_tutor_service.ask_tutor("Python", "¿Qué es Python?"))
+
+        assert mock_generate.call_count == 1
+        assert mock_generate.call_args.kwargs["profile"] == "tutor_combined"
+        assert response["text_response"] == "Python es un lenguaje de programación."
+        assert response["follow_up_suggestions"][2] == "¿Qué es una clase?"
+        mock_audio.assert_called_once_with("Python es un lenguaje de programación.")
+
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_text', new_callable=AsyncMock)
+    def test_invalid_suggestions_use_fallback(self, mock_generate, mock_audio):
+        """Prueba que si las sugerencias no son válidas se usan las de por defecto"""
+        mock_generate.return_value = '{"answer": "Python es un lenguaje.", "suggestions": ["¿Solo una?"]}'
+        mock_audio.return_value = "data:audio/wav;base64,AAAA"
+
+        response = asyncio.run(voice_tutor_service.ask_tutor("Python", "¿Qué es Python?"))
+
+        assert mock_generate.call_count == 1
+        assert response["follow_up_suggestions"] == VoiceTutorService.FALLBACK_SUGGESTIONS
+
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_text', new_callable=AsyncMock)
+    def test_unparseable_response_asks_answer_only(self, mock_generate, mock_audio):
+        """Prueba que sin JSON legible se pide solo la explicación"""
+        mock_generate.side_effect = ["respuesta sin formato", "Python es un lenguaje."]
+        mock_audio.return_value = "data:audio/wav;base64,AAAA"
+
+        response = asyncio.run(voice_tutor_service.ask_tutor("Python", "¿Qué es Python?"))
+
+        assert mock_generate.call_count == 2
+        assert mock_generate.call_args.kwargs["profile"] == "tutor"
+        assert response["text_response"] == "Python es un lenguaje."
+        assert response["follow_up_suggestions"] == VoiceTutorService.FALLBACK_SUGGESTIONS
+
+
+class TestVoiceTutorStages:
+
+    @patch('app.services.voice_tutor_service.settings.VOICE_TUTOR_SINGLE_CALL', False)
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_json', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_text', new_callable=AsyncMock)
+    def test_audio_and_suggestions_run_concurrently(self, mock_text, mock_json, mock_audio):
+        """Prueba que el audio y las sugerencias se generan a la vez"""
+        async def slow_audio(text):
+            await asyncio.sleep(0.2)
+            return "data:audio/wav;base64,AAAA"
+
+        async def slow_suggestions(**kwargs):
+            await asyncio.sleep(0.2)
+            return FollowUpSuggestions(suggestions=["¿A?", "¿B?", "¿C?"])
+
+        mock_text.return_value = "Python es un lenguaje."
+        mock_audio.side_effect = slow_audio
+        mock_json.side_effect = slow_suggestions
+
+        async def run():
+            started = time.perf_counter()
+            response = await voice_tutor_service.ask_tutor("Python", "¿Qué es Python?")
+            return response, time.perf_counter() - started
+
+        response, elapsed = asyncio.run(run())
+
+        assert response["follow_up_suggestions"] == ["¿A?", "¿B?", "¿C?"]
+        assert elapsed < 0.35
+
+    @patch('app.services.voice_tutor_service.settings.VOICE_TUTOR_SUGGESTIONS_TIMEOUT_SECONDS', 0.05)
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_json', new_callable=AsyncMock)
+    def test_slow_suggestions_use_fallback(self, mock_json, mock_audio):
+        """Prueba que si las sugerencias no llegan a tiempo se usan las de por defecto"""
+        async def slow_suggestions(**kwargs):
+            await asyncio.sleep(1)
+
+        mock_json.side_effect = slow_suggestions
+        mock_audio.return_value = "data:audio/wav;base64,AAAA"
+
+        response = asyncio.run(voice_tutor_service.complete_answer("Python", "¿Qué es Python?", "Respuesta"))
+
+        assert response["audio_response"] == "data:audio/wav;base64,AAAA"
+        assert response["follow_up_suggestions"] == VoiceTutorService.FALLBACK_SUGGESTIONS
+
+    @patch('app.services.voice_tutor_service.gemini_service.generate_json', new_callable=AsyncMock)
+    def test_short_suggestions_use_fallback(self, mock_json):
+        """Prueba que con menos de 3 sugerencias se usan las de por defecto"""
+        mock_json.return_value = FollowUpSuggestions(suggestions=["¿A?", " "])
+
+        suggestions = asyncio.run(voice_tutor_service._generate_suggestions("Python", "¿Qué es?", "Respuesta"))
+
+        assert suggestions == VoiceTutorService.FALLBACK_SUGGESTIONS
+
+
+class TestVoiceTutorSpeechStream:
+
+    @patch('app.services.voice_tutor_service.audio_service.generate_audio', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.generate_json', new_callable=AsyncMock)
+    @patch('app.services.voice_tutor_service.gemini_service.stream_text')
+    def test_audio_starts_before_text_ends(self, mock_stream, mock_json, mock_audio):
+        """Prueba que el audio de la primera frase llega antes de terminar el texto"""
+        async def fake_stream(**kwargs):
+            for chunk in ["La fotosíntesis es un proceso ", "de las plantas. ", "Usan la luz ", "del sol para vivir."]:
+                await asyncio.sleep(0.02)
+                yield chunk
+
+        async def fake_audio(text):
+            return f"audio:{text}"
+
+        mock_stream.side_effect = fake_stream
+        mock_audio.side_effect = fake_audio
+        mock_json.return_value = FollowUpSuggestions(suggestions=["¿A?", "¿B?", "¿C?"])
+
+        async def run():
+            return [event async for event in voice_tutor_service.stream_speech("Biología", "¿Qué es la fotosíntesis?")]
+
+        events = asyncio.run(run())
+        names = [name for name, _ in events]
+        audio = [data for name, data in events if name == "audio"]
+
+        assert names.index("audio") < len(names) - 1 - names[::-1].index("token")
+        assert [chunk["text"] for chunk in audio] == [
+            "La fotosíntesis es un proceso de las plantas.",
+            "Usan la luz del sol para vivir."
+        ]
+        assert events[-1] == ("done", {
+            "text_response": "La fotosíntesis es un proceso de las plantas. Usan la luz del sol para vivir.",
+            "follow_up_suggestions": ["¿A?", "¿B?", "¿C?"]
+        })
+
+    @patch('app.services.voice_tutor_service.gemini_service.stream_text')
+    def test_stream_error_is_reported(self, mock_stream):
+        """Prueba que un fallo de Gemini termina con un evento de error"""
+        async def failing_stream(**kwargs):
+            yield "Hola"
+            raise Exception("Gemini no disponible")
+
+        mock_stream.side_effect = failing_stream
+
+        async def run():
+            return [event async for event in voice_tutor_service.stream_speech("Biología", "¿Qué es?")]
+
+        events = asyncio.run(run())
+        assert events[-1][0] == "error"
+        assert "Gemini no disponible" in events[-1][1]["message"]
+
+
+class TestVoiceTutorWebSocket:
+
+    @staticmethod
+    def fake_speech(**kwargs):
+        async def events():
+            yield "token", {"text": "Python es un lenguaje."}
+            yield "audio", {"index": 0, "text": "Python es un lenguaje.", "audio": "data:audio/wav;base64,AAAA"}
+            yield "done", {
+                "text_response": "Python es un lenguaje.",
+                "follow_up_suggestions": ["¿A?", "¿B?", "¿C?"]
+            }
+        return events()
+
+    @patch('app.services.voice_tutor_service.voice_tutor_service.stream_speech')
+    def test_session_turns_keep_history_and_persist(self, mock_speech, client, auth_token):
+        """Prueba que la sesión guarda el historial en el servidor y los mensajes en la BD"""
+        mock_speech.side_effect = self.fake_speech
+
+        with client.websocket_connect(f"/api/v1/voice-tutor/ws?token={auth_token}&topic=Python") as websocket:
+            ready = websocket.receive_json()
+            assert ready["type"] == "ready"
+            assert ready["topic"] == "Python"
+
+            for question in ["¿Qué es Python?", "¿Y para qué sirve?"]:
+                websocket.send_json({"type": "ask", "question": question})
+                frames = [websocket.receive_json() for _ in range(3)]
+                assert [frame["type"] for frame in frames] == ["token", "audio", "done"]
+
+        second_turn_history = mock_speech.call_args_list[1].kwargs["conversation_history"]
+        assert second_turn_history == [
+            {"role": "user", "content": "¿Qué es Python?"},
+            {"role": "assistant", "content": "Python es un lenguaje."}
+        ]
+
+        response = client.get(
+            f"/api/v1/voice-tutor/conversations/{ready['conversation_id']}/messages",
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert [message["role"] for message in response.json()] == ["user", "assistant", "user", "assistant"]
+
+    def test_session_empty_question(self, client, auth_token):
+        """Prueba que una pregunta vacía devuelve un error sin cerrar la sesión"""
+        with client.websocket_connect(f"/api/v1/voice-tutor/ws?token={auth_token}&topic=Python") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "ask", "question": "  "})
+            assert websocket.receive_json()["type"] == "error"
+
+    def test_session_invalid_token(self, client, clean_db):
+        """Prueba que sin un token válido no se abre la sesión"""
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/api/v1/voice-tutor/ws?token=invalido&topic=Python") as websocket:
+                websocket.receive_json()